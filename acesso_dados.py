@@ -0,0 +1,156 @@
+# ========== ACESSO A DADOS ASSÍNCRONO (SUPABASE) ==========
+# Camada compartilhada por biblioteca.py, financeiro.py e escola.py para
+# disparar consultas independentes AO MESMO TEMPO em vez de uma após a outra.
+# Conceitos: asyncio, asyncio.gather, event loop em thread, funções como parâmetro
+#
+# Uso (código síncrono, como os menus):
+#
+#     resumo, generos = executar_em_paralelo(
+#         lambda db: db.table("vw_resumo").select("*"),
+#         lambda db: db.table("vw_generos").select("genero, quantidade"),
+#     )
+#
+# Cada consulta é uma função que recebe o cliente assíncrono e devolve a
+# consulta montada (sem .execute()); a camada executa todas juntas.
+#
+# Também guarda o cliente síncrono, criado só no primeiro uso (obter_cliente).
+# Importar este módulo (ou os sistemas que o usam) não conecta nem carrega
+# a biblioteca supabase: o menu aparece na hora e testes/ferramentas podem
+# importar as funções sem efeitos colaterais. Pelo mesmo motivo o asyncio
+# só é importado dentro das funções que executam consultas em paralelo.
+
+import os
+import threading
+from dotenv import load_dotenv
+
+# Carrega as variáveis de ambiente do arquivo .env
+load_dotenv()
+
+_CLIENTE_SINCRONO = None
+
+
+def credenciais_configuradas():
+    """Confere se SUPABASE_URL e SUPABASE_KEY foram preenchidas no .env"""
+    url = os.getenv("SUPABASE_URL")
+    chave = os.getenv("SUPABASE_KEY")
+    return bool(url and chave and url != "sua_url_do_supabase_aqui")
+
+
+def verificar_credenciais():
+    """
+    Usada pelos menus antes de começar: sem credenciais, explica como
+    configurar e encerra o programa (o comportamento antigo de importação).
+    """
+    if credenciais_configuradas():
+        return
+
+    print("\n" + "=" * 60)
+    print("⚠ ATENÇÃO: Configure suas credenciais do Supabase!")
+    print("=" * 60)
+    print("\n1. Acesse seu projeto no Supabase")
+    print("2. Vá em Settings > API")
+    print("3. Copie a URL e a anon/public key")
+    print("4. Edite o arquivo .env e cole suas credenciais\n")
+    print("Exemplo:")
+    print("SUPABASE_URL=https://xxxxx.supabase.co")
+    print("SUPABASE_KEY=eyJhbGciOiJIUzI1NiIsInR5cCI...")
+    print("=" * 60)
+    input("\nPressione ENTER para sair...")
+    exit()
+
+
+def obter_cliente():
+    """
+    Devolve o cliente síncrono do Supabase, criando-o na primeira chamada.
+    O import do pacote supabase (pesado) também só acontece aqui.
+    """
+    global _CLIENTE_SINCRONO
+
+    if _CLIENTE_SINCRONO is None:
+        if not credenciais_configuradas():
+            raise RuntimeError("credenciais do Supabase não configuradas no .env")
+
+        from supabase import create_client
+
+        _CLIENTE_SINCRONO = create_client(
+            os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY")
+        )
+    return _CLIENTE_SINCRONO
+
+
+# O event loop roda numa thread própria durante todo o programa. Assim o
+# cliente assíncrono (e as conexões HTTP keep-alive dele) é criado uma única
+# vez e reaproveitado por todas as chamadas, em vez de um asyncio.run() por
+# relatório, que abriria e fecharia conexões a cada uso.
+_LOOP = None
+_CLIENTE = None
+_TRAVA = threading.Lock()
+
+
+async def _criar_cliente():
+    """Cria o cliente assíncrono do Supabase com as credenciais do .env"""
+    if not credenciais_configuradas():
+        raise RuntimeError("credenciais do Supabase não configuradas no .env")
+
+    from supabase import acreate_client
+
+    return await acreate_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+
+
+def _iniciar():
+    """Sobe o event loop em segundo plano e cria o cliente (só na primeira vez)"""
+    global _LOOP, _CLIENTE
+    import asyncio
+
+    with _TRAVA:
+        if _LOOP is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(
+                target=loop.run_forever, name="acesso-dados", daemon=True
+            )
+            thread.start()
+            try:
+                _CLIENTE = asyncio.run_coroutine_threadsafe(
+                    _criar_cliente(), loop
+                ).result()
+            except BaseException:
+                # Sem cliente o loop não serve: para a thread dele, senão cada
+                # nova tentativa (ex.: .env ainda sem credenciais) deixaria
+                # uma thread parada para trás
+                loop.call_soon_threadsafe(loop.stop)
+                thread.join()
+                loop.close()
+                raise
+            _LOOP = loop
+
+    return _LOOP
+
+
+async def executar_em_paralelo_async(*consultas):
+    """
+    Versão assíncrona: executa as consultas concorrentemente com
+    asyncio.gather e devolve os resultados na mesma ordem recebida.
+    Deve ser aguardada dentro do event loop desta camada.
+    """
+    import asyncio
+
+    respostas = await asyncio.gather(
+        *(consulta(_CLIENTE).execute() for consulta in consultas)
+    )
+    return list(respostas)
+
+
+def executar_em_paralelo(*consultas):
+    """
+    Fachada síncrona para o código dos menus: envia as consultas ao event
+    loop em segundo plano e espera todas terminarem. O tempo total fica
+    perto da consulta mais lenta, e não da soma de todas.
+    Se alguma consulta falhar, a exceção é repassada a quem chamou.
+    """
+    import asyncio
+
+    loop = _iniciar()
+    futuro = asyncio.run_coroutine_threadsafe(
+        executar_em_paralelo_async(*consultas), loop
+    )
+    return futuro.result()
@@ -2,49 +2,50 @@
 # Sistema completo com livros, membros e empréstimos usando Supabase
 # Conceitos: datetime, relacionamentos, validações, relatórios
 
+import csv
+import json
 import os
-from datetime import datetime, timedelta, date
+import sys
+import time
+import unicodedata
+from bisect import bisect_left
+from collections import OrderedDict
+from datetime import datetime, date
 from dotenv import load_dotenv
-from supabase import create_client
+from acesso_dados import executar_em_paralelo, obter_cliente, verificar_credenciais
 
 # Carrega as variáveis de ambiente do arquivo .env
 load_dotenv()
 
-# Configuração do Supabase
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-
-# Verifica se as credenciais foram configuradas
-if not SUPABASE_URL or not SUPABASE_KEY or SUPABASE_URL == "sua_url_do_supabase_aqui":
-    print("\n" + "=" * 60)
-    print("⚠ ATENÇÃO: Configure suas credenciais do Supabase!")
-    print("=" * 60)
-    print("\n1. Acesse seu projeto no Supabase")
-    print("2. Vá em Settings > API")
-    print("3. Copie a URL e a anon/public key")
-    print("4. Edite o arquivo .env e cole suas credenciais\n")
-    input("\nPressione ENTER para sair...")
-    exit()
-
-# Inicializa o cliente Supabase
-try:
-    supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-    print("✓ Conectado ao Supabase com sucesso!")
-except Exception as e:
-    print(f"✗ Erro ao conectar ao Supabase: {e}")
-    input("\nPressione ENTER para sair...")
-    exit()
-
 # Nomes das tabelas no Supabase
 TABELA_LIVROS = "livros"
 TABELA_MEMBROS = "membros"
 TABELA_EMPRESTIMOS = "emprestimos"
+TABELA_CIRCULACAO = "circulacao_mensal"  # Rollup mensal mantido por gatilho
+
+# Views de estatísticas criadas pelo biblioteca.sql
+VIEW_RESUMO = "vw_resumo_biblioteca"
+VIEW_LIVROS_POR_GENERO = "vw_livros_por_genero"
+VIEW_RANKING_LIVROS = "vw_ranking_livros"
+VIEW_ATIVOS_POR_MEMBRO = "vw_emprestimos_ativos_por_membro"
 
 # Constantes do sistema
 LIMITE_EMPRESTIMOS = 3  # Máximo de empréstimos ativos por membro
 PRAZO_ESTUDANTE = 7  # Dias de empréstimo para estudante
 PRAZO_PROFESSOR = 14  # Dias de empréstimo para professor
 MULTA_POR_DIA = 1.00  # R$ por dia de atraso
+TAMANHO_PAGINA = 50  # Linhas por página nas listagens
+LIMITE_BUSCA = 20  # Máximo de resultados da busca inteligente
+CACHE_TTL_SEGUNDOS = 300  # Tempo de vida de um livro/membro no cache local
+CACHE_MAX_ITENS = 5000  # Máximo de linhas por tabela no cache local
+TAMANHO_LOTE_IMPORTACAO = 500  # Livros por requisição na importação em massa
+LIMITE_SUGESTOES = 10  # Sugestões exibidas na seleção por prefixo
+LIMITE_INDICE_LOCAL = 100000  # Acima disso a seleção consulta o banco a cada busca
+TAMANHO_PAGINA_INDICE = 1000  # Linhas por requisição ao montar o índice (máximo usual do PostgREST)
+HORIZONTE_ARQUIVO_DIAS = 365  # Devolvidos há mais tempo que isso vão para o arquivo
+NOTIFICACOES_CONCORRENCIA = 10  # Envios simultâneos de avisos de atraso
+NOTIFICACOES_POR_SEGUNDO = 5  # Limite de envios por segundo (provedor de email/SMS)
+NOTIFICACOES_ARQUIVO = "notificacoes_atraso.jsonl"  # Saída do enviador "arquivo"
 GENEROS_VALIDOS = [
     "Romance",
     "Ficção Científica",
@@ -59,6 +60,20 @@ GENEROS_VALIDOS = [
     "Infantil",
     "Outro",
 ]
+MESES_ABREV = [
+    "Jan",
+    "Fev",
+    "Mar",
+    "Abr",
+    "Mai",
+    "Jun",
+    "Jul",
+    "Ago",
+    "Set",
+    "Out",
+    "Nov",
+    "Dez",
+]
 
 
 # ========== FUNÇÕES DE VALIDAÇÃO ==========
@@ -88,6 +103,20 @@ def validar_telefone(telefone):
     return apenas_digitos.isdigit() and 10 <= len(apenas_digitos) <= 11
 
 
+def normalizar_isbn(texto):
+    """
+    Remove hífens e espaços do ISBN e confere o tamanho (10 ou 13 caracteres).
+    Retorna o ISBN limpo ou None se for inválido.
+    """
+    isbn = str(texto).replace("-", "").replace(" ", "").upper()
+    if len(isbn) == 13 and isbn.isdigit():
+        return isbn
+    # ISBN-10 pode terminar com X (dígito verificador 10)
+    if len(isbn) == 10 and isbn[:9].isdigit() and (isbn[9].isdigit() or isbn[9] == "X"):
+        return isbn
+    return None
+
+
 def formatar_data(data_str):
     """Converte string de data ISO (YYYY-MM-DD) para formato brasileiro (DD/MM/YYYY)"""
     try:
@@ -100,20 +129,422 @@ def formatar_data(data_str):
         return str(data_str) if data_str else "N/A"
 
 
-def calcular_dias_atraso(data_devolucao_prevista_str):
+def calcular_atrasos_em_lote(emprestimos):
+    """
+    Calcula atraso e multa estimada de vários empréstimos de uma vez.
+    Converte cada data para ordinal (número inteiro de dias) só uma vez por
+    data distinta — muitos empréstimos vencem no mesmo dia — e depois faz
+    apenas subtrações de inteiros. Adiciona em cada empréstimo as chaves
+    'dias_restantes' (negativo se atrasado), 'dias_atraso' e 'multa_estimada'.
+    """
+    hoje = date.today().toordinal()
+    ordinais = {}  # data ISO → ordinal, evita converter a mesma data de novo
+
+    for emp in emprestimos:
+        data_texto = str(emp["data_devolucao_prevista"])[:10]
+        if data_texto not in ordinais:
+            try:
+                ordinais[data_texto] = date.fromisoformat(data_texto).toordinal()
+            except ValueError:
+                ordinais[data_texto] = hoje  # Data inválida: trata como sem atraso
+
+        dias_restantes = ordinais[data_texto] - hoje
+        dias_atraso = max(0, -dias_restantes)
+        emp["dias_restantes"] = dias_restantes
+        emp["dias_atraso"] = dias_atraso
+        emp["multa_estimada"] = round(dias_atraso * MULTA_POR_DIA, 2)
+
+    return emprestimos
+
+
+def primeiro_preenchido(linha, *chaves, padrao=None):
+    """
+    Valor da primeira chave presente e preenchida. Célula vazia do CSV ("")
+    conta como ausente; 0 do JSONL é um valor (e a validação o recusa).
+    """
+    for chave in chaves:
+        valor = linha.get(chave)
+        if valor is not None and valor != "":
+            return valor
+    return padrao
+
+
+def validar_livro(linha):
     """
-    Calcula quantos dias de atraso existem a partir da data prevista de devolução.
-    Retorna 0 se não estiver atrasado.
+    Valida um livro vindo de arquivo com as mesmas regras do cadastrar_livro().
+    Retorna (dados prontos para o insert, None) ou (None, mensagem de erro).
     """
+    if not isinstance(linha, dict):
+        return None, "linha mal formatada"
+
+    titulo = str(linha.get("titulo") or "").strip()
+    autor = str(linha.get("autor") or "").strip()
+    if not titulo:
+        return None, "título vazio"
+    if not autor:
+        return None, "autor vazio"
+
+    # Aceita o gênero sem diferenciar maiúsculas/minúsculas
+    genero_texto = str(linha.get("genero") or "").strip().lower()
+    genero = next((g for g in GENEROS_VALIDOS if g.lower() == genero_texto), None)
+    if genero is None:
+        return None, f"gênero inválido '{linha.get('genero')}'"
+
     try:
-        data_prevista = datetime.strptime(
-            str(data_devolucao_prevista_str), "%Y-%m-%d"
-        ).date()
-        hoje = date.today()
-        diferenca = (hoje - data_prevista).days
-        return max(0, diferenca)  # max() garante que não retorna valor negativo
+        ano = int(primeiro_preenchido(linha, "ano_publicacao", "ano", padrao=""))
+        quantidade = int(
+            primeiro_preenchido(linha, "quantidade", "quantidade_total", padrao=1)
+        )
     except (ValueError, TypeError):
-        return 0
+        return None, "ano ou quantidade não numéricos"
+
+    ano_atual = datetime.now().year
+    if not 1450 <= ano <= ano_atual:
+        return None, f"ano deve estar entre 1450 e {ano_atual}"
+    if quantidade < 1:
+        return None, "quantidade deve ser pelo menos 1"
+
+    isbn = None
+    if linha.get("isbn"):
+        isbn = normalizar_isbn(linha["isbn"])
+        if isbn is None:
+            return None, f"ISBN inválido '{linha['isbn']}'"
+
+    dados = {
+        "titulo": titulo,
+        "autor": autor,
+        "genero": genero,
+        "ano_publicacao": ano,
+        "quantidade_total": quantidade,
+        "quantidade_disponivel": quantidade,
+        "isbn": isbn,
+    }
+    return dados, None
+
+
+# ========== CACHE LOCAL DO CATÁLOGO ==========
+# Livros e membros mudam pouco comparados aos empréstimos, então as consultas
+# por id passam por um cache em memória. OrderedDict mantém a ordem de uso:
+# o item menos usado recentemente fica no início e é o primeiro a sair (LRU).
+# Cada entrada guarda (momento em que foi lida, linha completa).
+CACHE_CATALOGO = {TABELA_LIVROS: OrderedDict(), TABELA_MEMBROS: OrderedDict()}
+CACHE_CONTADORES = {"acertos": 0, "falhas": 0}
+
+
+def cache_obter(tabela, ids):
+    """
+    Procura os ids no cache da tabela.
+    Retorna ({id: linha} encontrados, [ids que precisam ser buscados no banco]).
+    """
+    cache = CACHE_CATALOGO[tabela]
+    agora = time.monotonic()
+    encontrados = {}
+    faltando = []
+
+    for linha_id in ids:
+        entrada = cache.get(linha_id)
+        if entrada is not None and agora - entrada[0] < CACHE_TTL_SEGUNDOS:
+            cache.move_to_end(linha_id)  # Marca como usado recentemente
+            encontrados[linha_id] = entrada[1]
+            CACHE_CONTADORES["acertos"] += 1
+        else:
+            cache.pop(linha_id, None)  # Remove a entrada expirada, se houver
+            faltando.append(linha_id)
+            CACHE_CONTADORES["falhas"] += 1
+
+    return encontrados, faltando
+
+
+def cache_guardar(tabela, linhas):
+    """Guarda linhas completas no cache, descartando as menos usadas se lotar"""
+    cache = CACHE_CATALOGO[tabela]
+    agora = time.monotonic()
+
+    for linha in linhas:
+        cache[linha["id"]] = (agora, linha)
+        cache.move_to_end(linha["id"])
+
+    while len(cache) > CACHE_MAX_ITENS:
+        cache.popitem(last=False)  # Remove a mais antiga (início do OrderedDict)
+
+
+def cache_invalidar(tabela, linha_id=None):
+    """Remove uma linha do cache (ou a tabela inteira se linha_id for None)"""
+    if tabela not in CACHE_CATALOGO:
+        return
+    if linha_id is None:
+        CACHE_CATALOGO[tabela].clear()
+    else:
+        CACHE_CATALOGO[tabela].pop(linha_id, None)
+
+
+# ========== CONSULTAS EM LOTE ==========
+def buscar_por_ids(tabela, ids, campos):
+    """
+    Busca várias linhas de uma tabela em uma única requisição usando in_().
+    Retorna um dicionário {id: linha} para consulta rápida em memória.
+    Livros e membros passam pelo cache local: só os ids ausentes vão ao banco.
+    """
+    # set() remove ids repetidos — vários empréstimos podem apontar para o mesmo livro
+    ids_unicos = list({i for i in ids if i is not None})
+    if not ids_unicos:
+        return {}
+
+    if tabela in CACHE_CATALOGO:
+        encontrados, faltando = cache_obter(tabela, ids_unicos)
+        if faltando:
+            # Busca a linha completa para servir qualquer combinação de campos depois
+            resultado = (
+                obter_cliente().table(tabela).select("*").in_("id", faltando).execute()
+            )
+            cache_guardar(tabela, resultado.data)
+            encontrados.update({linha["id"]: linha for linha in resultado.data})
+        return encontrados
+
+    # O id sempre vem junto para montar o dicionário
+    resultado = (
+        obter_cliente()
+        .table(tabela)
+        .select(f"id, {campos}")
+        .in_("id", ids_unicos)
+        .execute()
+    )
+    return {linha["id"]: linha for linha in resultado.data}
+
+
+def juntar_emprestimos(emprestimos, campos_membro="nome", campos_livro="titulo"):
+    """
+    Resolve membro_id e livro_id de uma lista de empréstimos com uma requisição
+    por tabela (em vez de duas por empréstimo) e adiciona as chaves
+    'membro' e 'livro' em cada empréstimo. Referências inexistentes viram {}.
+    """
+    membros = buscar_por_ids(
+        TABELA_MEMBROS, [e["membro_id"] for e in emprestimos], campos_membro
+    )
+    livros = buscar_por_ids(
+        TABELA_LIVROS, [e["livro_id"] for e in emprestimos], campos_livro
+    )
+
+    for emp in emprestimos:
+        emp["membro"] = membros.get(emp["membro_id"], {})
+        emp["livro"] = livros.get(emp["livro_id"], {})
+    return emprestimos
+
+
+def contar_emprestimos_ativos(membro_ids):
+    """
+    Retorna {membro_id: quantidade de empréstimos ativos} para vários membros
+    com uma única requisição. Membros sem empréstimos ativos não aparecem.
+    """
+    if not membro_ids:
+        return {}
+
+    resultado = (
+        obter_cliente()
+        .table(VIEW_ATIVOS_POR_MEMBRO)
+        .select("membro_id, quantidade")
+        .in_("membro_id", list(membro_ids))
+        .execute()
+    )
+    return {linha["membro_id"]: linha["quantidade"] for linha in resultado.data}
+
+
+# ========== PAGINAÇÃO ==========
+def escapar_valor_filtro(valor):
+    """
+    Coloca um valor entre aspas para usar em filtros or_() do PostgREST.
+    Sem as aspas, títulos com vírgula ou parênteses quebrariam o filtro.
+    """
+    texto = str(valor).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{texto}"'
+
+
+def contar_linhas(tabela, filtrar_query=None):
+    """
+    Conta as linhas de uma tabela sem baixar os dados (count='exact').
+    'filtrar_query' funciona como em paginar().
+    """
+    query = obter_cliente().table(tabela).select("id", count="exact")
+    if filtrar_query is not None:
+        query = filtrar_query(query)
+    resultado = query.limit(1).execute()
+    return resultado.count or 0
+
+
+def paginar(
+    tabela,
+    campos,
+    coluna_ordem,
+    tamanho_pagina=TAMANHO_PAGINA,
+    filtrar_query=None,
+    decrescente=False,
+):
+    """
+    Gerador que percorre a tabela ordenada por (coluna_ordem, id) e devolve
+    uma página (lista de linhas) por vez, usando paginação por cursor (keyset):
+    cada página começa depois da última linha da anterior, em vez de usar
+    OFFSET, então o custo por página não cresce com o tamanho da tabela.
+    'filtrar_query' recebe a query e devolve a query com filtros extras.
+    'decrescente' inverte a ordem (mais recentes primeiro, por exemplo).
+    """
+    operador = "lt" if decrescente else "gt"
+    ultimo = None  # (valor da coluna de ordem, id) da última linha lida
+
+    while True:
+        query = obter_cliente().table(tabela).select(f"id, {campos}")
+        if filtrar_query is not None:
+            query = filtrar_query(query)
+
+        if ultimo is not None:
+            valor, ultimo_id = ultimo
+            valor = escapar_valor_filtro(valor)
+            query = query.or_(
+                f"{coluna_ordem}.{operador}.{valor},"
+                f"and({coluna_ordem}.eq.{valor},id.{operador}.{ultimo_id})"
+            )
+
+        resultado = (
+            query.order(coluna_ordem, desc=decrescente)
+            .order("id", desc=decrescente)
+            .limit(tamanho_pagina)
+            .execute()
+        )
+        pagina = resultado.data
+
+        if not pagina:
+            return
+
+        yield pagina
+
+        # Página incompleta significa que chegamos ao fim da tabela
+        if len(pagina) < tamanho_pagina:
+            return
+        ultimo = (pagina[-1][coluna_ordem], pagina[-1]["id"])
+
+
+def continuar_paginacao():
+    """Pergunta se o usuário quer ver a próxima página"""
+    resposta = input("\n  ENTER para a próxima página ou 'q' para parar: ")
+    return resposta.strip().lower() != "q"
+
+
+# ========== SELEÇÃO POR PREFIXO (TYPEAHEAD) ==========
+# Em vez de imprimir todos os membros/livros, o usuário digita o começo do
+# nome ou título e escolhe entre poucas sugestões. Se a tabela couber na
+# memória, um índice local (lista ordenada + busca binária) é montado uma vez
+# por sessão e cada busca leva menos de um milissegundo; senão cada busca é
+# uma consulta indexada ao banco com limite de resultados.
+# Cada índice é {"chaves": [texto normalizado], "linhas": [linha]}, com as
+# duas listas na mesma ordem — bisect trabalha sobre a lista de chaves.
+INDICES_PREFIXO = {}
+
+
+def normalizar_texto(texto):
+    """Remove acentos e coloca em minúsculas ('Ação' → 'acao') para comparar"""
+    sem_acentos = unicodedata.normalize("NFKD", str(texto))
+    return sem_acentos.encode("ascii", "ignore").decode("ascii").lower().strip()
+
+
+def construir_indice_prefixo(tabela, coluna, campos):
+    """Lê a tabela página por página e monta o índice ordenado pela coluna"""
+    pares = []
+    # Páginas grandes: com 100 mil linhas são ~100 requisições, não ~2000
+    for pagina in paginar(tabela, campos, coluna, TAMANHO_PAGINA_INDICE):
+        for linha in pagina:
+            pares.append((normalizar_texto(linha[coluna]), linha["id"], linha))
+
+    pares.sort(key=lambda par: (par[0], par[1]))
+    INDICES_PREFIXO[tabela] = {
+        "chaves": [par[0] for par in pares],
+        "linhas": [par[2] for par in pares],
+    }
+
+
+def indice_prefixo_adicionar(tabela, coluna, linha):
+    """Inclui uma linha recém-cadastrada no índice local (se ele existir)"""
+    indice = INDICES_PREFIXO.get(tabela)
+    if indice is None:
+        return
+    chave = normalizar_texto(linha[coluna])
+    posicao = bisect_left(indice["chaves"], chave)
+    indice["chaves"].insert(posicao, chave)
+    indice["linhas"].insert(posicao, linha)
+
+
+def buscar_prefixo_local(tabela, prefixo, filtro=None, limite=LIMITE_SUGESTOES):
+    """Busca binária no índice local: O(log n) até o primeiro resultado"""
+    indice = INDICES_PREFIXO[tabela]
+    chaves = indice["chaves"]
+    prefixo = normalizar_texto(prefixo)
+
+    encontrados = []
+    posicao = bisect_left(chaves, prefixo)
+    while posicao < len(chaves) and chaves[posicao].startswith(prefixo):
+        linha = indice["linhas"][posicao]
+        if filtro is None or filtro(linha):
+            encontrados.append(linha)
+            if len(encontrados) >= limite:
+                break
+        posicao += 1
+    return encontrados
+
+
+def buscar_prefixo_servidor(
+    tabela, coluna, campos, prefixo, filtrar_query=None, limite=LIMITE_SUGESTOES
+):
+    """Consulta 'começa com' no banco, limitada a poucas linhas"""
+    # Remove curingas digitados pelo usuário — a busca é sempre por prefixo
+    prefixo = prefixo.replace("%", "").replace("*", "")
+    query = (
+        obter_cliente()
+        .table(tabela)
+        .select(f"id, {campos}")
+        .ilike(coluna, f"{prefixo}%")
+    )
+    if filtrar_query is not None:
+        query = filtrar_query(query)
+    return query.order(coluna).limit(limite).execute().data
+
+
+def selecionar_por_prefixo(
+    tabela, coluna, campos, rotulo, descrever, filtro=None, filtrar_query=None
+):
+    """
+    Pergunta o começo do nome/título e mostra até LIMITE_SUGESTOES opções.
+    O usuário escolhe o número da opção, digita mais letras para refinar ou
+    informa o ID direto com '#' (ex.: #123), para que títulos só com números,
+    como "1984", continuem sendo buscados pelo começo. Retorna o id escolhido
+    ou None se cancelar.
+    'filtro' vale para o índice local e 'filtrar_query' para a consulta ao banco.
+    """
+    if tabela not in INDICES_PREFIXO and contar_linhas(tabela) <= LIMITE_INDICE_LOCAL:
+        construir_indice_prefixo(tabela, coluna, campos)
+
+    while True:
+        texto = input(f"\nDigite o início do {rotulo} ou #ID (ENTER cancela): ")
+        texto = texto.strip()
+        if not texto:
+            return None
+        if texto.startswith("#") and texto[1:].isdigit():
+            return int(texto[1:])
+
+        if tabela in INDICES_PREFIXO:
+            sugestoes = buscar_prefixo_local(tabela, texto, filtro)
+        else:
+            sugestoes = buscar_prefixo_servidor(
+                tabela, coluna, campos, texto, filtrar_query
+            )
+
+        if not sugestoes:
+            print(f"  ⚠ Nenhum {rotulo} começa com '{texto}'")
+            continue
+
+        for i, linha in enumerate(sugestoes, 1):
+            print(f"  {i:2d}. {descrever(linha)} (ID {linha['id']})")
+
+        escolha = input("  Número da opção (ENTER para buscar de novo): ").strip()
+        if escolha.isdigit() and 1 <= int(escolha) <= len(sugestoes):
+            return sugestoes[int(escolha) - 1]["id"]
 
 
 # ========== FUNÇÕES DE LIVROS ==========
@@ -165,6 +596,14 @@ def cadastrar_livro():
         print("✗ Digite valores numéricos válidos!")
         return
 
+    isbn_texto = input("ISBN (opcional, pode escanear): ").strip()
+    isbn = None
+    if isbn_texto:
+        isbn = normalizar_isbn(isbn_texto)
+        if isbn is None:
+            print("✗ ISBN inválido! Deve ter 10 ou 13 dígitos.")
+            return
+
     try:
         dados = {
             "titulo": titulo,
@@ -173,65 +612,91 @@ def cadastrar_livro():
             "ano_publicacao": ano,
             "quantidade_total": quantidade,
             "quantidade_disponivel": quantidade,
+            "isbn": isbn,
         }
 
-        resultado = supabase.table(TABELA_LIVROS).insert(dados).execute()
+        resultado = obter_cliente().table(TABELA_LIVROS).insert(dados).execute()
+        cache_guardar(TABELA_LIVROS, resultado.data)  # Já entra no cache local
+        for livro in resultado.data:
+            indice_prefixo_adicionar(TABELA_LIVROS, "titulo", livro)
+
+        # Os códigos de barras das cópias são criados no banco, junto com o
+        # insert (gatilho trg_livros_exemplares do biblioteca.sql)
+        livro_id = resultado.data[0]["id"]
 
         print(f"\n✓ Livro '{titulo}' cadastrado com sucesso!")
         print(f"  Autor: {autor} | Gênero: {genero} | Ano: {ano}")
         print(f"  Cópias: {quantidade}")
+        if isbn:
+            print(f"  ISBN: {isbn}")
+        print(f"  Etiquetas: EX{livro_id}-1 até EX{livro_id}-{quantidade}")
 
     except Exception as e:
-        print(f"✗ Erro ao cadastrar livro: {e}")
+        if isbn and ("duplicate" in str(e).lower() or "unique" in str(e).lower()):
+            print(f"✗ Já existe um livro com o ISBN '{isbn}'!")
+        else:
+            print(f"✗ Erro ao cadastrar livro: {e}")
 
 
 def listar_livros():
-    """Lista todos os livros do banco de dados"""
+    """Lista todos os livros do banco de dados, uma página por vez"""
     try:
-        resultado = supabase.table(TABELA_LIVROS).select("*").order("titulo").execute()
-        livros = resultado.data
+        total_livros = contar_linhas(TABELA_LIVROS)
 
-        if not livros:
+        if not total_livros:
             print("\n⚠ Nenhum livro cadastrado!")
             return
 
         print("\n" + "=" * 80)
-        print(f"📚 ACERVO DA BIBLIOTECA (Total: {len(livros)} títulos)")
+        print(f"📚 ACERVO DA BIBLIOTECA (Total: {total_livros} títulos)")
         print("=" * 80)
 
-        # Cabeçalho da tabela formatada
-        print(f"\n{'ID':<5} {'Título':<30} {'Autor':<20} {'Gênero':<15} {'Disp.':<6}")
-        print("-" * 80)
+        # Busca só as colunas exibidas, uma página por vez
+        paginas = paginar(
+            TABELA_LIVROS,
+            "titulo, autor, genero, quantidade_disponivel, quantidade_total",
+            "titulo",
+        )
 
-        for livro in livros:
-            # Trunca strings longas para manter formatação da tabela
-            titulo = (
-                livro["titulo"][:28] + ".."
-                if len(livro["titulo"]) > 30
-                else livro["titulo"]
-            )
-            autor = (
-                livro["autor"][:18] + ".."
-                if len(livro["autor"]) > 20
-                else livro["autor"]
+        for numero_pagina, livros in enumerate(paginas, 1):
+            if numero_pagina > 1 and not continuar_paginacao():
+                break
+
+            # Cabeçalho da tabela formatada
+            print(
+                f"\n{'ID':<5} {'Título':<30} {'Autor':<20} {'Gênero':<15} {'Disp.':<6}"
             )
+            print("-" * 80)
 
-            # Indicador visual de disponibilidade
-            disp = livro["quantidade_disponivel"]
-            total = livro["quantidade_total"]
-            indicador = f"{disp}/{total}"
+            for livro in livros:
+                # Trunca strings longas para manter formatação da tabela
+                titulo = (
+                    livro["titulo"][:28] + ".."
+                    if len(livro["titulo"]) > 30
+                    else livro["titulo"]
+                )
+                autor = (
+                    livro["autor"][:18] + ".."
+                    if len(livro["autor"]) > 20
+                    else livro["autor"]
+                )
 
-            # Usa cores visuais com emojis
-            if disp == 0:
-                status = "🔴"
-            elif disp < total:
-                status = "🟡"
-            else:
-                status = "🟢"
+                # Indicador visual de disponibilidade
+                disp = livro["quantidade_disponivel"]
+                total = livro["quantidade_total"]
+                indicador = f"{disp}/{total}"
 
-            print(
-                f"{livro['id']:<5} {titulo:<30} {autor:<20} {livro['genero']:<15} {status} {indicador}"
-            )
+                # Usa cores visuais com emojis
+                if disp == 0:
+                    status = "🔴"
+                elif disp < total:
+                    status = "🟡"
+                else:
+                    status = "🟢"
+
+                print(
+                    f"{livro['id']:<5} {titulo:<30} {autor:<20} {livro['genero']:<15} {status} {indicador}"
+                )
 
         print("-" * 80)
         print("🟢 Disponível | 🟡 Parcial | 🔴 Indisponível")
@@ -241,13 +706,14 @@ def listar_livros():
 
 
 def buscar_livro():
-    """Busca livros por título ou autor"""
+    """Busca livros por título, autor, gênero ou por relevância"""
     print("\n" + "=" * 60)
     print("🔍 BUSCAR LIVRO")
     print("=" * 60)
     print("1. Buscar por título")
     print("2. Buscar por autor")
     print("3. Buscar por gênero")
+    print("4. Busca inteligente (título, autor e gênero por relevância)")
 
     opcao = input("\nEscolha: ").strip()
     termo = input("Digite o termo de busca: ").strip()
@@ -260,18 +726,25 @@ def buscar_livro():
         # Usa um dicionário para mapear opção ao campo — mais elegante que if/elif
         campo_busca = {"1": "titulo", "2": "autor", "3": "genero"}
 
-        if opcao not in campo_busca:
+        if opcao == "4":
+            # Busca indexada no servidor (full-text + trigramas, sem acentos),
+            # já ordenada por relevância — ver buscar_livros_texto em biblioteca.sql
+            resultado = obter_cliente().rpc(
+                "buscar_livros_texto", {"p_termo": termo, "p_limite": LIMITE_BUSCA}
+            ).execute()
+        elif opcao in campo_busca:
+            campo = campo_busca[opcao]
+            resultado = (
+                obter_cliente()
+                .table(TABELA_LIVROS)
+                .select("*")
+                .ilike(campo, f"%{termo}%")
+                .execute()
+            )
+        else:
             print("✗ Opção inválida!")
             return
 
-        campo = campo_busca[opcao]
-
-        resultado = (
-            supabase.table(TABELA_LIVROS)
-            .select("*")
-            .ilike(campo, f"%{termo}%")
-            .execute()
-        )
         livros = resultado.data
 
         if not livros:
@@ -293,6 +766,129 @@ def buscar_livro():
         print(f"✗ Erro ao buscar livro: {e}")
 
 
+def ler_arquivo_livros(caminho):
+    """
+    Gerador que lê um arquivo CSV ou JSONL linha a linha (sem carregar tudo na
+    memória) e devolve (número da linha, dicionário com os campos).
+    """
+    with open(caminho, encoding="utf-8", newline="") as arquivo:
+        if caminho.lower().endswith((".jsonl", ".ndjson")):
+            for numero, texto in enumerate(arquivo, 1):
+                if not texto.strip():
+                    continue
+                try:
+                    yield numero, json.loads(texto)
+                except json.JSONDecodeError:
+                    yield numero, None  # validar_livro() rejeita a linha
+        else:
+            # Linha 1 é o cabeçalho, então os dados começam na linha 2
+            for numero, linha in enumerate(csv.DictReader(arquivo), 2):
+                yield numero, linha
+
+
+def gravar_lote_livros(lote):
+    """
+    Insere um lote de (número da linha, dados) num único insert multi-row e
+    devolve (quantidade inserida, [(número da linha, erro), ...]).
+    ISBN é único na tabela: um repetido derrubaria o insert do lote inteiro,
+    então repetidos dentro do lote e ISBNs já cadastrados (numa consulta só)
+    são separados antes e voltam como linhas rejeitadas.
+    """
+    isbns = {dados["isbn"] for _, dados in lote if dados["isbn"]}
+    cadastrados = set()
+    if isbns:
+        resposta = (
+            obter_cliente()
+            .table(TABELA_LIVROS)
+            .select("isbn")
+            .in_("isbn", list(isbns))
+            .execute()
+        )
+        cadastrados = {livro["isbn"] for livro in resposta.data}
+
+    novos = []
+    rejeitados = []
+    vistos = set()
+    for numero, dados in lote:
+        isbn = dados["isbn"]
+        if isbn in cadastrados:
+            rejeitados.append((numero, f"ISBN {isbn} já cadastrado"))
+        elif isbn in vistos:
+            rejeitados.append((numero, f"ISBN {isbn} repetido no arquivo"))
+        else:
+            if isbn:
+                vistos.add(isbn)
+            novos.append(dados)
+
+    if novos:
+        obter_cliente().table(TABELA_LIVROS).insert(novos).execute()
+    return len(novos), rejeitados
+
+
+def importar_livros(caminho, tamanho_lote=TAMANHO_LOTE_IMPORTACAO):
+    """
+    Importa livros em massa de um arquivo CSV ou JSONL.
+    Valida cada linha como o cadastrar_livro() e insere em lotes de
+    tamanho_lote livros por requisição. Mostra velocidade e linhas rejeitadas
+    (inclusive ISBNs repetidos ou já cadastrados).
+    """
+    print("\n" + "=" * 60)
+    print("📦 IMPORTAÇÃO DE LIVROS")
+    print("=" * 60)
+    print(f"  Arquivo: {caminho} | Lote: {tamanho_lote} livros/requisição")
+
+    lote = []
+    importados = 0
+    total_rejeitados = 0
+    rejeitados = []  # Guarda só os primeiros erros para exibir no final
+    inicio = time.perf_counter()
+
+    try:
+        for numero, linha in ler_arquivo_livros(caminho):
+            dados, erro = validar_livro(linha)
+            if erro:
+                total_rejeitados += 1
+                if len(rejeitados) < 20:
+                    rejeitados.append((numero, erro))
+                continue
+
+            lote.append((numero, dados))
+            if len(lote) >= tamanho_lote:
+                # Um único insert com várias linhas (multi-row)
+                inseridos, recusados = gravar_lote_livros(lote)
+                importados += inseridos
+                total_rejeitados += len(recusados)
+                rejeitados += recusados[: 20 - len(rejeitados)]
+                lote = []
+                print(f"  ... {importados} livros importados")
+
+        if lote:
+            inseridos, recusados = gravar_lote_livros(lote)
+            importados += inseridos
+            total_rejeitados += len(recusados)
+            rejeitados += recusados[: 20 - len(rejeitados)]
+
+    except FileNotFoundError:
+        print(f"✗ Arquivo '{caminho}' não encontrado!")
+        return
+    except Exception as e:
+        print(f"✗ Erro na importação (após {importados} livros): {e}")
+        return
+
+    duracao = time.perf_counter() - inicio
+    velocidade = importados / duracao if duracao > 0 else 0
+
+    print(f"\n✓ {importados} livro(s) importado(s) em {duracao:.1f}s")
+    print(f"  Velocidade: {velocidade:.0f} linhas/segundo")
+
+    if total_rejeitados:
+        print(f"\n⚠ {total_rejeitados} linha(s) rejeitada(s):")
+        for numero, erro in rejeitados:
+            print(f"    Linha {numero}: {erro}")
+        if total_rejeitados > len(rejeitados):
+            print(f"    ... e mais {total_rejeitados - len(rejeitados)}")
+
+
 # ========== FUNÇÕES DE MEMBROS ==========
 def cadastrar_membro():
     """Cadastra um novo membro da biblioteca"""
@@ -338,7 +934,10 @@ def cadastrar_membro():
             "ativo": True,
         }
 
-        resultado = supabase.table(TABELA_MEMBROS).insert(dados).execute()
+        resultado = obter_cliente().table(TABELA_MEMBROS).insert(dados).execute()
+        cache_guardar(TABELA_MEMBROS, resultado.data)  # Já entra no cache local
+        for membro in resultado.data:
+            indice_prefixo_adicionar(TABELA_MEMBROS, "nome", membro)
 
         prazo = PRAZO_ESTUDANTE if tipo == "Estudante" else PRAZO_PROFESSOR
         print(f"\n✓ Membro '{nome}' cadastrado com sucesso!")
@@ -353,45 +952,135 @@ def cadastrar_membro():
 
 
 def listar_membros():
-    """Lista todos os membros e seus empréstimos ativos"""
+    """Lista todos os membros e seus empréstimos ativos, uma página por vez"""
     try:
-        resultado = supabase.table(TABELA_MEMBROS).select("*").order("nome").execute()
-        membros = resultado.data
+        total_membros = contar_linhas(TABELA_MEMBROS)
 
-        if not membros:
+        if not total_membros:
             print("\n⚠ Nenhum membro cadastrado!")
             return
 
         print("\n" + "=" * 80)
-        print(f"👥 MEMBROS DA BIBLIOTECA (Total: {len(membros)})")
+        print(f"👥 MEMBROS DA BIBLIOTECA (Total: {total_membros})")
         print("=" * 80)
 
-        for membro in membros:
-            # Busca empréstimos ativos deste membro
-            emp_resultado = (
-                supabase.table(TABELA_EMPRESTIMOS)
-                .select("*")
-                .eq("membro_id", membro["id"])
-                .eq("status", "Ativo")
-                .execute()
-            )
-            emprestimos_ativos = len(emp_resultado.data)
+        paginas = paginar(TABELA_MEMBROS, "nome, email, telefone, tipo, ativo", "nome")
 
-            # Indicador de status do membro
-            status_membro = "✅ Ativo" if membro["ativo"] else "❌ Inativo"
+        for numero_pagina, membros in enumerate(paginas, 1):
+            if numero_pagina > 1 and not continuar_paginacao():
+                break
 
-            print(f"\n  👤 {membro['nome']} (ID: {membro['id']})")
-            print(f"     Email: {membro['email']}")
-            print(f"     Telefone: {membro.get('telefone', 'N/A') or 'N/A'}")
-            print(f"     Tipo: {membro['tipo']} | Status: {status_membro}")
-            print(f"     Empréstimos ativos: {emprestimos_ativos}/{LIMITE_EMPRESTIMOS}")
-            print("-" * 80)
+            # Contagem de empréstimos ativos de todos os membros da página
+            # em uma única requisição (view agrupada por membro_id)
+            contagens = contar_emprestimos_ativos([m["id"] for m in membros])
+
+            for membro in membros:
+                emprestimos_ativos = contagens.get(membro["id"], 0)
+
+                # Indicador de status do membro
+                status_membro = "✅ Ativo" if membro["ativo"] else "❌ Inativo"
+
+                print(f"\n  👤 {membro['nome']} (ID: {membro['id']})")
+                print(f"     Email: {membro['email']}")
+                print(f"     Telefone: {membro.get('telefone', 'N/A') or 'N/A'}")
+                print(f"     Tipo: {membro['tipo']} | Status: {status_membro}")
+                print(
+                    f"     Empréstimos ativos: {emprestimos_ativos}/{LIMITE_EMPRESTIMOS}"
+                )
+                print("-" * 80)
 
     except Exception as e:
         print(f"✗ Erro ao listar membros: {e}")
 
 
 # ========== FUNÇÕES DE EMPRÉSTIMOS ==========
+def emprestar(membro_id, livro_id, exemplar_id=None):
+    """
+    Executa o empréstimo completo no servidor com uma única requisição
+    (função emprestar_livro em biblioteca.sql): valida membro, limite,
+    disponibilidade e duplicidade, registra e baixa o estoque atomicamente.
+    exemplar_id identifica a cópia física quando ela foi escaneada.
+    Retorna o dicionário com o resultado ({'ok': True/False, ...}).
+    """
+    resultado = obter_cliente().rpc(
+        "emprestar_livro",
+        {
+            "p_membro_id": membro_id,
+            "p_livro_id": livro_id,
+            "p_limite": LIMITE_EMPRESTIMOS,
+            "p_prazo_estudante": PRAZO_ESTUDANTE,
+            "p_prazo_professor": PRAZO_PROFESSOR,
+            "p_exemplar_id": exemplar_id,
+        },
+    ).execute()
+    if resultado.data.get("ok"):
+        cache_invalidar(TABELA_LIVROS, livro_id)  # Estoque mudou
+    return resultado.data
+
+
+def exibir_resultado_emprestimo(resultado):
+    """Mostra na tela o resultado estruturado devolvido por emprestar()"""
+    if resultado.get("ok"):
+        print(f"\n{'=' * 60}")
+        print("✓ EMPRÉSTIMO REALIZADO COM SUCESSO!")
+        print(f"{'=' * 60}")
+        print(f"  Membro: {resultado['membro_nome']} ({resultado['membro_tipo']})")
+        print(f"  Livro: {resultado['livro_titulo']}")
+        print(f"  Data do empréstimo: {formatar_data(resultado['data_emprestimo'])}")
+        print(
+            f"  Data de devolução: {formatar_data(resultado['data_devolucao_prevista'])}"
+        )
+        print(f"  Prazo: {resultado['prazo_dias']} dias")
+        print(
+            f"  Empréstimos ativos: {resultado['emprestimos_ativos']}/{LIMITE_EMPRESTIMOS}"
+        )
+        return
+
+    # Dicionário de mensagens por código de erro — alternativa ao if/elif
+    mensagens = {
+        "membro_invalido": "✗ Membro não encontrado ou inativo!",
+        "limite_atingido": (
+            f"✗ Membro '{resultado.get('membro_nome')}' já atingiu o limite de "
+            f"{LIMITE_EMPRESTIMOS} empréstimos ativos!\n"
+            "  Devolva algum livro antes de realizar novo empréstimo."
+        ),
+        "emprestimo_duplicado": (
+            f"✗ Este membro já possui o livro '{resultado.get('livro_titulo')}' emprestado!"
+        ),
+        "livro_indisponivel": "✗ Livro não encontrado ou indisponível!",
+        "exemplar_emprestado": "✗ Esta cópia já consta como emprestada!",
+    }
+    erro = resultado.get("erro")
+    print(mensagens.get(erro, f"✗ Empréstimo recusado: {erro}"))
+
+
+def reservar(membro_id, livro_id):
+    """Coloca o membro na fila de reservas do livro (função reservar_livro)"""
+    resultado = obter_cliente().rpc(
+        "reservar_livro", {"p_membro_id": membro_id, "p_livro_id": livro_id}
+    ).execute()
+    reserva = resultado.data
+
+    if reserva.get("ok"):
+        print(f"\n✓ Reserva registrada! Posição na fila: {reserva['posicao']}º")
+        print("  A próxima cópia devolvida será separada na ordem da fila")
+        print("  (professores têm prioridade sobre estudantes).")
+        return
+
+    mensagens = {
+        "membro_invalido": "✗ Membro não encontrado ou inativo!",
+        "emprestimo_duplicado": "✗ Este membro já está com este livro emprestado!",
+        "reserva_duplicada": "✗ Este membro já tem reserva para este livro!",
+        "livro_invalido": "✗ Livro não encontrado!",
+        "livro_disponivel": (
+            f"✗ Há {reserva.get('disponiveis')} cópia(s) disponível(is): "
+            "faça o empréstimo direto, sem reserva."
+        ),
+    }
+    erro = reserva.get("erro")
+    print(mensagens.get(erro, f"✗ Reserva recusada: {erro}"))
+
+
 def realizar_emprestimo():
     """Realiza um novo empréstimo com validações completas"""
     print("\n" + "=" * 60)
@@ -399,126 +1088,45 @@ def realizar_emprestimo():
     print("=" * 60)
 
     try:
-        # ---- PASSO 1: Selecionar o membro ----
-        membros_result = (
-            supabase.table(TABELA_MEMBROS)
-            .select("id, nome, tipo, ativo")
-            .eq("ativo", True)
-            .order("nome")
-            .execute()
-        )
-        membros = membros_result.data
-
-        if not membros:
-            print("✗ Nenhum membro ativo cadastrado!")
-            return
-
-        print("\nMembros ativos:")
-        for m in membros:
-            print(f"  ID {m['id']}: {m['nome']} ({m['tipo']})")
-
-        membro_id = int(input("\nDigite o ID do membro: "))
-
-        # Busca o membro selecionado usando list comprehension com next()
-        membro = next((m for m in membros if m["id"] == membro_id), None)
-        if membro is None:
-            print("✗ Membro não encontrado ou inativo!")
-            return
-
-        # ---- PASSO 2: Verificar limite de empréstimos ----
-        emp_ativos_result = (
-            supabase.table(TABELA_EMPRESTIMOS)
-            .select("id")
-            .eq("membro_id", membro_id)
-            .eq("status", "Ativo")
-            .execute()
-        )
-        qtd_emprestimos_ativos = len(emp_ativos_result.data)
-
-        if qtd_emprestimos_ativos >= LIMITE_EMPRESTIMOS:
-            print(
-                f"✗ Membro '{membro['nome']}' já atingiu o limite de {LIMITE_EMPRESTIMOS} empréstimos ativos!"
-            )
-            print("  Devolva algum livro antes de realizar novo empréstimo.")
-            return
-
-        print(f"\n✓ Membro: {membro['nome']} ({membro['tipo']})")
-        print(f"  Empréstimos ativos: {qtd_emprestimos_ativos}/{LIMITE_EMPRESTIMOS}")
-
-        # ---- PASSO 3: Selecionar o livro ----
-        livros_result = (
-            supabase.table(TABELA_LIVROS)
-            .select("id, titulo, autor, quantidade_disponivel")
-            .gt("quantidade_disponivel", 0)  # Apenas livros disponíveis
-            .order("titulo")
-            .execute()
+        # ---- PASSO 1: Selecionar o membro (busca pelo começo do nome) ----
+        membro_id = selecionar_por_prefixo(
+            TABELA_MEMBROS,
+            "nome",
+            "nome, tipo, ativo",
+            "nome do membro",
+            lambda m: f"{m['nome']} ({m['tipo']})",
+            filtro=lambda m: m["ativo"],
+            filtrar_query=lambda q: q.eq("ativo", True),
         )
-        livros = livros_result.data
-
-        if not livros:
-            print("✗ Nenhum livro disponível para empréstimo!")
-            return
-
-        print("\nLivros disponíveis:")
-        for l in livros:
-            print(
-                f"  ID {l['id']}: {l['titulo']} - {l['autor']} (Disponível: {l['quantidade_disponivel']})"
-            )
-
-        livro_id = int(input("\nDigite o ID do livro: "))
-
-        # Verifica se o livro está na lista de disponíveis
-        livro = next((l for l in livros if l["id"] == livro_id), None)
-        if livro is None:
-            print("✗ Livro não encontrado ou indisponível!")
+        if membro_id is None:
+            print("  Operação cancelada.")
             return
 
-        # ---- PASSO 4: Verificar se já tem este livro emprestado ----
-        ja_emprestado = (
-            supabase.table(TABELA_EMPRESTIMOS)
-            .select("id")
-            .eq("membro_id", membro_id)
-            .eq("livro_id", livro_id)
-            .eq("status", "Ativo")
-            .execute()
+        # ---- PASSO 2: Selecionar o livro (busca pelo começo do título) ----
+        # Livros sem cópia também aparecem, para permitir a reserva;
+        # a disponibilidade é conferida no servidor ao emprestar
+        livro_id = selecionar_por_prefixo(
+            TABELA_LIVROS,
+            "titulo",
+            "titulo, autor",
+            "título do livro",
+            lambda l: f"{l['titulo']} - {l['autor']}",
         )
-        if ja_emprestado.data:
-            print(f"✗ Este membro já possui o livro '{livro['titulo']}' emprestado!")
+        if livro_id is None:
+            print("  Operação cancelada.")
             return
 
-        # ---- PASSO 5: Calcular datas ----
-        data_emprestimo = date.today()
-        prazo_dias = (
-            PRAZO_PROFESSOR if membro["tipo"] == "Professor" else PRAZO_ESTUDANTE
-        )
-        data_devolucao_prevista = data_emprestimo + timedelta(days=prazo_dias)
-
-        # ---- PASSO 6: Registrar o empréstimo ----
-        dados_emprestimo = {
-            "livro_id": livro_id,
-            "membro_id": membro_id,
-            "data_emprestimo": data_emprestimo.isoformat(),
-            "data_devolucao_prevista": data_devolucao_prevista.isoformat(),
-            "data_devolucao_real": None,
-            "status": "Ativo",
-            "multa": 0,
-        }
-        supabase.table(TABELA_EMPRESTIMOS).insert(dados_emprestimo).execute()
-
-        # ---- PASSO 7: Atualizar disponibilidade do livro ----
-        nova_quantidade = livro["quantidade_disponivel"] - 1
-        supabase.table(TABELA_LIVROS).update(
-            {"quantidade_disponivel": nova_quantidade}
-        ).eq("id", livro_id).execute()
+        # ---- PASSO 3: Validar e registrar tudo em uma única requisição ----
+        # Limite de empréstimos, disponibilidade e duplicidade são conferidos
+        # no servidor, na mesma transação que registra o empréstimo
+        resultado = emprestar(membro_id, livro_id)
+        exibir_resultado_emprestimo(resultado)
 
-        print(f"\n{'=' * 60}")
-        print("✓ EMPRÉSTIMO REALIZADO COM SUCESSO!")
-        print(f"{'=' * 60}")
-        print(f"  Membro: {membro['nome']}")
-        print(f"  Livro: {livro['titulo']}")
-        print(f"  Data do empréstimo: {formatar_data(data_emprestimo)}")
-        print(f"  Data de devolução: {formatar_data(data_devolucao_prevista)}")
-        print(f"  Prazo: {prazo_dias} dias")
+        # ---- PASSO 4: Sem cópia disponível? Oferece entrar na fila ----
+        if resultado.get("erro") == "livro_indisponivel":
+            resposta = input("\n  Deseja reservar este livro? (s/n): ").strip().lower()
+            if resposta == "s":
+                reservar(membro_id, livro_id)
 
     except ValueError:
         print("✗ Digite um ID válido!")
@@ -533,102 +1141,91 @@ def devolver_livro():
     print("=" * 60)
 
     try:
-        # Busca empréstimos ativos
-        emp_result = (
-            supabase.table(TABELA_EMPRESTIMOS)
-            .select("*")
-            .eq("status", "Ativo")
-            .order("data_devolucao_prevista")
-            .execute()
-        )
-        emprestimos = emp_result.data
-
-        if not emprestimos:
-            print("⚠ Nenhum empréstimo ativo no momento!")
-            return
-
-        print("\nEmpréstimos ativos:")
-        print(
-            f"\n{'ID':<5} {'Membro':<20} {'Livro':<25} {'Devolução Prevista':<18} {'Status'}"
+        # Empréstimos ativos uma página por vez, com membro e livro resolvidos
+        # por página (juntar_emprestimos): nunca a lista inteira de uma vez
+        paginas = paginar(
+            TABELA_EMPRESTIMOS,
+            "membro_id, livro_id, data_devolucao_prevista",
+            "data_devolucao_prevista",
+            filtrar_query=lambda q: q.eq("status", "Ativo"),
         )
-        print("-" * 80)
 
-        for emp in emprestimos:
-            # Busca nome do membro e título do livro
-            membro_res = (
-                supabase.table(TABELA_MEMBROS)
-                .select("nome")
-                .eq("id", emp["membro_id"])
-                .execute()
-            )
-            livro_res = (
-                supabase.table(TABELA_LIVROS)
-                .select("titulo")
-                .eq("id", emp["livro_id"])
-                .execute()
+        exibidos = {}  # id → empréstimo, só das páginas já mostradas
+        emp_id = None
+        for emprestimos in paginas:
+            if not exibidos:
+                print("\nEmpréstimos ativos:")
+            print(
+                f"\n{'ID':<5} {'Membro':<20} {'Livro':<25} {'Devolução Prevista':<18} {'Status'}"
             )
+            print("-" * 80)
 
-            nome_membro = (
-                membro_res.data[0]["nome"] if membro_res.data else "Desconhecido"
-            )
-            titulo_livro = (
-                livro_res.data[0]["titulo"] if livro_res.data else "Desconhecido"
-            )
+            # Busca nomes dos membros e títulos dos livros da página de uma vez só
+            juntar_emprestimos(emprestimos)
+            calcular_atrasos_em_lote(emprestimos)
 
-            # Trunca para manter formatação
-            nome_membro = (
-                nome_membro[:18] + ".." if len(nome_membro) > 20 else nome_membro
-            )
-            titulo_livro = (
-                titulo_livro[:23] + ".." if len(titulo_livro) > 25 else titulo_livro
-            )
+            for emp in emprestimos:
+                exibidos[emp["id"]] = emp
+                nome_membro = emp["membro"].get("nome", "Desconhecido")
+                titulo_livro = emp["livro"].get("titulo", "Desconhecido")
 
-            dias_atraso = calcular_dias_atraso(emp["data_devolucao_prevista"])
-            status_texto = (
-                f"⚠ {dias_atraso}d atraso" if dias_atraso > 0 else "✓ No prazo"
-            )
+                # Trunca para manter formatação
+                nome_membro = (
+                    nome_membro[:18] + ".." if len(nome_membro) > 20 else nome_membro
+                )
+                titulo_livro = (
+                    titulo_livro[:23] + ".." if len(titulo_livro) > 25 else titulo_livro
+                )
 
-            print(
-                f"{emp['id']:<5} {nome_membro:<20} {titulo_livro:<25} {formatar_data(emp['data_devolucao_prevista']):<18} {status_texto}"
-            )
+                dias_atraso = emp["dias_atraso"]
+                status_texto = (
+                    f"⚠ {dias_atraso}d atraso" if dias_atraso > 0 else "✓ No prazo"
+                )
 
-        print("-" * 80)
+                print(
+                    f"{emp['id']:<5} {nome_membro:<20} {titulo_livro:<25} {formatar_data(emp['data_devolucao_prevista']):<18} {status_texto}"
+                )
+
+            print("-" * 80)
+            if len(emprestimos) < TAMANHO_PAGINA:
+                break  # Última página: o ID é pedido logo abaixo
+            resposta = input(
+                "\nDigite o ID do empréstimo para devolver (ENTER para a próxima página): "
+            ).strip()
+            if resposta:
+                emp_id = int(resposta)
+                break
+
+        if not exibidos:
+            print("⚠ Nenhum empréstimo ativo no momento!")
+            return
 
-        emp_id = int(input("\nDigite o ID do empréstimo para devolver: "))
+        if emp_id is None:
+            emp_id = int(input("\nDigite o ID do empréstimo para devolver: "))
 
         # Busca o empréstimo selecionado
-        emprestimo = next((e for e in emprestimos if e["id"] == emp_id), None)
+        emprestimo = exibidos.get(emp_id)
         if emprestimo is None:
             print("✗ Empréstimo não encontrado!")
             return
 
-        # Calcula multa por atraso
+        # Multa por atraso (já calculada na listagem)
         data_hoje = date.today()
-        dias_atraso = calcular_dias_atraso(emprestimo["data_devolucao_prevista"])
-        multa = round(dias_atraso * MULTA_POR_DIA, 2)
-
-        # Atualiza o empréstimo
-        dados_atualizacao = {
-            "data_devolucao_real": data_hoje.isoformat(),
-            "status": "Devolvido",
-            "multa": multa,
-        }
-        supabase.table(TABELA_EMPRESTIMOS).update(dados_atualizacao).eq(
-            "id", emp_id
+        dias_atraso = emprestimo["dias_atraso"]
+        multa = emprestimo["multa_estimada"]
+
+        # Fecha o empréstimo e entrega a cópia ao próximo da fila de reservas
+        # (ou devolve ao estoque) em uma única chamada atômica
+        # (função registrar_devolucao em biblioteca.sql)
+        devolucao = obter_cliente().rpc(
+            "registrar_devolucao",
+            {
+                "p_emprestimo_id": emp_id,
+                "p_data_devolucao": data_hoje.isoformat(),
+                "p_multa": multa,
+            },
         ).execute()
-
-        # Devolve o livro ao estoque (incrementa quantidade_disponivel)
-        livro_res = (
-            supabase.table(TABELA_LIVROS)
-            .select("quantidade_disponivel")
-            .eq("id", emprestimo["livro_id"])
-            .execute()
-        )
-        if livro_res.data:
-            nova_qtd = livro_res.data[0]["quantidade_disponivel"] + 1
-            supabase.table(TABELA_LIVROS).update(
-                {"quantidade_disponivel": nova_qtd}
-            ).eq("id", emprestimo["livro_id"]).execute()
+        cache_invalidar(TABELA_LIVROS, emprestimo["livro_id"])  # Estoque mudou
 
         # Resultado da devolução
         print(f"\n{'=' * 60}")
@@ -642,12 +1239,505 @@ def devolver_livro():
         else:
             print("  ✓ Devolvido dentro do prazo! Sem multa.")
 
+        if devolucao.data.get("reserva_membro_id"):
+            print(
+                f"\n  📌 SEPARAR ESTA CÓPIA: reservada para {devolucao.data['reserva_membro_nome']}"
+                f" (ID {devolucao.data['reserva_membro_id']})"
+            )
+
     except ValueError:
         print("✗ Digite um ID válido!")
     except Exception as e:
         print(f"✗ Erro ao devolver livro: {e}")
 
 
+def ler_ids_em_lote():
+    """
+    Lê ids digitados ou escaneados, vários por linha (separados por vírgula
+    ou espaço) ou um por linha, até uma linha vazia. Ids repetidos são
+    mantidos: escanear o mesmo livro duas vezes devolve duas cópias.
+    """
+    print("Digite ou escaneie os IDs (linha vazia para terminar):")
+    ids = []
+    while True:
+        linha = input("  > ").strip()
+        if not linha:
+            return ids
+        for parte in linha.replace(",", " ").split():
+            ids.append(int(parte))
+
+
+def devolver_em_lote():
+    """
+    Devolve vários livros de uma vez, a partir dos IDs dos empréstimos ou dos
+    IDs dos livros escaneados. Usa no máximo duas requisições, seja qual for
+    o tamanho do lote.
+    """
+    print("\n" + "=" * 60)
+    print("📦 DEVOLUÇÃO EM LOTE")
+    print("=" * 60)
+    print("1. Por ID do empréstimo")
+    print("2. Por ID do livro (leitor de código)")
+
+    opcao = input("\nEscolha: ").strip()
+    if opcao not in ("1", "2"):
+        print("✗ Opção inválida!")
+        return
+
+    try:
+        ids = ler_ids_em_lote()
+        if not ids:
+            print("⚠ Nenhum ID informado!")
+            return
+
+        if opcao == "1":
+            emprestimo_ids = list(set(ids))
+        else:
+            # Uma requisição: empréstimos ativos dos livros escaneados, do mais
+            # antigo para o mais novo. Cada leitura fecha o mais antigo ainda aberto.
+            ativos_res = (
+                obter_cliente()
+                .table(TABELA_EMPRESTIMOS)
+                .select("id, livro_id")
+                .eq("status", "Ativo")
+                .in_("livro_id", list(set(ids)))
+                .order("data_emprestimo")
+                .order("id")
+                .execute()
+            )
+            abertos_por_livro = {}
+            for emp in ativos_res.data:
+                abertos_por_livro.setdefault(emp["livro_id"], []).append(emp["id"])
+
+            emprestimo_ids = []
+            for livro_id in ids:
+                abertos = abertos_por_livro.get(livro_id)
+                if abertos:
+                    emprestimo_ids.append(abertos.pop(0))
+                else:
+                    print(f"  ⚠ Livro {livro_id}: nenhum empréstimo ativo")
+
+            if not emprestimo_ids:
+                print("✗ Nenhum empréstimo ativo encontrado para os livros informados!")
+                return
+
+        # Uma requisição: fecha todos, calcula multas e devolve o estoque
+        # (função registrar_devolucoes_em_lote em biblioteca.sql)
+        data_hoje = date.today()
+        resultado = obter_cliente().rpc(
+            "registrar_devolucoes_em_lote",
+            {
+                "p_emprestimo_ids": emprestimo_ids,
+                "p_data_devolucao": data_hoje.isoformat(),
+                "p_multa_por_dia": MULTA_POR_DIA,
+            },
+        ).execute()
+        devolvidos = resultado.data
+
+        for linha in devolvidos:
+            cache_invalidar(TABELA_LIVROS, linha["livro_id"])  # Estoque mudou
+
+        ignorados = len(emprestimo_ids) - len(devolvidos)
+        atrasados = [d for d in devolvidos if d["dias_atraso"] > 0]
+        total_multas = sum(float(d["multa"] or 0) for d in devolvidos)
+
+        print(f"\n{'=' * 60}")
+        print("✓ DEVOLUÇÃO EM LOTE CONCLUÍDA!")
+        print(f"{'=' * 60}")
+        print(f"  Data de devolução: {formatar_data(data_hoje)}")
+        print(f"  Livros devolvidos: {len(devolvidos)}")
+        if ignorados:
+            print(f"  ⚠ Ignorados (não encontrados ou já devolvidos): {ignorados}")
+        if atrasados:
+            print(f"\n  ⚠ Devoluções com atraso: {len(atrasados)}")
+            for d in atrasados:
+                print(
+                    f"    Empréstimo #{d['emprestimo_id']}: {d['dias_atraso']} dia(s) — R$ {float(d['multa']):.2f}"
+                )
+            print(f"  💰 Total em multas: R$ {total_multas:.2f}")
+        else:
+            print("  ✓ Todos devolvidos dentro do prazo! Sem multa.")
+
+        reservados = [d for d in devolvidos if d["reserva_membro_id"]]
+        if reservados:
+            print(f"\n  📌 Cópias a separar para reservas: {len(reservados)}")
+            for d in reservados:
+                print(
+                    f"    Empréstimo #{d['emprestimo_id']} (livro {d['livro_id']}) → membro ID {d['reserva_membro_id']}"
+                )
+
+    except ValueError:
+        print("✗ Digite apenas IDs numéricos!")
+    except Exception as e:
+        print(f"✗ Erro na devolução em lote: {e}")
+
+
+def arquivar_historico(horizonte_dias=HORIZONTE_ARQUIVO_DIAS):
+    """
+    Move empréstimos devolvidos há mais de horizonte_dias para o arquivo
+    (função arquivar_emprestimos em biblioteca.sql). A tabela de empréstimos
+    fica pequena e as estatísticas continuam contando o histórico pelo resumo.
+    """
+    print("\n" + "=" * 60)
+    print("🗄️  ARQUIVAR HISTÓRICO DE EMPRÉSTIMOS")
+    print("=" * 60)
+    print(f"  Devolvidos há mais de {horizonte_dias} dias serão arquivados.")
+
+    try:
+        inicio = time.perf_counter()
+        resultado = obter_cliente().rpc(
+            "arquivar_emprestimos", {"p_horizonte_dias": horizonte_dias}
+        ).execute()
+        duracao = time.perf_counter() - inicio
+
+        print(f"\n✓ {resultado.data} empréstimo(s) arquivado(s) em {duracao:.1f}s")
+
+    except Exception as e:
+        print(f"✗ Erro ao arquivar histórico: {e}")
+
+
+# ========== AVISOS DE ATRASO ==========
+def paginar_atrasados_por_membro():
+    """
+    Gerador que percorre os empréstimos atrasados página por página, ordenados
+    por membro, e devolve (membro, [empréstimos]) — um grupo por membro.
+    O grupo de um membro pode começar em uma página e terminar na seguinte,
+    por isso o último grupo só é entregue quando aparece outro membro.
+    """
+    hoje = date.today().isoformat()
+    paginas = paginar(
+        TABELA_EMPRESTIMOS,
+        "membro_id, livro_id, data_devolucao_prevista",
+        "membro_id",
+        filtrar_query=lambda q: q.eq("status", "Ativo").lt(
+            "data_devolucao_prevista", hoje
+        ),
+    )
+
+    grupo_atual = []
+    for pagina in paginas:
+        juntar_emprestimos(
+            pagina, campos_membro="nome, email, telefone", campos_livro="titulo"
+        )
+        calcular_atrasos_em_lote(pagina)
+
+        for emp in pagina:
+            if grupo_atual and grupo_atual[0]["membro_id"] != emp["membro_id"]:
+                yield grupo_atual[0]["membro"], grupo_atual
+                grupo_atual = []
+            grupo_atual.append(emp)
+
+    if grupo_atual:
+        yield grupo_atual[0]["membro"], grupo_atual
+
+
+def montar_aviso_atraso(membro, emprestimos):
+    """Monta o texto do aviso com todos os livros atrasados do membro"""
+    linhas = [f"Olá, {membro.get('nome', 'leitor(a)')}!", ""]
+    linhas.append("Os livros abaixo estão com a devolução atrasada:")
+    for emp in emprestimos:
+        titulo = emp["livro"].get("titulo", "Livro")
+        linhas.append(
+            f"  - {titulo}: {emp['dias_atraso']} dia(s) de atraso "
+            f"(multa estimada R$ {emp['multa_estimada']:.2f})"
+        )
+    total = sum(emp["multa_estimada"] for emp in emprestimos)
+    linhas += ["", f"Multa total estimada: R$ {total:.2f}", "Biblioteca"]
+    return "\n".join(linhas)
+
+
+async def enviar_para_arquivo(membro, mensagem):
+    """
+    Enviador local (para testes e homologação): grava cada aviso como uma
+    linha JSON em NOTIFICACOES_ARQUIVO, indicando email e/ou telefone.
+    """
+    registro = {
+        "membro_id": membro.get("id"),
+        "email": membro.get("email") if validar_email(membro.get("email") or "") else None,
+        "telefone": (
+            membro.get("telefone")
+            if validar_telefone(membro.get("telefone") or "")
+            else None
+        ),
+        "mensagem": mensagem,
+    }
+
+    import asyncio
+
+    def gravar():
+        with open(NOTIFICACOES_ARQUIVO, "a", encoding="utf-8") as arquivo:
+            arquivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+    await asyncio.to_thread(gravar)  # Não bloqueia os outros envios
+
+
+async def enviar_por_smtp(membro, mensagem):
+    """
+    Envia o aviso por email via SMTP (SMTP_HOST/SMTP_PORT do .env).
+    Para testar localmente: python -m aiosmtpd -n -l localhost:1025
+    """
+    import asyncio
+    import smtplib  # Só é carregado quando o canal SMTP é usado
+
+    email = membro.get("email") or ""
+    if not validar_email(email):
+        raise ValueError(f"membro {membro.get('id')} sem email válido")
+
+    host = os.getenv("SMTP_HOST", "localhost")
+    porta = int(os.getenv("SMTP_PORT", "1025"))
+    remetente = os.getenv("SMTP_REMETENTE", "biblioteca@localhost")
+    corpo = (
+        f"From: {remetente}\r\nTo: {email}\r\n"
+        f"Subject: Livros em atraso\r\n\r\n{mensagem}"
+    )
+
+    def enviar():
+        with smtplib.SMTP(host, porta, timeout=30) as servidor:
+            servidor.sendmail(remetente, [email], corpo.encode("utf-8"))
+
+    await asyncio.to_thread(enviar)  # smtplib é bloqueante: roda em outra thread
+
+
+# Enviadores disponíveis — para adicionar um novo canal (ex: SMS), basta
+# escrever uma função async (membro, mensagem) e registrá-la aqui
+ENVIADORES = {"arquivo": enviar_para_arquivo, "smtp": enviar_por_smtp}
+
+
+def criar_limitador(por_segundo):
+    """
+    Cria uma função async que, chamada antes de cada envio, garante no
+    máximo 'por_segundo' envios por segundo (espaçamento mínimo entre eles).
+    """
+    import asyncio
+
+    intervalo = 1 / por_segundo
+    estado = {"proximo": 0.0}
+    trava = asyncio.Lock()
+
+    async def aguardar():
+        async with trava:
+            agora = time.monotonic()
+            espera = estado["proximo"] - agora
+            estado["proximo"] = max(agora, estado["proximo"]) + intervalo
+        if espera > 0:
+            await asyncio.sleep(espera)
+
+    return aguardar
+
+
+async def notificar_atrasados_async(
+    enviar, concorrencia=NOTIFICACOES_CONCORRENCIA, por_segundo=NOTIFICACOES_POR_SEGUNDO
+):
+    """
+    Lê os atrasados por membro (em uma thread, pois o cliente é síncrono) e
+    coloca cada grupo em uma fila limitada; 'concorrencia' tarefas consomem a
+    fila e enviam os avisos, respeitando o limitador de envios por segundo.
+    """
+    import asyncio
+
+    fila = asyncio.Queue(maxsize=concorrencia * 2)  # Memória limitada
+    aguardar_vez = criar_limitador(por_segundo)
+    contadores = {"enviados": 0, "falhas": 0, "emprestimos": 0}
+    fim = object()  # Marcador de fim da fila
+
+    def produzir(loop):
+        try:
+            for membro, emprestimos in paginar_atrasados_por_membro():
+                asyncio.run_coroutine_threadsafe(
+                    fila.put((membro, emprestimos)), loop
+                ).result()
+        finally:
+            # Mesmo se a leitura falhar, libera os consumidores
+            for _ in range(concorrencia):
+                asyncio.run_coroutine_threadsafe(fila.put(fim), loop).result()
+
+    async def consumir():
+        while True:
+            item = await fila.get()
+            if item is fim:
+                return
+            membro, emprestimos = item
+            await aguardar_vez()
+            try:
+                await enviar(membro, montar_aviso_atraso(membro, emprestimos))
+                contadores["enviados"] += 1
+                contadores["emprestimos"] += len(emprestimos)
+            except Exception as e:
+                contadores["falhas"] += 1
+                print(f"  ✗ Falha ao avisar membro {membro.get('id')}: {e}")
+
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(
+        asyncio.to_thread(produzir, loop),
+        *(consumir() for _ in range(concorrencia)),
+    )
+    return contadores
+
+
+def notificar_atrasados(canal="arquivo"):
+    """Envia avisos a todos os membros com empréstimos atrasados"""
+    # asyncio só é importado aqui (e nos enviadores): custa dezenas de ms na
+    # inicialização e só é usado nos avisos, como o smtplib
+    import asyncio
+
+    print("\n" + "=" * 60)
+    print("🔔 AVISOS DE ATRASO")
+    print("=" * 60)
+
+    if canal not in ENVIADORES:
+        print(f"✗ Canal inválido! Use: {', '.join(ENVIADORES)}")
+        return
+
+    print(
+        f"  Canal: {canal} | Concorrência: {NOTIFICACOES_CONCORRENCIA} | "
+        f"Limite: {NOTIFICACOES_POR_SEGUNDO}/s"
+    )
+
+    try:
+        inicio = time.perf_counter()
+        contadores = asyncio.run(notificar_atrasados_async(ENVIADORES[canal]))
+        duracao = time.perf_counter() - inicio
+        vazao = contadores["enviados"] / duracao if duracao > 0 else 0
+
+        print(f"\n✓ {contadores['enviados']} aviso(s) enviado(s) em {duracao:.1f}s")
+        print(f"  Empréstimos atrasados cobertos: {contadores['emprestimos']}")
+        print(f"  Vazão: {vazao:.1f} avisos/segundo")
+        if contadores["falhas"]:
+            print(f"  ⚠ Falhas: {contadores['falhas']}")
+
+    except Exception as e:
+        print(f"✗ Erro ao enviar avisos: {e}")
+
+
+# ========== CÓDIGO DE BARRAS / ISBN ==========
+# Código lido → {livro_id, exemplar_id, titulo}. ISBN e etiquetas quase não
+# mudam, então cada código consultado fica guardado e as próximas leituras do
+# mesmo código são resolvidas na memória, sem requisição. Mesmas regras do
+# cache do catálogo: entradas de (momento da leitura, resultado) que vencem
+# em CACHE_TTL_SEGUNDOS (título editado, exemplar baixado) e no máximo
+# CACHE_MAX_ITENS códigos, saindo primeiro o menos usado (LRU).
+CACHE_CODIGOS = OrderedDict()
+
+
+def resolver_codigo(codigo):
+    """Traduz um código de barras de exemplar ou ISBN (função resolver_codigo)"""
+    codigo = codigo.strip()
+    entrada = CACHE_CODIGOS.get(codigo)
+    if entrada is not None and time.monotonic() - entrada[0] < CACHE_TTL_SEGUNDOS:
+        CACHE_CODIGOS.move_to_end(codigo)  # Marca como usado recentemente
+        return entrada[1]
+    CACHE_CODIGOS.pop(codigo, None)  # Remove a entrada expirada, se houver
+
+    # Leitores de ISBN às vezes mandam hífens; etiquetas EX... ficam como estão
+    isbn = normalizar_isbn(codigo)
+    resultado = (
+        obter_cliente()
+        .rpc("resolver_codigo", {"p_codigo": isbn or codigo})
+        .execute()
+    )
+    encontrado = resultado.data or None
+    if encontrado:
+        CACHE_CODIGOS[codigo] = (time.monotonic(), encontrado)
+        while len(CACHE_CODIGOS) > CACHE_MAX_ITENS:
+            CACHE_CODIGOS.popitem(last=False)  # Remove a menos usada
+    return encontrado
+
+
+def emprestimo_por_codigo():
+    """
+    Empréstimo no balcão com leitor: informa o membro uma vez e escaneia
+    quantos livros quiser. Cada leitura vai direto do código ao empréstimo.
+    """
+    print("\n" + "=" * 60)
+    print("🔖 EMPRÉSTIMO POR CÓDIGO")
+    print("=" * 60)
+
+    try:
+        membro_id = int(input("ID do membro (cartão): "))
+    except ValueError:
+        print("✗ Digite um ID válido!")
+        return
+
+    print("Escaneie o código do exemplar ou o ISBN (linha vazia para terminar):")
+    while True:
+        codigo = input("  > ").strip()
+        if not codigo:
+            return
+
+        try:
+            item = resolver_codigo(codigo)
+            if item is None:
+                print(f"  ✗ Código '{codigo}' não cadastrado!")
+                continue
+
+            resultado = emprestar(membro_id, item["livro_id"], item["exemplar_id"])
+            if resultado.get("ok"):
+                print(
+                    f"  ✓ {resultado['livro_titulo']} → {resultado['membro_nome']} "
+                    f"até {formatar_data(resultado['data_devolucao_prevista'])}"
+                )
+            else:
+                exibir_resultado_emprestimo(resultado)
+                if resultado.get("erro") in ("membro_invalido", "limite_atingido"):
+                    return
+
+        except Exception as e:
+            print(f"  ✗ Erro ao emprestar '{codigo}': {e}")
+
+
+def devolucao_por_codigo():
+    """
+    Devolução no balcão com leitor: cada código escaneado fecha o empréstimo
+    correspondente com uma única requisição (função devolver_por_codigo).
+    """
+    print("\n" + "=" * 60)
+    print("🔖 DEVOLUÇÃO POR CÓDIGO")
+    print("=" * 60)
+    print("Escaneie o código do exemplar ou o ISBN (linha vazia para terminar):")
+
+    while True:
+        codigo = input("  > ").strip()
+        if not codigo:
+            return
+
+        try:
+            isbn = normalizar_isbn(codigo)
+            resultado = obter_cliente().rpc(
+                "devolver_por_codigo",
+                {
+                    "p_codigo": isbn or codigo,
+                    "p_data_devolucao": date.today().isoformat(),
+                    "p_multa_por_dia": MULTA_POR_DIA,
+                },
+            ).execute()
+            devolucao = resultado.data
+
+            if not devolucao.get("ok"):
+                mensagens = {
+                    "codigo_desconhecido": f"  ✗ Código '{codigo}' não cadastrado!",
+                    "sem_emprestimo_ativo": (
+                        f"  ✗ '{devolucao.get('titulo')}' não tem empréstimo ativo!"
+                    ),
+                }
+                print(mensagens.get(devolucao.get("erro"), f"  ✗ {devolucao}"))
+                continue
+
+            cache_invalidar(TABELA_LIVROS, devolucao["livro_id"])  # Estoque mudou
+            print(f"  ✓ {devolucao['titulo']} devolvido por {devolucao['membro_nome']}")
+            if devolucao["dias_atraso"] > 0:
+                print(
+                    f"    ⚠ {devolucao['dias_atraso']} dia(s) de atraso — Multa: R$ {float(devolucao['multa']):.2f}"
+                )
+            if devolucao.get("reserva_membro_id"):
+                print(
+                    f"    📌 SEPARAR: reservado para {devolucao['reserva_membro_nome']}"
+                    f" (ID {devolucao['reserva_membro_id']})"
+                )
+
+        except Exception as e:
+            print(f"  ✗ Erro ao devolver '{codigo}': {e}")
+
+
 # ========== RELATÓRIOS ==========
 def relatorio_emprestimos():
     """Gera relatório de empréstimos filtrado por status"""
@@ -662,102 +1752,99 @@ def relatorio_emprestimos():
     opcao = input("\nEscolha o filtro: ").strip()
 
     try:
-        # Monta a query base
-        query = supabase.table(TABELA_EMPRESTIMOS).select("*")
-
+        # Filtro aplicado tanto na contagem quanto em cada página
         if opcao == "2":
-            query = query.eq("status", "Ativo")
+            filtrar = lambda q: q.eq("status", "Ativo")
             titulo_relatorio = "EMPRÉSTIMOS ATIVOS"
         elif opcao == "3":
-            query = query.eq("status", "Devolvido")
+            filtrar = lambda q: q.eq("status", "Devolvido")
             titulo_relatorio = "EMPRÉSTIMOS DEVOLVIDOS"
         elif opcao == "4":
-            query = query.eq("status", "Ativo")
+            # Filtro feito no banco, usando o índice (status, data_devolucao_prevista)
+            hoje = date.today().isoformat()
+            filtrar = lambda q: q.eq("status", "Ativo").lt("data_devolucao_prevista", hoje)
             titulo_relatorio = "EMPRÉSTIMOS ATRASADOS"
         elif opcao == "1":
+            filtrar = None
             titulo_relatorio = "TODOS OS EMPRÉSTIMOS"
         else:
             print("✗ Opção inválida!")
             return
 
-        resultado = query.order("created_at", desc=True).execute()
-        emprestimos = resultado.data
-
-        if not emprestimos:
-            print("\n⚠ Nenhum empréstimo encontrado!")
-            return
-
-        # Se filtro é "atrasados", filtra em Python os que passaram do prazo
-        if opcao == "4":
-            emprestimos = [
-                e
-                for e in emprestimos
-                if calcular_dias_atraso(e["data_devolucao_prevista"]) > 0
-            ]
-            if not emprestimos:
+        total = contar_linhas(TABELA_EMPRESTIMOS, filtrar)
+        if not total:
+            if opcao == "4":
                 print("\n✓ Nenhum empréstimo atrasado! 🎉")
-                return
+            else:
+                print("\n⚠ Nenhum empréstimo encontrado!")
+            return
 
         print(f"\n{'=' * 90}")
-        print(f"📋 {titulo_relatorio} (Total: {len(emprestimos)})")
+        print(f"📋 {titulo_relatorio} (Total: {total})")
+        if opcao in ("1", "3"):
+            print(
+                f"   Devolvidos há mais de {HORIZONTE_ARQUIVO_DIAS} dias ficam no arquivo "
+                "(contados nas estatísticas)"
+            )
         print(f"{'=' * 90}")
 
-        # Monta o relatório com dados relacionados
-        for emp in emprestimos:
-            membro_res = (
-                supabase.table(TABELA_MEMBROS)
-                .select("nome, tipo")
-                .eq("id", emp["membro_id"])
-                .execute()
-            )
-            livro_res = (
-                supabase.table(TABELA_LIVROS)
-                .select("titulo, autor")
-                .eq("id", emp["livro_id"])
-                .execute()
-            )
+        # Mais recentes primeiro, uma página por vez
+        paginas = paginar(
+            TABELA_EMPRESTIMOS,
+            "membro_id, livro_id, data_emprestimo, data_devolucao_prevista, "
+            "data_devolucao_real, status, multa, created_at",
+            "created_at",
+            filtrar_query=filtrar,
+            decrescente=True,
+        )
 
-            nome_membro = membro_res.data[0]["nome"] if membro_res.data else "N/A"
-            tipo_membro = membro_res.data[0]["tipo"] if membro_res.data else "N/A"
-            titulo_livro = livro_res.data[0]["titulo"] if livro_res.data else "N/A"
-            autor_livro = livro_res.data[0]["autor"] if livro_res.data else "N/A"
+        for numero_pagina, emprestimos in enumerate(paginas, 1):
+            if numero_pagina > 1 and not continuar_paginacao():
+                break
 
-            print(f"\n  Empréstimo #{emp['id']}")
-            print(f"  📖 Livro: {titulo_livro} ({autor_livro})")
-            print(f"  👤 Membro: {nome_membro} ({tipo_membro})")
-            print(f"  📅 Empréstimo: {formatar_data(emp['data_emprestimo'])}")
-            print(
-                f"  📅 Devolução prevista: {formatar_data(emp['data_devolucao_prevista'])}"
+            # Dados relacionados da página (uma requisição por tabela)
+            juntar_emprestimos(
+                emprestimos, campos_membro="nome, tipo", campos_livro="titulo, autor"
             )
-
-            if emp["data_devolucao_real"]:
+            calcular_atrasos_em_lote(emprestimos)
+
+            for emp in emprestimos:
+                nome_membro = emp["membro"].get("nome", "N/A")
+                tipo_membro = emp["membro"].get("tipo", "N/A")
+                titulo_livro = emp["livro"].get("titulo", "N/A")
+                autor_livro = emp["livro"].get("autor", "N/A")
+
+                print(f"\n  Empréstimo #{emp['id']}")
+                print(f"  📖 Livro: {titulo_livro} ({autor_livro})")
+                print(f"  👤 Membro: {nome_membro} ({tipo_membro})")
+                print(f"  📅 Empréstimo: {formatar_data(emp['data_emprestimo'])}")
                 print(
-                    f"  📅 Devolução real: {formatar_data(emp['data_devolucao_real'])}"
+                    f"  📅 Devolução prevista: {formatar_data(emp['data_devolucao_prevista'])}"
                 )
 
-            # Mostra status com contexto
-            if emp["status"] == "Ativo":
-                dias_atraso = calcular_dias_atraso(emp["data_devolucao_prevista"])
-                if dias_atraso > 0:
-                    multa_estimada = dias_atraso * MULTA_POR_DIA
+                if emp["data_devolucao_real"]:
                     print(
-                        f"  ⚠ STATUS: ATRASADO ({dias_atraso} dias) - Multa estimada: R$ {multa_estimada:.2f}"
-                    )
-                else:
-                    data_prev = datetime.strptime(
-                        str(emp["data_devolucao_prevista"]), "%Y-%m-%d"
-                    ).date()
-                    dias_restantes = (data_prev - date.today()).days
-                    print(f"  ✓ STATUS: Ativo ({dias_restantes} dias restantes)")
-            else:
-                if emp["multa"] and float(emp["multa"]) > 0:
-                    print(
-                        f"  ✓ STATUS: Devolvido | Multa: R$ {float(emp['multa']):.2f}"
+                        f"  📅 Devolução real: {formatar_data(emp['data_devolucao_real'])}"
                     )
+
+                # Mostra status com contexto
+                if emp["status"] == "Ativo":
+                    dias_atraso = emp["dias_atraso"]
+                    if dias_atraso > 0:
+                        print(
+                            f"  ⚠ STATUS: ATRASADO ({dias_atraso} dias) - Multa estimada: R$ {emp['multa_estimada']:.2f}"
+                        )
+                    else:
+                        print(f"  ✓ STATUS: Ativo ({emp['dias_restantes']} dias restantes)")
                 else:
-                    print(f"  ✓ STATUS: Devolvido (sem multa)")
+                    if emp["multa"] and float(emp["multa"]) > 0:
+                        print(
+                            f"  ✓ STATUS: Devolvido | Multa: R$ {float(emp['multa']):.2f}"
+                        )
+                    else:
+                        print(f"  ✓ STATUS: Devolvido (sem multa)")
 
-            print(f"  {'─' * 50}")
+                print(f"  {'─' * 50}")
 
     except Exception as e:
         print(f"✗ Erro ao gerar relatório: {e}")
@@ -766,14 +1853,25 @@ def relatorio_emprestimos():
 def estatisticas_biblioteca():
     """Calcula e exibe estatísticas completas da biblioteca"""
     try:
-        # Busca todos os dados necessários
-        livros_res = supabase.table(TABELA_LIVROS).select("*").execute()
-        membros_res = supabase.table(TABELA_MEMBROS).select("*").execute()
-        emp_res = supabase.table(TABELA_EMPRESTIMOS).select("*").execute()
+        # Os cálculos são feitos no banco (views em biblioteca.sql);
+        # o cliente recebe apenas as linhas agregadas. As três consultas são
+        # independentes, então vão juntas (acesso_dados.py)
+        resumo_res, generos_res, ranking_res = executar_em_paralelo(
+            lambda db: db.table(VIEW_RESUMO).select("*"),
+            lambda db: (
+                db.table(VIEW_LIVROS_POR_GENERO)
+                .select("genero, quantidade")
+                .order("quantidade", desc=True)
+            ),
+            lambda db: (
+                db.table(VIEW_RANKING_LIVROS)
+                .select("titulo, total_emprestimos")
+                .order("total_emprestimos", desc=True)
+                .limit(5)
+            ),
+        )
 
-        livros = livros_res.data
-        membros = membros_res.data
-        emprestimos = emp_res.data
+        resumo = resumo_res.data[0]
 
         print("\n" + "=" * 70)
         print("📊 ESTATÍSTICAS DA BIBLIOTECA")
@@ -781,85 +1879,68 @@ def estatisticas_biblioteca():
 
         # ---- Estatísticas de Livros ----
         print("\n📚 ACERVO")
-        print(f"  Total de títulos: {len(livros)}")
-        if livros:
-            total_copias = sum(l["quantidade_total"] for l in livros)
-            total_disponivel = sum(l["quantidade_disponivel"] for l in livros)
+        print(f"  Total de títulos: {resumo['total_titulos']}")
+        if resumo["total_titulos"]:
+            total_copias = resumo["total_copias"]
+            total_disponivel = resumo["total_disponivel"]
             total_emprestado = total_copias - total_disponivel
             print(f"  Total de cópias: {total_copias}")
             print(f"  Cópias disponíveis: {total_disponivel}")
             print(f"  Cópias emprestadas: {total_emprestado}")
 
-            # Contagem de livros por gênero usando dict comprehension
-            generos = {}
-            for livro in livros:
-                genero = livro["genero"]
-                generos[genero] = generos.get(genero, 0) + 1
-
             print("\n  Livros por gênero:")
-            # Ordena gêneros por quantidade (decrescente) usando sorted() com key
-            for genero, qtd in sorted(
-                generos.items(), key=lambda x: x[1], reverse=True
-            ):
+            # A view já vem ordenada por quantidade (decrescente)
+            for linha in generos_res.data:
+                qtd = linha["quantidade"]
                 barra = "█" * qtd  # Gráfico de barras simples
-                print(f"    {genero:<20} {barra} ({qtd})")
+                print(f"    {linha['genero']:<20} {barra} ({qtd})")
 
         # ---- Estatísticas de Membros ----
         print(f"\n👥 MEMBROS")
-        print(f"  Total de membros: {len(membros)}")
-        if membros:
-            ativos = sum(1 for m in membros if m["ativo"])
-            inativos = len(membros) - ativos
-            estudantes = sum(1 for m in membros if m["tipo"] == "Estudante")
-            professores = sum(1 for m in membros if m["tipo"] == "Professor")
+        print(f"  Total de membros: {resumo['total_membros']}")
+        if resumo["total_membros"]:
+            ativos = resumo["membros_ativos"]
+            inativos = resumo["total_membros"] - ativos
 
             print(f"  Ativos: {ativos} | Inativos: {inativos}")
-            print(f"  Estudantes: {estudantes} | Professores: {professores}")
+            print(
+                f"  Estudantes: {resumo['estudantes']} | Professores: {resumo['professores']}"
+            )
 
         # ---- Estatísticas de Empréstimos ----
         print(f"\n📤 EMPRÉSTIMOS")
-        print(f"  Total de empréstimos: {len(emprestimos)}")
-        if emprestimos:
-            ativos = [e for e in emprestimos if e["status"] == "Ativo"]
-            devolvidos = [e for e in emprestimos if e["status"] == "Devolvido"]
-            atrasados = [
-                e
-                for e in ativos
-                if calcular_dias_atraso(e["data_devolucao_prevista"]) > 0
-            ]
-
-            print(f"  Ativos: {len(ativos)}")
-            print(f"  Devolvidos: {len(devolvidos)}")
-            print(f"  Atrasados: {len(atrasados)}")
-
-            # Calcula total de multas
-            total_multas = sum(float(e.get("multa", 0) or 0) for e in emprestimos)
+        print(f"  Total de empréstimos: {resumo['total_emprestimos']}")
+        if resumo["total_emprestimos"]:
+            print(f"  Ativos: {resumo['emprestimos_ativos']}")
+            print(f"  Devolvidos: {resumo['emprestimos_devolvidos']}")
+            print(f"  Atrasados: {resumo['emprestimos_atrasados']}")
+
+            # Total de multas
+            total_multas = float(resumo["total_multas"] or 0)
             if total_multas > 0:
                 print(f"\n  💰 Total em multas cobradas: R$ {total_multas:.2f}")
 
-            # Livros mais emprestados (ranking)
-            if emprestimos:
-                contagem_livros = {}
-                for emp in emprestimos:
-                    lid = emp["livro_id"]
-                    contagem_livros[lid] = contagem_livros.get(lid, 0) + 1
-
+            # Livros mais emprestados (ranking com títulos já juntados no banco)
+            if ranking_res.data:
                 print("\n  🏆 TOP 5 LIVROS MAIS EMPRESTADOS:")
-                # sorted() retorna uma nova lista ordenada
-                ranking = sorted(
-                    contagem_livros.items(), key=lambda x: x[1], reverse=True
-                )[:5]
-
-                for posicao, (lid, qtd) in enumerate(ranking, 1):
-                    livro_info = (
-                        supabase.table(TABELA_LIVROS)
-                        .select("titulo")
-                        .eq("id", lid)
-                        .execute()
-                    )
-                    titulo = livro_info.data[0]["titulo"] if livro_info.data else "N/A"
+                for posicao, linha in enumerate(ranking_res.data, 1):
                     medalha = ["🥇", "🥈", "🥉", "4️⃣", "5️⃣"][posicao - 1]
-                    print(f"    {medalha} {titulo} — {qtd} empréstimo(s)")
+                    print(
+                        f"    {medalha} {linha['titulo']} — {linha['total_emprestimos']} empréstimo(s)"
+                    )
+
+        # ---- Eficiência do cache local (desde que o programa abriu) ----
+        acertos = CACHE_CONTADORES["acertos"]
+        falhas = CACHE_CONTADORES["falhas"]
+        consultas = acertos + falhas
+        if consultas:
+            taxa = (acertos / consultas) * 100
+            print(f"\n⚡ CACHE LOCAL")
+            print(f"  Acertos: {acertos} | Falhas: {falhas} | Taxa de acerto: {taxa:.1f}%")
+            print(
+                f"  Em cache: {len(CACHE_CATALOGO[TABELA_LIVROS])} livro(s), "
+                f"{len(CACHE_CATALOGO[TABELA_MEMBROS])} membro(s)"
+            )
 
         print("\n" + "=" * 70)
 
@@ -867,6 +1948,96 @@ def estatisticas_biblioteca():
         print(f"✗ Erro ao calcular estatísticas: {e}")
 
 
+def relatorio_circulacao():
+    """
+    Mostra a circulação mês a mês de um ano (empréstimos, devoluções,
+    atrasos e multas) lendo apenas a tabela de rollup circulacao_mensal.
+    No máximo 12 meses × gêneros × 2 tipos de membro linhas são baixadas,
+    não importa quantos empréstimos existam.
+    """
+    print("\n" + "=" * 60)
+    print("📈 CIRCULAÇÃO MENSAL")
+    print("=" * 60)
+
+    try:
+        ano = int(
+            input(f"Ano (padrão: {date.today().year}): ") or str(date.today().year)
+        )
+    except ValueError:
+        print("✗ Digite um ano válido!")
+        return
+
+    try:
+        resultado = (
+            obter_cliente()
+            .table(TABELA_CIRCULACAO)
+            .select("*")
+            .gte("mes", f"{ano}-01-01")
+            .lt("mes", f"{ano + 1}-01-01")
+            .execute()
+        )
+        linhas = resultado.data
+
+        if not linhas:
+            print(f"\n⚠ Nenhuma circulação registrada em {ano}!")
+            return
+
+        # Soma as linhas do rollup por mês, por gênero e por tipo de membro
+        campos = ["emprestimos", "devolucoes", "devolucoes_atrasadas", "multas"]
+        por_mes = {m: dict.fromkeys(campos, 0) for m in range(1, 13)}
+        por_genero = {}
+        por_tipo = {}
+
+        for linha in linhas:
+            mes = int(str(linha["mes"])[5:7])
+            grupo_genero = por_genero.setdefault(linha["genero"], dict.fromkeys(campos, 0))
+            grupo_tipo = por_tipo.setdefault(linha["tipo_membro"], dict.fromkeys(campos, 0))
+            for campo in campos:
+                valor = float(linha[campo] or 0)
+                por_mes[mes][campo] += valor
+                grupo_genero[campo] += valor
+                grupo_tipo[campo] += valor
+
+        maior = max(d["emprestimos"] for d in por_mes.values()) or 1
+
+        print(f"\n{'=' * 78}")
+        print(f"📈 CIRCULAÇÃO DE {ano}")
+        print(f"{'=' * 78}")
+        print(
+            f"\n  {'Mês':<5} {'Empréstimos':<32} {'Devol.':>7} {'Atras.':>7} {'Multas':>12}"
+        )
+        print(f"  {'─' * 74}")
+
+        for mes in range(1, 13):
+            dados = por_mes[mes]
+            qtd = int(dados["emprestimos"])
+            barra = "█" * int(qtd / maior * 20)
+            print(
+                f"  {MESES_ABREV[mes - 1]:<5} {barra:<20} {qtd:>10}  "
+                f"{int(dados['devolucoes']):>7} {int(dados['devolucoes_atrasadas']):>7} "
+                f"R$ {dados['multas']:>9.2f}"
+            )
+
+        print("\n  📚 Empréstimos por gênero:")
+        for genero, dados in sorted(
+            por_genero.items(), key=lambda x: x[1]["emprestimos"], reverse=True
+        ):
+            print(f"    {genero:<20} {int(dados['emprestimos']):>8}")
+
+        print("\n  👥 Empréstimos por tipo de membro:")
+        for tipo, dados in sorted(por_tipo.items()):
+            print(
+                f"    {tipo:<20} {int(dados['emprestimos']):>8} "
+                f"(atrasos na devolução: {int(dados['devolucoes_atrasadas'])})"
+            )
+
+        total_multas = sum(d["multas"] for d in por_mes.values())
+        print(f"\n  💰 Multas no ano: R$ {total_multas:.2f}")
+
+    except Exception as e:
+        print(f"✗ Erro ao gerar relatório de circulação: {e}")
+
+
 # ========== MENU PRINCIPAL ==========
 def menu_principal():
     """Menu interativo do sistema de biblioteca"""
@@ -884,6 +2055,10 @@ def menu_principal():
         print("  7. 🔍 Buscar Livro")
         print("  8. 📋 Relatório de Empréstimos")
         print("  9. 📊 Estatísticas da Biblioteca")
+        print(" 10. 📦 Devolução em Lote")
+        print(" 11. 📈 Circulação Mensal")
+        print(" 12. 🔖 Empréstimo por Código")
+        print(" 13. 🔖 Devolução por Código")
         print("  0. 🚪 Sair")
         print("=" * 70)
 
@@ -901,6 +2076,10 @@ def menu_principal():
             "7": buscar_livro,
             "8": relatorio_emprestimos,
             "9": estatisticas_biblioteca,
+            "10": devolver_em_lote,
+            "11": relatorio_circulacao,
+            "12": emprestimo_por_codigo,
+            "13": devolucao_por_codigo,
         }
 
         if opcao == "0":
@@ -913,5 +2092,20 @@ def menu_principal():
 
 
 # Executa o sistema
+# Uso: python biblioteca.py                          → menu interativo
+#      python biblioteca.py importar arquivo.csv [N] → importação em massa
+#      python biblioteca.py arquivar [dias]          → arquiva empréstimos antigos
+#      python biblioteca.py notificar [arquivo|smtp] → avisa membros em atraso
 if __name__ == "__main__":
-    menu_principal()
+    verificar_credenciais()
+
+    if len(sys.argv) >= 3 and sys.argv[1] == "importar":
+        lote = int(sys.argv[3]) if len(sys.argv) >= 4 else TAMANHO_LOTE_IMPORTACAO
+        importar_livros(sys.argv[2], lote)
+    elif len(sys.argv) >= 2 and sys.argv[1] == "arquivar":
+        dias = int(sys.argv[2]) if len(sys.argv) >= 3 else HORIZONTE_ARQUIVO_DIAS
+        arquivar_historico(dias)
+    elif len(sys.argv) >= 2 and sys.argv[1] == "notificar":
+        notificar_atrasados(sys.argv[2] if len(sys.argv) >= 3 else "arquivo")
+    else:
+        menu_principal()
@@ -0,0 +1,877 @@
+-- ========== FUNÇÕES E ÍNDICES DA BIBLIOTECA (SUPABASE / POSTGRES) ==========
+-- Execute este arquivo no SQL Editor do Supabase antes de usar o biblioteca.py
+-- As funções são chamadas pelo Python com supabase.rpc("nome", {...})
+
+
+-- ========== ISBN E CÓDIGOS DE BARRAS ==========
+-- Cada livro pode ter um ISBN e cada cópia física (exemplar) tem o seu
+-- código de barras. Os dois são únicos e indexados, então o balcão vai do
+-- código lido pelo leitor direto para a linha, sem listar nada.
+alter table livros add column if not exists isbn text;
+
+create unique index if not exists idx_livros_isbn
+    on livros (isbn)
+    where isbn is not null;
+
+create table if not exists exemplares (
+    id bigint generated always as identity primary key,
+    livro_id bigint not null references livros (id),
+    codigo_barras text not null unique
+);
+
+create index if not exists idx_exemplares_livro on exemplares (livro_id);
+
+alter table emprestimos add column if not exists exemplar_id bigint references exemplares (id);
+
+create index if not exists idx_emprestimos_exemplar_ativo
+    on emprestimos (exemplar_id)
+    where status = 'Ativo';
+
+-- Devolução pelo ISBN (ou de empréstimos antigos, sem exemplar): o ativo
+-- mais antigo do livro, lido na ordem do índice
+create index if not exists idx_emprestimos_livro_ativo
+    on emprestimos (livro_id, data_emprestimo, id)
+    where status = 'Ativo';
+
+-- Cria os exemplares que faltam de um livro, com códigos no formato
+-- 'EX<livro>-<n>'. Chamada pelo gatilho trg_livros_exemplares a cada
+-- livro inserido. Para livros cadastrados antes do gatilho:
+--   select gerar_exemplares(id) from livros;
+create or replace function gerar_exemplares(p_livro_id bigint)
+returns int
+language plpgsql
+as $$
+declare
+    v_total int;
+    v_existentes int;
+begin
+    select quantidade_total into v_total from livros where id = p_livro_id;
+    select count(*) into v_existentes from exemplares where livro_id = p_livro_id;
+
+    insert into exemplares (livro_id, codigo_barras)
+    select p_livro_id, 'EX' || p_livro_id || '-' || n
+      from generate_series(v_existentes + 1, coalesce(v_total, 0)) as n
+    on conflict (codigo_barras) do nothing;
+
+    return greatest(coalesce(v_total, 0) - v_existentes, 0);
+end;
+$$;
+
+-- Todo livro inserido (cadastro no menu ou importação em massa) ganha os
+-- exemplares na mesma transação do insert: não existe livro sem etiquetas
+create or replace function criar_exemplares_do_livro()
+returns trigger
+language plpgsql
+as $$
+begin
+    perform gerar_exemplares(new.id);
+    return new;
+end;
+$$;
+
+drop trigger if exists trg_livros_exemplares on livros;
+create trigger trg_livros_exemplares
+    after insert on livros
+    for each row execute function criar_exemplares_do_livro();
+
+-- Traduz um código lido (código de barras do exemplar ou ISBN do livro)
+-- para {livro_id, exemplar_id, titulo}. Uma busca em índice único.
+create or replace function resolver_codigo(p_codigo text)
+returns jsonb
+language sql
+stable
+as $$
+    select coalesce(
+        (select jsonb_build_object(
+                    'livro_id', x.livro_id, 'exemplar_id', x.id, 'titulo', l.titulo)
+           from exemplares x
+           join livros l on l.id = x.livro_id
+          where x.codigo_barras = p_codigo),
+        (select jsonb_build_object(
+                    'livro_id', l.id, 'exemplar_id', null, 'titulo', l.titulo)
+           from livros l
+          where l.isbn = p_codigo),
+        '{}'::jsonb
+    );
+$$;
+
+
+-- ========== RESERVAS ==========
+-- Fila de espera por livro sem cópias disponíveis (com cópia na estante, o
+-- membro empresta direto). Professores (prioridade 0)
+-- passam na frente de estudantes (prioridade 1); entre iguais, vale a ordem
+-- de chegada. O índice parcial cobre só as reservas aguardando, já na ordem
+-- da fila, então achar o próximo da vez é uma única busca no índice.
+-- Status: 'Aguardando' → 'Separada' (cópia guardada na devolução)
+--         → 'Atendida' (membro retirou) ou 'Cancelada'.
+create table if not exists reservas (
+    id bigint generated always as identity primary key,
+    livro_id bigint not null references livros (id),
+    membro_id bigint not null references membros (id),
+    prioridade int not null,
+    status text not null default 'Aguardando',
+    criada_em timestamptz not null default now(),
+    separada_em timestamptz,
+    atendida_em timestamptz
+);
+
+create index if not exists idx_reservas_fila
+    on reservas (livro_id, prioridade, criada_em, id)
+    where status = 'Aguardando';
+
+create unique index if not exists idx_reservas_membro_livro
+    on reservas (membro_id, livro_id)
+    where status in ('Aguardando', 'Separada');
+
+create or replace function reservar_livro(p_membro_id bigint, p_livro_id bigint)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_membro membros%rowtype;
+    v_disponivel int;
+    v_prioridade int;
+    v_posicao bigint;
+begin
+    select * into v_membro from membros where id = p_membro_id;
+    if not found or not v_membro.ativo then
+        return jsonb_build_object('ok', false, 'erro', 'membro_invalido');
+    end if;
+
+    -- Livro travado até o fim: uma devolução simultânea (que também trava o
+    -- livro primeiro) ou vê esta reserva na fila, ou já devolveu a cópia ao
+    -- estoque e a reserva é recusada. Duas reservas iguais ao mesmo tempo
+    -- também esperam uma pela outra, e a segunda vê reserva_duplicada.
+    select quantidade_disponivel into v_disponivel
+      from livros
+     where id = p_livro_id
+       for update;
+
+    if not found then
+        return jsonb_build_object('ok', false, 'erro', 'livro_invalido');
+    end if;
+
+    if v_disponivel > 0 then
+        return jsonb_build_object(
+            'ok', false, 'erro', 'livro_disponivel', 'disponiveis', v_disponivel
+        );
+    end if;
+
+    if exists (
+        select 1 from emprestimos
+         where membro_id = p_membro_id and livro_id = p_livro_id and status = 'Ativo'
+    ) then
+        return jsonb_build_object('ok', false, 'erro', 'emprestimo_duplicado');
+    end if;
+
+    if exists (
+        select 1 from reservas
+         where membro_id = p_membro_id and livro_id = p_livro_id
+           and status in ('Aguardando', 'Separada')
+    ) then
+        return jsonb_build_object('ok', false, 'erro', 'reserva_duplicada');
+    end if;
+
+    v_prioridade := case when v_membro.tipo = 'Professor' then 0 else 1 end;
+
+    insert into reservas (livro_id, membro_id, prioridade)
+    values (p_livro_id, p_membro_id, v_prioridade);
+
+    -- Posição na fila: quantos estão na frente (mesma ordem do índice) + 1
+    select count(*) into v_posicao
+      from reservas
+     where livro_id = p_livro_id and status = 'Aguardando'
+       and prioridade <= v_prioridade;
+
+    return jsonb_build_object('ok', true, 'posicao', v_posicao);
+end;
+$$;
+
+
+-- ========== ESTOQUE ATÔMICO ==========
+-- Empréstimo completo em uma única chamada: valida o membro (ativo e abaixo do
+-- limite), o livro (existe e tem cópia) e o empréstimo duplicado, registra o
+-- empréstimo e decrementa o estoque na mesma transação.
+-- A linha do membro fica travada (FOR UPDATE) até o fim, então dois balcões
+-- não passam do limite ao mesmo tempo; o UPDATE condicional
+-- (quantidade_disponivel > 0) impede estoque negativo. Se o membro tem uma
+-- cópia separada por reserva, ela é usada sem mexer no estoque; se ainda
+-- estava aguardando na fila, a reserva é dada como atendida.
+-- Retorna um JSON: {"ok": true, ...dados} ou {"ok": false, "erro": "...", ...}.
+drop function if exists registrar_emprestimo(bigint, bigint, date, date);
+drop function if exists emprestar_livro(bigint, bigint, int, int, int);
+
+create or replace function emprestar_livro(
+    p_membro_id bigint,
+    p_livro_id bigint,
+    p_limite int,
+    p_prazo_estudante int,
+    p_prazo_professor int,
+    p_exemplar_id bigint default null  -- preenchido quando a cópia foi escaneada
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_membro membros%rowtype;
+    v_titulo text;
+    v_ativos int;
+    v_prazo int;
+    v_data_prevista date;
+    v_emprestimo_id bigint;
+    v_reserva_id bigint;
+begin
+    -- "no key update": serializa os empréstimos do mesmo membro sem barrar a
+    -- trava de chave estrangeira (key share) que o insert de reservar_livro
+    -- pede no membro. Com "for update", reservar_livro (livro, depois membro)
+    -- e esta função (membro, depois livro) se esperariam (deadlock)
+    select * into v_membro from membros where id = p_membro_id for no key update;
+
+    if not found or not v_membro.ativo then
+        return jsonb_build_object('ok', false, 'erro', 'membro_invalido');
+    end if;
+
+    select count(*) into v_ativos
+      from emprestimos
+     where membro_id = p_membro_id and status = 'Ativo';
+
+    if v_ativos >= p_limite then
+        return jsonb_build_object(
+            'ok', false, 'erro', 'limite_atingido',
+            'membro_nome', v_membro.nome, 'emprestimos_ativos', v_ativos
+        );
+    end if;
+
+    if exists (
+        select 1 from emprestimos
+         where membro_id = p_membro_id and livro_id = p_livro_id and status = 'Ativo'
+    ) then
+        select titulo into v_titulo from livros where id = p_livro_id;
+        return jsonb_build_object(
+            'ok', false, 'erro', 'emprestimo_duplicado',
+            'membro_nome', v_membro.nome, 'livro_titulo', v_titulo
+        );
+    end if;
+
+    if p_exemplar_id is not null and exists (
+        select 1 from emprestimos where exemplar_id = p_exemplar_id and status = 'Ativo'
+    ) then
+        return jsonb_build_object('ok', false, 'erro', 'exemplar_emprestado');
+    end if;
+
+    update reservas
+       set status = 'Atendida', atendida_em = now()
+     where membro_id = p_membro_id and livro_id = p_livro_id and status = 'Separada'
+    returning id into v_reserva_id;
+
+    if v_reserva_id is not null then
+        -- A cópia já estava fora do estoque, guardada para este membro
+        select titulo into v_titulo from livros where id = p_livro_id;
+    else
+        update livros
+           set quantidade_disponivel = quantidade_disponivel - 1
+         where id = p_livro_id
+           and quantidade_disponivel > 0
+        returning titulo into v_titulo;
+
+        if not found then
+            return jsonb_build_object('ok', false, 'erro', 'livro_indisponivel');
+        end if;
+
+        -- Membro que estava na fila e achou uma cópia na estante sai da fila
+        update reservas
+           set status = 'Atendida', atendida_em = now()
+         where membro_id = p_membro_id and livro_id = p_livro_id
+           and status = 'Aguardando';
+    end if;
+
+    v_prazo := case when v_membro.tipo = 'Professor'
+                    then p_prazo_professor else p_prazo_estudante end;
+    v_data_prevista := current_date + v_prazo;
+
+    insert into emprestimos (
+        livro_id, membro_id, data_emprestimo, data_devolucao_prevista,
+        data_devolucao_real, status, multa, exemplar_id
+    )
+    values (
+        p_livro_id, p_membro_id, current_date, v_data_prevista,
+        null, 'Ativo', 0, p_exemplar_id
+    )
+    returning id into v_emprestimo_id;
+
+    return jsonb_build_object(
+        'ok', true,
+        'emprestimo_id', v_emprestimo_id,
+        'membro_nome', v_membro.nome,
+        'membro_tipo', v_membro.tipo,
+        'livro_titulo', v_titulo,
+        'data_emprestimo', current_date,
+        'data_devolucao_prevista', v_data_prevista,
+        'prazo_dias', v_prazo,
+        'emprestimos_ativos', v_ativos + 1
+    );
+end;
+$$;
+
+
+-- Fecha o empréstimo e, na mesma transação, entrega a cópia ao próximo da
+-- fila de reservas (se houver) ou devolve ao estoque.
+-- Só altera empréstimos ainda 'Ativo', evitando devolver a mesma cópia duas vezes.
+drop function if exists registrar_devolucao(bigint, date, numeric);
+
+create or replace function registrar_devolucao(
+    p_emprestimo_id bigint,
+    p_data_devolucao date,
+    p_multa numeric
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_livro_id bigint;
+    v_reserva_membro_id bigint;
+begin
+    -- Trava o livro antes de fechar o empréstimo: emprestar_livro trava o
+    -- livro e só depois a linha de circulacao_mensal (gatilho do insert).
+    -- Fechar primeiro travaria a circulação antes do livro, na ordem
+    -- inversa, e os dois balcões se esperariam (deadlock)
+    perform 1
+       from livros
+      where id = (select e.livro_id from emprestimos e where e.id = p_emprestimo_id)
+        for update;
+
+    update emprestimos
+       set data_devolucao_real = p_data_devolucao,
+           status = 'Devolvido',
+           multa = p_multa
+     where id = p_emprestimo_id
+       and status = 'Ativo'
+    returning livro_id into v_livro_id;
+
+    if v_livro_id is null then
+        raise exception 'Empréstimo % não está ativo', p_emprestimo_id;
+    end if;
+
+    -- Próximo da fila: uma busca no índice idx_reservas_fila
+    update reservas
+       set status = 'Separada', separada_em = now()
+     where id = (
+            select id from reservas
+             where livro_id = v_livro_id and status = 'Aguardando'
+             order by prioridade, criada_em, id
+             limit 1
+             for update skip locked
+           )
+    returning membro_id into v_reserva_membro_id;
+
+    if v_reserva_membro_id is null then
+        update livros
+           set quantidade_disponivel = quantidade_disponivel + 1
+         where id = v_livro_id
+           and quantidade_disponivel < quantidade_total;
+    end if;
+
+    return jsonb_build_object(
+        'livro_id', v_livro_id,
+        'reserva_membro_id', v_reserva_membro_id,
+        'reserva_membro_nome', (select nome from membros where id = v_reserva_membro_id)
+    );
+end;
+$$;
+
+
+-- Devolução a partir do código lido: acha o empréstimo ativo do exemplar
+-- (ou, para ISBN e empréstimos antigos sem exemplar, o mais antigo do livro),
+-- calcula a multa e chama registrar_devolucao. Tudo em uma requisição.
+-- Duas buscas separadas, cada uma no seu índice parcial: primeiro pelo
+-- exemplar (idx_emprestimos_exemplar_ativo) e, só se não achar, pelo livro
+-- (idx_emprestimos_livro_ativo). Um único WHERE com OR não usa nenhum dos dois.
+-- Trava o livro antes do empréstimo, como as outras devoluções.
+create or replace function devolver_por_codigo(
+    p_codigo text,
+    p_data_devolucao date,
+    p_multa_por_dia numeric
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_codigo jsonb;
+    v_exemplar_id bigint;
+    v_emprestimo emprestimos%rowtype;
+    v_dias int;
+    v_multa numeric;
+    v_devolucao jsonb;
+begin
+    v_codigo := resolver_codigo(p_codigo);
+    if v_codigo = '{}'::jsonb then
+        return jsonb_build_object('ok', false, 'erro', 'codigo_desconhecido');
+    end if;
+
+    v_exemplar_id := (v_codigo ->> 'exemplar_id')::bigint;
+
+    -- Livro primeiro, empréstimo depois: a mesma ordem de registrar_devolucao
+    -- e registrar_devolucoes_em_lote. Travar o empréstimo antes deixaria esta
+    -- devolução e uma do menu (ou do lote) esperando uma pela outra
+    perform 1 from livros where id = (v_codigo ->> 'livro_id')::bigint for update;
+
+    if v_exemplar_id is not null then
+        select * into v_emprestimo
+          from emprestimos
+         where exemplar_id = v_exemplar_id
+           and status = 'Ativo'
+         limit 1
+         for update;
+    end if;
+
+    if v_emprestimo.id is null then
+        -- Etiqueta sem empréstimo próprio: só vale um empréstimo antigo, sem
+        -- exemplar. ISBN: qualquer empréstimo ativo do livro, o mais antigo
+        select * into v_emprestimo
+          from emprestimos
+         where livro_id = (v_codigo ->> 'livro_id')::bigint
+           and status = 'Ativo'
+           and (v_exemplar_id is null or exemplar_id is null)
+         order by data_emprestimo, id
+         limit 1
+         for update;
+    end if;
+
+    if v_emprestimo.id is null then
+        return jsonb_build_object(
+            'ok', false, 'erro', 'sem_emprestimo_ativo', 'titulo', v_codigo ->> 'titulo'
+        );
+    end if;
+
+    v_dias := greatest(0, p_data_devolucao - v_emprestimo.data_devolucao_prevista);
+    v_multa := v_dias * p_multa_por_dia;
+    v_devolucao := registrar_devolucao(v_emprestimo.id, p_data_devolucao, v_multa);
+
+    return v_devolucao || jsonb_build_object(
+        'ok', true,
+        'emprestimo_id', v_emprestimo.id,
+        'titulo', v_codigo ->> 'titulo',
+        'membro_nome', (select nome from membros where id = v_emprestimo.membro_id),
+        'dias_atraso', v_dias,
+        'multa', v_multa
+    );
+end;
+$$;
+
+
+-- ========== ARQUIVO DE EMPRÉSTIMOS ANTIGOS ==========
+-- Empréstimos devolvidos há mais tempo que o horizonte configurado saem da
+-- tabela emprestimos (que fica pequena) e vão para emprestimos_arquivo,
+-- particionada por ano de empréstimo. Os totais por livro vão para
+-- emprestimos_arquivo_resumo, então as estatísticas continuam completas
+-- sem precisar ler o arquivo.
+create table if not exists emprestimos_arquivo (like emprestimos)
+    partition by range (data_emprestimo);
+
+-- Mantém o arquivo com as mesmas colunas de emprestimos (insert ... select *)
+alter table emprestimos_arquivo add column if not exists exemplar_id bigint;
+
+create table if not exists emprestimos_arquivo_resumo (
+    livro_id bigint primary key,
+    total_emprestimos bigint not null default 0,
+    total_multas numeric not null default 0
+);
+
+create or replace function arquivar_emprestimos(p_horizonte_dias int)
+returns bigint
+language plpgsql
+as $$
+declare
+    v_ano int;
+    v_movidos bigint;
+begin
+    -- Cria as partições anuais que ainda não existem
+    for v_ano in
+        select distinct extract(year from data_emprestimo)::int
+          from emprestimos
+         where status = 'Devolvido'
+           and data_devolucao_real < current_date - p_horizonte_dias
+    loop
+        execute format(
+            'create table if not exists %I partition of emprestimos_arquivo '
+            'for values from (%L) to (%L)',
+            'emprestimos_arquivo_' || v_ano,
+            make_date(v_ano, 1, 1),
+            make_date(v_ano + 1, 1, 1)
+        );
+    end loop;
+
+    with movidos as (
+        delete from emprestimos
+         where status = 'Devolvido'
+           and data_devolucao_real < current_date - p_horizonte_dias
+        returning *
+    ),
+    copiados as (
+        insert into emprestimos_arquivo
+        select * from movidos
+    ),
+    resumo as (
+        insert into emprestimos_arquivo_resumo as r
+            (livro_id, total_emprestimos, total_multas)
+        select livro_id, count(*), coalesce(sum(multa), 0)
+          from movidos
+         group by livro_id
+        on conflict (livro_id) do update
+           set total_emprestimos = r.total_emprestimos + excluded.total_emprestimos,
+               total_multas = r.total_multas + excluded.total_multas
+    )
+    select count(*) into v_movidos from movidos;
+
+    return v_movidos;
+end;
+$$;
+
+
+-- ========== ESTATÍSTICAS AGREGADAS ==========
+-- Views usadas por estatisticas_biblioteca(): o cliente recebe só os totais,
+-- nunca as tabelas inteiras. Os totais históricos somam o resumo do arquivo
+-- (todo empréstimo arquivado é um empréstimo devolvido).
+
+-- Uma linha com todos os contadores gerais
+create or replace view vw_resumo_biblioteca as
+select
+    (select count(*) from livros) as total_titulos,
+    (select coalesce(sum(quantidade_total), 0) from livros) as total_copias,
+    (select coalesce(sum(quantidade_disponivel), 0) from livros) as total_disponivel,
+    (select count(*) from membros) as total_membros,
+    (select count(*) from membros where ativo) as membros_ativos,
+    (select count(*) from membros where tipo = 'Estudante') as estudantes,
+    (select count(*) from membros where tipo = 'Professor') as professores,
+    (select count(*) from emprestimos)
+      + (select coalesce(sum(total_emprestimos), 0) from emprestimos_arquivo_resumo)::bigint
+      as total_emprestimos,
+    (select count(*) from emprestimos where status = 'Ativo') as emprestimos_ativos,
+    (select count(*) from emprestimos where status = 'Devolvido')
+      + (select coalesce(sum(total_emprestimos), 0) from emprestimos_arquivo_resumo)::bigint
+      as emprestimos_devolvidos,
+    (select count(*) from emprestimos
+      where status = 'Ativo' and data_devolucao_prevista < current_date) as emprestimos_atrasados,
+    (select coalesce(sum(multa), 0) from emprestimos)
+      + (select coalesce(sum(total_multas), 0) from emprestimos_arquivo_resumo)
+      as total_multas;
+
+-- Quantidade de títulos por gênero
+create or replace view vw_livros_por_genero as
+select genero, count(*) as quantidade
+  from livros
+ group by genero;
+
+-- Ranking de livros mais emprestados, já com o título
+create or replace view vw_ranking_livros as
+select l.id as livro_id, l.titulo, sum(t.quantidade)::bigint as total_emprestimos
+  from (
+        select livro_id, count(*) as quantidade
+          from emprestimos
+         group by livro_id
+        union all
+        select livro_id, total_emprestimos
+          from emprestimos_arquivo_resumo
+       ) t
+  join livros l on l.id = t.livro_id
+ group by l.id, l.titulo;
+
+-- Empréstimos ativos por membro (usada por listar_membros)
+create or replace view vw_emprestimos_ativos_por_membro as
+select membro_id, count(*) as quantidade
+  from emprestimos
+ where status = 'Ativo'
+ group by membro_id;
+
+
+-- ========== BUSCA TEXTUAL ==========
+-- Busca por relevância em título, autor e gênero (opção "Busca inteligente"
+-- de buscar_livro). Usa full-text em português (com radicais) e trigramas
+-- para tolerar erros de digitação; ambos ignoram acentos.
+create extension if not exists unaccent;
+create extension if not exists pg_trgm;
+
+-- unaccent() não é IMMUTABLE, então não pode ser usado direto em índices
+create or replace function f_unaccent(texto text)
+returns text
+language sql
+immutable
+parallel safe
+as $$
+    select public.unaccent('public.unaccent', texto);
+$$;
+
+create or replace function livros_documento(titulo text, autor text, genero text)
+returns tsvector
+language sql
+immutable
+parallel safe
+as $$
+    select setweight(to_tsvector('portuguese', f_unaccent(coalesce(titulo, ''))), 'A')
+        || setweight(to_tsvector('portuguese', f_unaccent(coalesce(autor, ''))), 'B')
+        || setweight(to_tsvector('portuguese', f_unaccent(coalesce(genero, ''))), 'C');
+$$;
+
+create index if not exists idx_livros_documento
+    on livros using gin (livros_documento(titulo, autor, genero));
+
+create index if not exists idx_livros_titulo_trgm
+    on livros using gin (f_unaccent(lower(titulo)) gin_trgm_ops);
+
+create index if not exists idx_livros_autor_trgm
+    on livros using gin (f_unaccent(lower(autor)) gin_trgm_ops);
+
+create or replace function buscar_livros_texto(p_termo text, p_limite int default 20)
+returns table (
+    id bigint,
+    titulo text,
+    autor text,
+    genero text,
+    ano_publicacao int,
+    quantidade_disponivel int,
+    quantidade_total int,
+    relevancia real
+)
+language sql
+stable
+as $$
+    with consulta as (
+        select websearch_to_tsquery('portuguese', f_unaccent(p_termo)) as q,
+               f_unaccent(lower(p_termo)) as termo
+    )
+    select l.id::bigint, l.titulo::text, l.autor::text, l.genero::text,
+           l.ano_publicacao::int, l.quantidade_disponivel::int,
+           l.quantidade_total::int,
+           greatest(
+               ts_rank(livros_documento(l.titulo, l.autor, l.genero), c.q),
+               similarity(f_unaccent(lower(l.titulo)), c.termo),
+               similarity(f_unaccent(lower(l.autor)), c.termo)
+           )::real as relevancia
+      from livros l, consulta c
+     where livros_documento(l.titulo, l.autor, l.genero) @@ c.q
+        or f_unaccent(lower(l.titulo)) % c.termo
+        or f_unaccent(lower(l.autor)) % c.termo
+     order by relevancia desc, l.titulo
+     limit p_limite;
+$$;
+
+
+-- ========== ÍNDICES DE EMPRÉSTIMOS ==========
+-- Atende o filtro de atrasados (status = 'Ativo' and data_devolucao_prevista < hoje)
+-- usado por relatorio_emprestimos() e pela view de resumo
+create index if not exists idx_emprestimos_status_prevista
+    on emprestimos (status, data_devolucao_prevista);
+
+
+-- ========== DEVOLUÇÃO EM LOTE ==========
+-- Fecha vários empréstimos de uma vez (fim de semestre), calculando a multa
+-- no servidor. As cópias devolvidas vão primeiro para as reservas
+-- aguardando (na ordem da fila de cada livro) e o restante volta ao estoque
+-- com um UPDATE por livro. O número de comandos não depende da quantidade
+-- de empréstimos.
+drop function if exists registrar_devolucoes_em_lote(bigint[], date, numeric);
+
+create or replace function registrar_devolucoes_em_lote(
+    p_emprestimo_ids bigint[],
+    p_data_devolucao date,
+    p_multa_por_dia numeric
+)
+returns table (
+    emprestimo_id bigint,
+    livro_id bigint,
+    dias_atraso int,
+    multa numeric,
+    reserva_membro_id bigint
+)
+language plpgsql
+as $$
+begin
+    -- Livros travados primeiro, em ordem de id, como em registrar_devolucao:
+    -- a circulação (gatilho do update abaixo) é sempre a última trava
+    perform 1
+       from livros l
+      where l.id in (select e.livro_id from emprestimos e
+                      where e.id = any(p_emprestimo_ids) and e.status = 'Ativo')
+      order by l.id
+        for update;
+
+    return query
+    with fechados as (
+        update emprestimos e
+           set data_devolucao_real = p_data_devolucao,
+               status = 'Devolvido',
+               multa = greatest(0, p_data_devolucao - e.data_devolucao_prevista)
+                       * p_multa_por_dia
+         where e.id = any(p_emprestimo_ids)
+           and e.status = 'Ativo'
+        returning e.id, e.livro_id, e.data_devolucao_prevista, e.multa
+    ),
+    -- Numera as cópias devolvidas de cada livro: a n-ésima vai para o n-ésimo da fila
+    fechados_numerados as (
+        select f.*, row_number() over (partition by f.livro_id order by f.id) as n
+          from fechados f
+    ),
+    copias as (
+        select f.livro_id, count(*) as copias
+          from fechados f
+         group by f.livro_id
+    ),
+    fila as (
+        select r.id, r.livro_id, r.membro_id,
+               row_number() over (
+                   partition by r.livro_id order by r.prioridade, r.criada_em, r.id
+               ) as posicao
+          from reservas r
+          join copias c on c.livro_id = r.livro_id
+         where r.status = 'Aguardando'
+    ),
+    separadas as (
+        update reservas r
+           set status = 'Separada', separada_em = now()
+          from fila f
+          join copias c on c.livro_id = f.livro_id
+         where r.id = f.id
+           and f.posicao <= c.copias
+        returning r.livro_id
+    ),
+    estoque as (
+        update livros l
+           set quantidade_disponivel = least(
+                   l.quantidade_total,
+                   l.quantidade_disponivel + c.copias - coalesce(s.quantidade, 0)
+               )
+          from copias c
+          left join (select s2.livro_id, count(*) as quantidade
+                       from separadas s2
+                      group by s2.livro_id) s on s.livro_id = c.livro_id
+         where l.id = c.livro_id
+    )
+    select f.id::bigint,
+           f.livro_id::bigint,
+           greatest(0, p_data_devolucao - f.data_devolucao_prevista)::int,
+           f.multa::numeric,
+           fi.membro_id::bigint
+      from fechados_numerados f
+      left join fila fi on fi.livro_id = f.livro_id and fi.posicao = f.n;
+end;
+$$;
+
+
+-- ========== SELEÇÃO POR PREFIXO ==========
+-- Índices de trigramas nas colunas originais: atendem o ilike 'texto%' da
+-- seleção de membro/livro em realizar_emprestimo() quando o catálogo é
+-- grande demais para o índice local em memória
+create index if not exists idx_membros_nome_trgm
+    on membros using gin (nome gin_trgm_ops);
+
+create index if not exists idx_livros_titulo_prefixo_trgm
+    on livros using gin (titulo gin_trgm_ops);
+
+
+-- ========== CIRCULAÇÃO MENSAL (ROLLUP) ==========
+-- Totais por mês × gênero × tipo de membro, mantidos por gatilho a cada
+-- empréstimo e devolução (vale para todas as funções acima, inclusive a
+-- devolução em lote). O relatório de circulação lê só esta tabela, então o
+-- custo não depende da quantidade de empréstimos.
+create table if not exists circulacao_mensal (
+    mes date not null,  -- sempre o dia 1 do mês
+    genero text not null,
+    tipo_membro text not null,
+    emprestimos bigint not null default 0,
+    devolucoes bigint not null default 0,
+    devolucoes_atrasadas bigint not null default 0,
+    multas numeric not null default 0,
+    primary key (mes, genero, tipo_membro)
+);
+
+create or replace function atualizar_circulacao_mensal()
+returns trigger
+language plpgsql
+as $$
+declare
+    v_genero text;
+    v_tipo text;
+begin
+    select genero into v_genero from livros where id = new.livro_id;
+    select tipo into v_tipo from membros where id = new.membro_id;
+    v_genero := coalesce(v_genero, 'Outro');
+    v_tipo := coalesce(v_tipo, 'Desconhecido');
+
+    if tg_op = 'INSERT' then
+        insert into circulacao_mensal as c (mes, genero, tipo_membro, emprestimos)
+        values (date_trunc('month', new.data_emprestimo)::date, v_genero, v_tipo, 1)
+        on conflict (mes, genero, tipo_membro) do update
+           set emprestimos = c.emprestimos + 1;
+
+    elsif new.status = 'Devolvido' and old.status = 'Ativo' then
+        insert into circulacao_mensal as c
+            (mes, genero, tipo_membro, devolucoes, devolucoes_atrasadas, multas)
+        values (
+            date_trunc('month', new.data_devolucao_real)::date, v_genero, v_tipo, 1,
+            case when new.data_devolucao_real > new.data_devolucao_prevista
+                 then 1 else 0 end,
+            coalesce(new.multa, 0)
+        )
+        on conflict (mes, genero, tipo_membro) do update
+           set devolucoes = c.devolucoes + 1,
+               devolucoes_atrasadas = c.devolucoes_atrasadas
+                                      + excluded.devolucoes_atrasadas,
+               multas = c.multas + excluded.multas;
+    end if;
+
+    return new;
+end;
+$$;
+
+drop trigger if exists trg_circulacao_mensal on emprestimos;
+create trigger trg_circulacao_mensal
+    after insert or update of status on emprestimos
+    for each row execute function atualizar_circulacao_mensal();
+
+-- Reconstrói o rollup inteiro a partir dos empréstimos e do arquivo.
+-- Rode uma vez após criar a tabela (ou para corrigir divergências).
+create or replace function recalcular_circulacao_mensal()
+returns void
+language plpgsql
+as $$
+begin
+    delete from circulacao_mensal where true;
+
+    insert into circulacao_mensal
+        (mes, genero, tipo_membro, emprestimos, devolucoes,
+         devolucoes_atrasadas, multas)
+    select mes, genero, tipo_membro,
+           sum(emprestimos), sum(devolucoes),
+           sum(devolucoes_atrasadas), sum(multas)
+      from (
+            select date_trunc('month', e.data_emprestimo)::date as mes,
+                   coalesce(l.genero, 'Outro') as genero,
+                   coalesce(m.tipo, 'Desconhecido') as tipo_membro,
+                   1 as emprestimos, 0 as devolucoes,
+                   0 as devolucoes_atrasadas, 0::numeric as multas
+              from (select livro_id, membro_id, data_emprestimo from emprestimos
+                    union all
+                    select livro_id, membro_id, data_emprestimo from emprestimos_arquivo) e
+              left join livros l on l.id = e.livro_id
+              left join membros m on m.id = e.membro_id
+            union all
+            select date_trunc('month', e.data_devolucao_real)::date,
+                   coalesce(l.genero, 'Outro'),
+                   coalesce(m.tipo, 'Desconhecido'),
+                   0, 1,
+                   case when e.data_devolucao_real > e.data_devolucao_prevista
+                        then 1 else 0 end,
+                   coalesce(e.multa, 0)
+              from (select livro_id, membro_id, data_devolucao_real,
+                           data_devolucao_prevista, multa
+                      from emprestimos where status = 'Devolvido'
+                    union all
+                    select livro_id, membro_id, data_devolucao_real,
+                           data_devolucao_prevista, multa
+                      from emprestimos_arquivo) e
+              left join livros l on l.id = e.livro_id
+              left join membros m on m.id = e.membro_id
+           ) t
+     group by mes, genero, tipo_membro;
+end;
+$$;
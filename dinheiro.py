@@ -0,0 +1,53 @@
+# ========== DINHEIRO EM CENTAVOS ==========
+# Valores monetários do financeiro.py e do financeiro_dashboard.py circulam
+# como INTEIROS de centavos (R$ 12,34 → 1234). Somas de inteiros são exatas,
+# enquanto somar float acumula erro (0.1 + 0.2 != 0.3). Só há conversão nas
+# bordas: ao ler o que o usuário digitou, ao falar com o banco e ao exibir.
+# Conceitos: decimal.Decimal, divmod, arredondamento, formatação
+
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+
+def para_centavos(valor):
+    """
+    Converte um valor em reais vindo do banco (número ou texto, ex.: 12.34
+    ou "12.34") para centavos. Passa por Decimal(str(...)) para não herdar
+    a imprecisão do float.
+    """
+    reais = Decimal(str(valor))
+    return int((reais * 100).quantize(Decimal("1"), rounding=ROUND_HALF_UP))
+
+
+def ler_centavos(texto):
+    """
+    Lê um valor digitado pelo usuário e devolve centavos. Aceita
+    "150", "150,5", "150.50" e "1.234,56". Mais de duas casas decimais
+    ou texto que não é número gera ValueError.
+    """
+    texto = texto.strip().replace("R$", "").replace(" ", "")
+    if "," in texto:
+        # Formato brasileiro: ponto separa milhar, vírgula separa centavos
+        texto = texto.replace(".", "").replace(",", ".")
+
+    try:
+        reais = Decimal(texto)
+    except InvalidOperation:
+        raise ValueError(f"valor inválido: {texto!r}")
+
+    if not reais.is_finite() or reais.as_tuple().exponent < -2:
+        raise ValueError(f"valor inválido: {texto!r}")
+    return int(reais * 100)
+
+
+def centavos_para_texto(centavos):
+    """Centavos → "1234.56", formato que o banco (numeric) grava sem perda"""
+    sinal = "-" if centavos < 0 else ""
+    reais, resto = divmod(abs(centavos), 100)
+    return f"{sinal}{reais}.{resto:02d}"
+
+
+def formatar_centavos(centavos):
+    """Centavos → "R$ 1.234,56", usando só aritmética inteira"""
+    sinal = "-" if centavos < 0 else ""
+    reais, resto = divmod(abs(centavos), 100)
+    return f"R$ {sinal}{reais:,}".replace(",", ".") + f",{resto:02d}"
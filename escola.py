@@ -1,47 +1,12 @@
 # ========== SISTEMA DE NOTAS COM SUPABASE ==========
 # Sistema de gerenciamento de alunos com persistência no banco de dados Supabase
 
-import os
 from dotenv import load_dotenv
-from supabase import create_client, Client
+from acesso_dados import obter_cliente, verificar_credenciais
 
 # Carrega as variáveis de ambiente do arquivo .env
 load_dotenv()
 
-# Configuração do Supabase
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-
-# Verifica se as credenciais foram configuradas
-if not SUPABASE_URL or not SUPABASE_KEY or SUPABASE_URL == "sua_url_do_supabase_aqui":
-    print("\n" + "=" * 60)
-    print("⚠ ATENÇÃO: Configure suas credenciais do Supabase!")
-    print("=" * 60)
-    print("\n1. Acesse seu projeto no Supabase")
-    print("2. Vá em Settings > API")
-    print("3. Copie a URL e a anon/public key")
-    print("4. Edite o arquivo .env e cole suas credenciais\n")
-    print("Exemplo:")
-    print("SUPABASE_URL=https://xxxxx.supabase.co")
-    print("SUPABASE_KEY=eyJhbGciOiJIUzI1NiIsInR5cCI...")
-    print("=" * 60)
-    input("\nPressione ENTER para sair...")
-    exit()
-
-# Inicializa o cliente Supabase
-try:
-    # Remove o tipo hint que pode causar problemas
-    supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-    print("✓ Conectado ao Supabase com sucesso!")
-except Exception as e:
-    print(f"✗ Erro ao conectar ao Supabase: {e}")
-    print("\n💡 Possíveis soluções:")
-    print("1. Verifique se as credenciais no arquivo .env estão corretas")
-    print("2. Tente: python -m pip install --upgrade supabase")
-    print("3. Ou instale uma versão específica: python -m pip install supabase==2.0.3")
-    input("\nPressione ENTER para sair...")
-    exit()
-
 # Nome da tabela no Supabase
 TABELA_ALUNOS = "alunos"
 
@@ -87,7 +52,7 @@ def adicionar_aluno():
             "situacao": situacao,
         }
 
-        resultado = supabase.table(TABELA_ALUNOS).insert(dados).execute()
+        resultado = obter_cliente().table(TABELA_ALUNOS).insert(dados).execute()
 
         print(f"\n✓ Aluno '{nome}' cadastrado com sucesso!")
         print(f"  Média: {media:.2f} - {situacao}")
@@ -102,7 +67,13 @@ def listar_alunos():
     """Lista todos os alunos do banco de dados"""
     try:
         # Busca todos os alunos, ordenados por nome
-        resultado = supabase.table(TABELA_ALUNOS).select("*").order("nome").execute()
+        resultado = (
+            obter_cliente()
+            .table(TABELA_ALUNOS)
+            .select("*")
+            .order("nome")
+            .execute()
+        )
         alunos = resultado.data
 
         if not alunos:
@@ -137,7 +108,8 @@ def buscar_aluno():
 
         # Busca alunos cujo nome contenha o texto buscado (case-insensitive)
         resultado = (
-            supabase.table(TABELA_ALUNOS)
+            obter_cliente()
+            .table(TABELA_ALUNOS)
             .select("*")
             .ilike("nome", f"%{nome_busca}%")
             .execute()
@@ -169,7 +141,7 @@ def calcular_estatisticas():
     """Calcula e exibe estatísticas da turma"""
     try:
         # Busca todos os alunos
-        resultado = supabase.table(TABELA_ALUNOS).select("*").execute()
+        resultado = obter_cliente().table(TABELA_ALUNOS).select("*").execute()
         alunos = resultado.data
 
         if not alunos:
@@ -210,7 +182,11 @@ def atualizar_aluno():
     try:
         # Primeiro, lista os alunos para o usuário escolher
         resultado = (
-            supabase.table(TABELA_ALUNOS).select("id, nome").order("nome").execute()
+            obter_cliente()
+            .table(TABELA_ALUNOS)
+            .select("id, nome")
+            .order("nome")
+            .execute()
         )
         alunos = resultado.data
 
@@ -226,7 +202,11 @@ def atualizar_aluno():
 
         # Busca o aluno pelo ID
         resultado = (
-            supabase.table(TABELA_ALUNOS).select("*").eq("id", aluno_id).execute()
+            obter_cliente()
+            .table(TABELA_ALUNOS)
+            .select("*")
+            .eq("id", aluno_id)
+            .execute()
         )
 
         if not resultado.data:
@@ -268,7 +248,7 @@ def atualizar_aluno():
             "situacao": situacao,
         }
 
-        supabase.table(TABELA_ALUNOS).update(dados_atualizacao).eq(
+        obter_cliente().table(TABELA_ALUNOS).update(dados_atualizacao).eq(
             "id", aluno_id
         ).execute()
 
@@ -286,7 +266,11 @@ def excluir_aluno():
     try:
         # Lista os alunos
         resultado = (
-            supabase.table(TABELA_ALUNOS).select("id, nome").order("nome").execute()
+            obter_cliente()
+            .table(TABELA_ALUNOS)
+            .select("id, nome")
+            .order("nome")
+            .execute()
         )
         alunos = resultado.data
 
@@ -302,7 +286,11 @@ def excluir_aluno():
 
         # Busca o aluno
         resultado = (
-            supabase.table(TABELA_ALUNOS).select("*").eq("id", aluno_id).execute()
+            obter_cliente()
+            .table(TABELA_ALUNOS)
+            .select("*")
+            .eq("id", aluno_id)
+            .execute()
         )
 
         if not resultado.data:
@@ -317,7 +305,7 @@ def excluir_aluno():
         )
 
         if confirmacao.lower() == "s":
-            supabase.table(TABELA_ALUNOS).delete().eq("id", aluno_id).execute()
+            obter_cliente().table(TABELA_ALUNOS).delete().eq("id", aluno_id).execute()
             print(f"✓ Aluno '{aluno['nome']}' excluído com sucesso!")
         else:
             print("✗ Exclusão cancelada!")
@@ -368,4 +356,5 @@ def menu_principal():
 
 # Executa o sistema
 if __name__ == "__main__":
+    verificar_credenciais()
     menu_principal()
@@ -0,0 +1,252 @@
+# ========== LEITURA DE EXTRATOS BANCÁRIOS (OFX / CSV) ==========
+# Lê extratos exportados pelo banco para a importação em massa do
+# financeiro.py (python financeiro.py importar extrato.ofx). Os leitores são
+# geradores: o arquivo é percorrido aos poucos, então um extrato de vários
+# anos com centenas de milhares de lançamentos não é carregado na memória.
+# Conceitos: geradores, csv, unicodedata, functools.lru_cache
+#
+# Formatos aceitos:
+#   • OFX 1.x (SGML, tags sem fechamento) e OFX 2.x (XML)
+#   • CSV com cabeçalho e colunas data, descrição e valor (vírgula, ponto e
+#     vírgula ou tab). Valor negativo = despesa, positivo = receita.
+
+import csv
+import html
+import unicodedata
+from datetime import date
+from functools import lru_cache
+
+from dinheiro import ler_centavos
+
+TAMANHO_BLOCO_OFX = 64 * 1024  # Caracteres lidos por vez do arquivo OFX
+
+# Nomes de coluna aceitos no CSV (comparados sem acento e em minúsculas)
+COLUNAS_CSV = {
+    "data": ("data", "date", "data lancamento", "data do lancamento", "dt"),
+    "descricao": ("descricao", "historico", "lancamento", "description", "memo"),
+    "valor": ("valor", "valor (r$)", "amount", "value"),
+}
+
+# Regras padrão: trecho da descrição (sem acento, maiúsculo) → categoria.
+# Regras do arquivo do usuário (carregar_regras) são testadas antes destas.
+REGRAS_PADRAO = [
+    ("SALARIO", "Salário"),
+    ("PROVENTOS", "Salário"),
+    ("RENDIMENTO", "Investimentos"),
+    ("RESGATE", "Investimentos"),
+    ("DIVIDENDO", "Investimentos"),
+    ("MERCADO", "Alimentação"),
+    ("PADARIA", "Alimentação"),
+    ("RESTAURANTE", "Alimentação"),
+    ("IFOOD", "Alimentação"),
+    ("UBER", "Transporte"),
+    ("99 ", "Transporte"),
+    ("POSTO", "Transporte"),
+    ("COMBUSTIVEL", "Transporte"),
+    ("ESTACIONAMENTO", "Transporte"),
+    ("ALUGUEL", "Moradia"),
+    ("CONDOMINIO", "Moradia"),
+    ("FARMACIA", "Saúde"),
+    ("DROGARIA", "Saúde"),
+    ("HOSPITAL", "Saúde"),
+    ("ESCOLA", "Educação"),
+    ("FACULDADE", "Educação"),
+    ("CURSO", "Educação"),
+    ("CINEMA", "Lazer"),
+    ("NETFLIX", "Assinaturas"),
+    ("SPOTIFY", "Assinaturas"),
+    ("ENERGIA", "Contas (água, luz, internet)"),
+    ("SANEAMENTO", "Contas (água, luz, internet)"),
+    ("INTERNET", "Contas (água, luz, internet)"),
+    ("TELEFONE", "Contas (água, luz, internet)"),
+]
+
+
+def _sem_acento(texto):
+    """'Farmácia São João' → 'Farmacia Sao Joao'"""
+    decomposto = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in decomposto if not unicodedata.combining(c))
+
+
+def _codificacao(caminho):
+    """
+    Bancos brasileiros costumam exportar em Windows-1252 (latin-1). Olha o
+    começo do arquivo e escolhe entre cp1252 e UTF-8.
+    """
+    with open(caminho, "rb") as arquivo:
+        amostra = arquivo.read(64 * 1024)
+    cabecalho = amostra[:1024].upper()
+    if b"CHARSET:1252" in cabecalho or b"ISO-8859-1" in cabecalho:
+        return "cp1252"
+    try:
+        amostra.decode("utf-8")
+    except UnicodeDecodeError as erro:
+        # Erro só no último caractere = a amostra cortou um caractere ao meio
+        if erro.start < len(amostra) - 3:
+            return "cp1252"
+    return "utf-8-sig"
+
+
+# ========== OFX ==========
+def _tokens_ofx(arquivo):
+    """
+    Gera (TAG, texto) lendo o OFX em blocos. Funciona no SGML do OFX 1.x
+    (<TRNAMT>-10.00 sem fechamento) e no XML do 2.x, mesmo com o arquivo
+    todo numa única linha.
+    """
+    resto = ""
+    while True:
+        bloco = arquivo.read(TAMANHO_BLOCO_OFX)
+        if not bloco:
+            break
+        partes = (resto + bloco).split("<")
+        resto = partes.pop()  # Pode ter sido cortada no meio: fica para o próximo bloco
+        for parte in partes:
+            tag, _, texto = parte.partition(">")
+            yield tag.strip().upper(), texto.strip()
+    tag, _, texto = resto.partition(">")
+    yield tag.strip().upper(), texto.strip()
+
+
+def ler_ofx(caminho):
+    """Gerador de (número do lançamento, {'data', 'descricao', 'valor'}) de um OFX"""
+    with open(caminho, encoding=_codificacao(caminho), errors="replace") as arquivo:
+        numero = 0
+        lancamento = None  # Campos do <STMTTRN> aberto
+        for tag, texto in _tokens_ofx(arquivo):
+            if tag == "STMTTRN":
+                lancamento = {}
+            elif tag == "/STMTTRN" and lancamento is not None:
+                numero += 1
+                yield numero, {
+                    "data": lancamento.get("DTPOSTED", ""),
+                    "descricao": lancamento.get("MEMO") or lancamento.get("NAME", ""),
+                    "valor": lancamento.get("TRNAMT", ""),
+                }
+                lancamento = None
+            elif lancamento is not None and not tag.startswith("/"):
+                lancamento[tag] = html.unescape(texto)
+
+
+# ========== CSV ==========
+def _mapear_colunas(cabecalho):
+    """{'data': nome da coluna no arquivo, ...} ou None se faltar alguma"""
+    normalizados = {_sem_acento(nome or "").strip().lower(): nome for nome in cabecalho}
+    mapa = {}
+    for campo, apelidos in COLUNAS_CSV.items():
+        nome = next((normalizados[a] for a in apelidos if a in normalizados), None)
+        if nome is None:
+            return None
+        mapa[campo] = nome
+    return mapa
+
+
+def ler_csv(caminho):
+    """
+    Gerador de (número da linha, {'data', 'descricao', 'valor'}) de um CSV.
+    O separador é detectado pelas primeiras linhas.
+    """
+    with open(caminho, encoding=_codificacao(caminho), newline="") as arquivo:
+        amostra = arquivo.read(4096)
+        arquivo.seek(0)
+        try:
+            dialeto = csv.Sniffer().sniff(amostra, delimiters=",;\t")
+        except csv.Error:
+            dialeto = csv.excel
+
+        leitor = csv.DictReader(arquivo, dialect=dialeto)
+        mapa = _mapear_colunas(leitor.fieldnames or [])
+        if mapa is None:
+            raise ValueError(
+                "o CSV precisa das colunas data, descrição e valor "
+                f"(encontradas: {', '.join(leitor.fieldnames or [])})"
+            )
+
+        # Linha 1 é o cabeçalho, então os dados começam na linha 2
+        for numero, linha in enumerate(leitor, 2):
+            yield numero, {campo: linha.get(nome) or "" for campo, nome in mapa.items()}
+
+
+def ler_extrato(caminho):
+    """Escolhe o leitor pela extensão (.ofx ou .csv)"""
+    if caminho.lower().endswith(".ofx"):
+        return ler_ofx(caminho)
+    return ler_csv(caminho)
+
+
+# ========== VALIDAÇÃO E CATEGORIAS ==========
+def _ler_data(texto):
+    """
+    Data do extrato → 'AAAA-MM-DD' (None se inválida). Aceita 20260115 (OFX,
+    com ou sem hora e fuso), 15/01/2026, 15-01-2026 e 2026-01-15. Montada à
+    mão: tentar vários formatos com strptime era metade do tempo da importação.
+    """
+    texto = texto.strip().split(" ")[0]
+    try:
+        if texto[:8].isdigit():  # OFX: 20260115120000[-3:BRT]
+            ano, mes, dia = texto[:4], texto[4:6], texto[6:8]
+        elif texto[4:5] == "-":
+            ano, mes, dia = texto.split("-")
+        else:
+            dia, mes, ano = texto.replace("-", "/").split("/")
+        if len(ano) != 4:
+            return None
+        return date(int(ano), int(mes), int(dia)).isoformat()
+    except ValueError:
+        return None
+
+
+def validar_lancamento(bruto):
+    """
+    Converte um lançamento lido do extrato. Retorna (dados, None) com
+    data ISO, descrição e valor_centavos (com sinal), ou (None, erro).
+    """
+    data = _ler_data(bruto["data"])
+    if data is None:
+        return None, f"data inválida: {bruto['data']!r}"
+
+    # Espaços repetidos atrapalhariam a detecção de duplicatas
+    descricao = " ".join(bruto["descricao"].split())
+    if not descricao:
+        return None, "descrição vazia"
+
+    try:
+        valor_centavos = ler_centavos(bruto["valor"])
+    except ValueError:
+        return None, f"valor inválido: {bruto['valor']!r}"
+    if valor_centavos == 0:
+        return None, "valor zero"
+
+    return {"data": data, "descricao": descricao, "valor_centavos": valor_centavos}, None
+
+
+def carregar_regras(caminho):
+    """
+    Regras do usuário num CSV com colunas 'trecho' e 'categoria' (a primeira
+    que combinar vence), seguidas das REGRAS_PADRAO. Sem o arquivo, só as padrão.
+    """
+    regras = []
+    try:
+        with open(caminho, encoding=_codificacao(caminho), newline="") as arquivo:
+            for linha in csv.DictReader(arquivo):
+                trecho = _sem_acento(linha.get("trecho") or "").strip().upper()
+                categoria = (linha.get("categoria") or "").strip()
+                if trecho and categoria:
+                    regras.append((trecho, categoria))
+    except FileNotFoundError:
+        pass
+    return tuple(regras + REGRAS_PADRAO)
+
+
+@lru_cache(maxsize=4096)
+def classificar(descricao, categorias, regras):
+    """
+    Primeira regra cujo trecho aparece na descrição e cuja categoria é do
+    tipo certo (categorias); sem nenhuma, a última categoria ("Outro").
+    Extratos repetem muito as descrições, daí o cache (limitado).
+    """
+    texto = _sem_acento(descricao).upper()
+    for trecho, categoria in regras:
+        if trecho in texto and categoria in categorias:
+            return categoria
+    return categorias[-1]
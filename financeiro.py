@@ -3,41 +3,32 @@
 # Conceitos: datetime, dicionários, formatação, cálculos financeiros, gráficos ASCII
 
 import os
+import sys
+import time
 from datetime import datetime, date
 from dotenv import load_dotenv
-from supabase import create_client
+from acesso_dados import verificar_credenciais
+from dinheiro import formatar_centavos, ler_centavos
+import extrato
+import replica_financeiro as replica
 
 # Carrega as variáveis de ambiente do arquivo .env
 load_dotenv()
 
-# Configuração do Supabase
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-
-# Verifica se as credenciais foram configuradas
-if not SUPABASE_URL or not SUPABASE_KEY or SUPABASE_URL == "sua_url_do_supabase_aqui":
-    print("\n" + "=" * 60)
-    print("⚠ ATENÇÃO: Configure suas credenciais do Supabase!")
-    print("=" * 60)
-    print("\n1. Acesse seu projeto no Supabase")
-    print("2. Vá em Settings > API")
-    print("3. Copie a URL e a anon/public key")
-    print("4. Edite o arquivo .env e cole suas credenciais\n")
-    input("\nPressione ENTER para sair...")
-    exit()
-
-# Inicializa o cliente Supabase
-try:
-    supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-    print("✓ Conectado ao Supabase com sucesso!")
-except Exception as e:
-    print(f"✗ Erro ao conectar ao Supabase: {e}")
-    input("\nPressione ENTER para sair...")
-    exit()
-
-# Nome da tabela no Supabase
+# Nome da tabela (no Supabase e na réplica local, replica_financeiro.py)
 TABELA_TRANSACOES = "transacoes"
 
+# Linhas por página na lista detalhada do relatório mensal
+TAMANHO_PAGINA = 20
+
+# Importação de extratos (python financeiro.py importar extrato.ofx)
+TAMANHO_LOTE_IMPORTACAO = 1000  # Lançamentos gravados por transação do SQLite
+ARQUIVO_REGRAS = "regras_extrato.csv"  # trecho,categoria (opcional)
+
+# FINANCEIRO_OFFLINE=1 abre sem falar com o Supabase (nem na abertura nem em
+# segundo plano): só a réplica local. Usado pelo medir_inicializacao.py
+MODO_OFFLINE = os.getenv("FINANCEIRO_OFFLINE") == "1"
+
 # Categorias disponíveis organizadas por tipo
 CATEGORIAS_DESPESA = [
     "Alimentação",
@@ -79,9 +70,9 @@ MESES = [
 
 
 # ========== FUNÇÕES UTILITÁRIAS ==========
-def formatar_valor(valor):
-    """Formata um valor numérico para o formato monetário brasileiro (R$)"""
-    return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+def formatar_valor(centavos):
+    """Formata um valor em centavos para o formato monetário brasileiro (R$)"""
+    return formatar_centavos(centavos)
 
 
 def formatar_data(data_str):
@@ -159,8 +150,7 @@ def adicionar_transacao():
 
     # Passo 3: Valor
     try:
-        valor_texto = input("Valor (R$): ").strip().replace(",", ".")
-        valor = float(valor_texto)
+        valor = ler_centavos(input("Valor (R$): "))
         if valor <= 0:
             print("✗ O valor deve ser maior que zero!")
             return
@@ -201,12 +191,13 @@ def adicionar_transacao():
         dados = {
             "tipo": tipo,
             "descricao": descricao,
-            "valor": valor,
+            "valor_centavos": valor,
             "categoria": categoria,
             "data": data_iso,
         }
 
-        supabase.table(TABELA_TRANSACOES).insert(dados).execute()
+        # Grava na réplica local; o envio ao Supabase é feito em segundo plano
+        replica.inserir_transacao(dados)
 
         print(f"\n{'=' * 60}")
         print(f"✓ {emoji} {tipo.upper()} REGISTRADA COM SUCESSO!")
@@ -231,30 +222,38 @@ def listar_transacoes():
 
     opcao = input("\nEscolha: ").strip()
 
-    try:
-        query = supabase.table(TABELA_TRANSACOES).select("*")
+    if opcao == "2":
+        tipo = "Receita"
+        titulo = "RECEITAS"
+    elif opcao == "3":
+        tipo = "Despesa"
+        titulo = "DESPESAS"
+    elif opcao == "1":
+        tipo = None
+        titulo = "TODAS AS TRANSAÇÕES"
+    else:
+        print("✗ Opção inválida!")
+        return
 
-        if opcao == "2":
-            query = query.eq("tipo", "Receita")
-            titulo = "RECEITAS"
-        elif opcao == "3":
-            query = query.eq("tipo", "Despesa")
-            titulo = "DESPESAS"
-        elif opcao == "1":
-            titulo = "TODAS AS TRANSAÇÕES"
-        else:
-            print("✗ Opção inválida!")
-            return
+    # Sem filtro, "? is null" é verdadeiro e todas as linhas passam
+    filtro = "where (? is null or tipo = ?)"
 
-        resultado = query.order("data", desc=True).limit(50).execute()
-        transacoes = resultado.data
+    try:
+        transacoes = replica.consultar(
+            f"select * from {TABELA_TRANSACOES} {filtro} "
+            "order by data desc, id desc limit 50",
+            (tipo, tipo),
+        )
+        total_registros = replica.consultar(
+            f"select count(*) as total from {TABELA_TRANSACOES} {filtro}", (tipo, tipo)
+        )[0]["total"]
 
         if not transacoes:
             print("\n⚠ Nenhuma transação encontrada!")
             return
 
         print(f"\n{'=' * 90}")
-        print(f"📋 {titulo} (Exibindo: {len(transacoes)})")
+        print(f"📋 {titulo} (Exibindo: {len(transacoes)} de {total_registros})")
         print(f"{'=' * 90}")
 
         # Cabeçalho da tabela
@@ -263,9 +262,6 @@ def listar_transacoes():
         )
         print("-" * 90)
 
-        total_receitas = 0
-        total_despesas = 0
-
         for t in transacoes:
             emoji = "📈" if t["tipo"] == "Receita" else "📉"
 
@@ -281,23 +277,19 @@ def listar_transacoes():
                 else t["categoria"]
             )
 
-            valor_formatado = formatar_valor(t["valor"])
+            valor_formatado = formatar_valor(t["valor_centavos"])
 
             print(
                 f"{formatar_data(t['data']):<12} {emoji} {t['tipo']:<7} {cat:<25} {desc:<25} {valor_formatado:>12}"
             )
 
-            if t["tipo"] == "Receita":
-                total_receitas += t["valor"]
-            else:
-                total_despesas += t["valor"]
-
+        # Totais de TODAS as transações (não só das exibidas), lidos do razão
+        totais = replica.saldo_atual()
         print("-" * 90)
-        print(f"  📈 Total Receitas: {formatar_valor(total_receitas)}")
-        print(f"  📉 Total Despesas: {formatar_valor(total_despesas)}")
-        saldo = total_receitas - total_despesas
-        emoji_saldo = "✅" if saldo >= 0 else "🔴"
-        print(f"  {emoji_saldo} Saldo: {formatar_valor(saldo)}")
+        print(f"  📈 Total Receitas: {formatar_valor(totais['receitas'])}")
+        print(f"  📉 Total Despesas: {formatar_valor(totais['despesas'])}")
+        emoji_saldo = "✅" if totais["saldo"] >= 0 else "🔴"
+        print(f"  {emoji_saldo} Saldo: {formatar_valor(totais['saldo'])}")
 
     except Exception as e:
         print(f"✗ Erro ao listar transações: {e}")
@@ -327,14 +319,12 @@ def buscar_transacao():
 
         campo = campo_busca[opcao]
 
-        resultado = (
-            supabase.table(TABELA_TRANSACOES)
-            .select("*")
-            .ilike(campo, f"%{termo}%")
-            .order("data", desc=True)
-            .execute()
+        # LIKE do SQLite já ignora maiúsculas/minúsculas (letras sem acento)
+        transacoes = replica.consultar(
+            f"select * from {TABELA_TRANSACOES} where {campo} like ? "
+            "order by data desc",
+            (f"%{termo}%",),
         )
-        transacoes = resultado.data
 
         if not transacoes:
             print(f"✗ Nenhuma transação encontrada com '{termo}'")
@@ -347,17 +337,18 @@ def buscar_transacao():
         for t in transacoes:
             emoji = "📈" if t["tipo"] == "Receita" else "📉"
             print(f"\n  {emoji} {t['descricao']} (ID: {t['id']})")
-            print(f"     Valor: {formatar_valor(t['valor'])}")
+            print(f"     Valor: {formatar_valor(t['valor_centavos'])}")
             print(f"     Categoria: {t['categoria']}")
             print(f"     Data: {formatar_data(t['data'])}")
 
             if t["tipo"] == "Receita":
-                total += t["valor"]
+                total += t["valor_centavos"]
             else:
-                total -= t["valor"]
+                total -= t["valor_centavos"]
 
         print("-" * 60)
         print(f"  Impacto total das transações encontradas: {formatar_valor(total)}")
+        print(f"  Saldo atual: {formatar_valor(replica.saldo_atual()['saldo'])}")
 
     except Exception as e:
         print(f"✗ Erro ao buscar transação: {e}")
@@ -376,23 +367,20 @@ def editar_transacao():
         return
 
     try:
-        resultado = (
-            supabase.table(TABELA_TRANSACOES)
-            .select("*")
-            .eq("id", id_transacao)
-            .execute()
+        resultado = replica.consultar(
+            f"select * from {TABELA_TRANSACOES} where id = ?", (id_transacao,)
         )
 
-        if not resultado.data:
+        if not resultado:
             print("✗ Transação não encontrada!")
             return
 
-        t = resultado.data[0]
+        t = resultado[0]
 
         emoji = "📈" if t["tipo"] == "Receita" else "📉"
         print(f"\n  {emoji} Transação atual:")
         print(f"     Descrição: {t['descricao']}")
-        print(f"     Valor: {formatar_valor(t['valor'])}")
+        print(f"     Valor: {formatar_valor(t['valor_centavos'])}")
         print(f"     Categoria: {t['categoria']}")
         print(f"     Data: {formatar_data(t['data'])}")
 
@@ -405,11 +393,11 @@ def editar_transacao():
 
         # Editar valor
         novo_valor_texto = input(
-            f"  Novo valor [{formatar_valor(t['valor'])}]: "
+            f"  Novo valor [{formatar_valor(t['valor_centavos'])}]: "
         ).strip()
         if novo_valor_texto:
             try:
-                novo_valor = float(novo_valor_texto.replace(",", "."))
+                novo_valor = ler_centavos(novo_valor_texto)
                 if novo_valor <= 0:
                     print("✗ Valor deve ser maior que zero!")
                     return
@@ -417,7 +405,7 @@ def editar_transacao():
                 print("✗ Valor inválido!")
                 return
         else:
-            novo_valor = t["valor"]
+            novo_valor = t["valor_centavos"]
 
         # Editar categoria
         categorias = (
@@ -457,14 +445,15 @@ def editar_transacao():
         # Salvar alterações
         dados_atualizacao = {
             "descricao": nova_descricao,
-            "valor": novo_valor,
+            "valor_centavos": novo_valor,
             "categoria": nova_categoria,
             "data": nova_data,
         }
 
-        supabase.table(TABELA_TRANSACOES).update(dados_atualizacao).eq(
-            "id", id_transacao
-        ).execute()
+        if not replica.atualizar_transacao(id_transacao, dados_atualizacao):
+            # Acabou de subir ao servidor e ganhou o ID definitivo
+            print("✗ Transação não encontrada! Liste novamente para ver o ID atual.")
+            return
 
         print(f"\n{'=' * 60}")
         print("✓ TRANSAÇÃO ATUALIZADA COM SUCESSO!")
@@ -491,23 +480,20 @@ def excluir_transacao():
         return
 
     try:
-        resultado = (
-            supabase.table(TABELA_TRANSACOES)
-            .select("*")
-            .eq("id", id_transacao)
-            .execute()
+        resultado = replica.consultar(
+            f"select * from {TABELA_TRANSACOES} where id = ?", (id_transacao,)
         )
 
-        if not resultado.data:
+        if not resultado:
             print("✗ Transação não encontrada!")
             return
 
-        t = resultado.data[0]
+        t = resultado[0]
 
         emoji = "📈" if t["tipo"] == "Receita" else "📉"
         print(f"\n  {emoji} Transação a ser excluída:")
         print(f"     Descrição: {t['descricao']}")
-        print(f"     Valor: {formatar_valor(t['valor'])}")
+        print(f"     Valor: {formatar_valor(t['valor_centavos'])}")
         print(f"     Data: {formatar_data(t['data'])}")
 
         confirmacao = input("\n  Tem certeza? (s/n): ").strip().lower()
@@ -515,7 +501,9 @@ def excluir_transacao():
             print("  Operação cancelada.")
             return
 
-        supabase.table(TABELA_TRANSACOES).delete().eq("id", id_transacao).execute()
+        if not replica.excluir_transacao(id_transacao):
+            print("✗ Transação não encontrada! Liste novamente para ver o ID atual.")
+            return
         print("\n✓ Transação excluída com sucesso!")
 
     except Exception as e:
@@ -558,16 +546,9 @@ def relatorio_mensal():
         ultimo_dia = f"{ano}-{mes_num + 1:02d}-01"
 
     try:
-        # Busca transações do mês
-        resultado = (
-            supabase.table(TABELA_TRANSACOES)
-            .select("*")
-            .gte("data", primeiro_dia)
-            .lt("data", ultimo_dia)
-            .order("data")
-            .execute()
-        )
-        transacoes = resultado.data
+        # Uma consulta agrupada devolve só os totais por tipo e categoria
+        # (poucas linhas), em vez de todas as transações do mês
+        grupos = replica.resumo_do_periodo(primeiro_dia, ultimo_dia)
 
         nome_mes = MESES[mes_num - 1]
 
@@ -575,17 +556,18 @@ def relatorio_mensal():
         print(f"📊 RELATÓRIO FINANCEIRO — {nome_mes.upper()} / {ano}")
         print(f"{'=' * 70}")
 
-        if not transacoes:
+        if not grupos:
             print("\n⚠ Nenhuma transação encontrada neste mês!")
             return
 
-        # Separa receitas e despesas
-        receitas = [t for t in transacoes if t["tipo"] == "Receita"]
-        despesas = [t for t in transacoes if t["tipo"] == "Despesa"]
+        # Separa receitas e despesas (já vêm ordenadas do maior para o menor)
+        receitas = [g for g in grupos if g["tipo"] == "Receita"]
+        despesas = [g for g in grupos if g["tipo"] == "Despesa"]
 
-        total_receitas = sum(t["valor"] for t in receitas)
-        total_despesas = sum(t["valor"] for t in despesas)
+        total_receitas = sum(g["total"] for g in receitas)
+        total_despesas = sum(g["total"] for g in despesas)
         saldo = total_receitas - total_despesas
+        quantidade = sum(g["quantidade"] for g in grupos)
 
         # ---- Resumo Geral ----
         print("\n  ┌────────────────────────────────────────────────────┐")
@@ -602,6 +584,10 @@ def relatorio_mensal():
 
         print("  └────────────────────────────────────────────────────┘")
 
+        # Saldo histórico direto do razão ("-31" cobre o último dia de qualquer mês)
+        acumulado = replica.saldo_em(f"{ano}-{mes_num:02d}-31")
+        print(f"  📌 Saldo acumulado até o fim do mês: {formatar_valor(acumulado['saldo'])}")
+
         # ---- Proporção Receitas vs Despesas (barra visual) ----
         total_geral = total_receitas + total_despesas
         if total_geral > 0:
@@ -622,22 +608,10 @@ def relatorio_mensal():
             print("  📉 DESPESAS POR CATEGORIA")
             print(f"  {'─' * 60}")
 
-            # Agrupa despesas por categoria
-            gastos_por_categoria = {}
-            for d in despesas:
-                cat = d["categoria"]
-                gastos_por_categoria[cat] = (
-                    gastos_por_categoria.get(cat, 0) + d["valor"]
-                )
-
-            # Ordena por valor (maior para menor)
-            categorias_ordenadas = sorted(
-                gastos_por_categoria.items(), key=lambda x: x[1], reverse=True
-            )
-
-            maior_valor = categorias_ordenadas[0][1] if categorias_ordenadas else 0
+            maior_valor = despesas[0]["total"]
 
-            for cat, valor in categorias_ordenadas:
+            for g in despesas:
+                cat, valor = g["categoria"], g["total"]
                 pct = (valor / total_despesas) * 100 if total_despesas > 0 else 0
                 barra = gerar_barra(valor, maior_valor, 25)
                 print(f"  {cat:<28} {barra} {formatar_valor(valor):>12} ({pct:5.1f}%)")
@@ -648,48 +622,66 @@ def relatorio_mensal():
             print("  📈 RECEITAS POR CATEGORIA")
             print(f"  {'─' * 60}")
 
-            ganhos_por_categoria = {}
-            for r in receitas:
-                cat = r["categoria"]
-                ganhos_por_categoria[cat] = (
-                    ganhos_por_categoria.get(cat, 0) + r["valor"]
-                )
-
-            categorias_ordenadas = sorted(
-                ganhos_por_categoria.items(), key=lambda x: x[1], reverse=True
-            )
-
-            maior_valor = categorias_ordenadas[0][1] if categorias_ordenadas else 0
+            maior_valor = receitas[0]["total"]
 
-            for cat, valor in categorias_ordenadas:
+            for g in receitas:
+                cat, valor = g["categoria"], g["total"]
                 pct = (valor / total_receitas) * 100 if total_receitas > 0 else 0
                 barra = gerar_barra(valor, maior_valor, 25)
                 print(f"  {cat:<28} {barra} {formatar_valor(valor):>12} ({pct:5.1f}%)")
 
-        # ---- Lista detalhada ----
+        # ---- Lista detalhada (opcional, em páginas) ----
         print(f"\n  {'─' * 60}")
-        print(f"  📋 TRANSAÇÕES DO MÊS ({len(transacoes)} registros)")
+        print(f"  📋 TRANSAÇÕES DO MÊS ({quantidade} registros)")
         print(f"  {'─' * 60}")
 
-        for t in transacoes:
+        ver = input("  Ver a lista de transações? (s/n): ").strip().lower()
+        if ver == "s":
+            listar_periodo_paginado(primeiro_dia, ultimo_dia)
+
+    except Exception as e:
+        print(f"✗ Erro ao gerar relatório: {e}")
+
+
+def listar_periodo_paginado(primeiro_dia, ultimo_dia):
+    """
+    Mostra as transações do período de TAMANHO_PAGINA em TAMANHO_PAGINA.
+    Paginação por chave (data, id): cada página continua de onde a anterior
+    parou, sem OFFSET, então a página 100 custa o mesmo que a primeira.
+    """
+    ultima = ("", 0)  # (data, id) da última linha exibida
+    while True:
+        pagina = replica.consultar(
+            f"select * from {TABELA_TRANSACOES} "
+            "where data >= ? and data < ? and (data, id) > (?, ?) "
+            "order by data, id limit ?",
+            (primeiro_dia, ultimo_dia, ultima[0], ultima[1], TAMANHO_PAGINA),
+        )
+        for t in pagina:
             emoji = "📈" if t["tipo"] == "Receita" else "📉"
             print(
-                f"  {formatar_data(t['data'])} {emoji} {t['descricao']:<30} {formatar_valor(t['valor']):>12}"
+                f"  {formatar_data(t['data'])} {emoji} {t['descricao']:<30} {formatar_valor(t['valor_centavos']):>12}"
             )
 
-    except Exception as e:
-        print(f"✗ Erro ao gerar relatório: {e}")
+        if len(pagina) < TAMANHO_PAGINA:
+            return
+        ultima = (pagina[-1]["data"], pagina[-1]["id"])
+        if input("  ENTER para mais, 'q' para sair: ").strip().lower() == "q":
+            return
 
 
 def estatisticas_financeiras():
     """Calcula e exibe estatísticas completas das finanças"""
     try:
-        resultado = (
-            supabase.table(TABELA_TRANSACOES).select("*").order("data").execute()
-        )
-        transacoes = resultado.data
+        # Nenhuma transação é carregada: totais por categoria e por mês vêm
+        # do razão e maior/menor/top 5 do índice por valor (replica_financeiro.py)
+        categorias_receita = replica.totais_por_categoria("Receita")
+        categorias_despesa = replica.totais_por_categoria("Despesa")
 
-        if not transacoes:
+        qtd_receitas = sum(c["quantidade"] for c in categorias_receita)
+        qtd_despesas = sum(c["quantidade"] for c in categorias_despesa)
+
+        if qtd_receitas + qtd_despesas == 0:
             print("\n⚠ Nenhuma transação cadastrada!")
             return
 
@@ -697,22 +689,19 @@ def estatisticas_financeiras():
         print("📊 ESTATÍSTICAS FINANCEIRAS")
         print(f"{'=' * 70}")
 
-        # Separa por tipo
-        receitas = [t for t in transacoes if t["tipo"] == "Receita"]
-        despesas = [t for t in transacoes if t["tipo"] == "Despesa"]
-
-        total_receitas = sum(t["valor"] for t in receitas)
-        total_despesas = sum(t["valor"] for t in despesas)
-        saldo_total = total_receitas - total_despesas
+        totais = replica.saldo_atual()
+        total_receitas = totais["receitas"]
+        total_despesas = totais["despesas"]
+        saldo_total = totais["saldo"]
 
         # ---- Visão Geral ----
         print("\n  💰 VISÃO GERAL")
-        print(f"  Total de transações: {len(transacoes)}")
+        print(f"  Total de transações: {qtd_receitas + qtd_despesas}")
         print(
-            f"  Receitas: {len(receitas)} transações = {formatar_valor(total_receitas)}"
+            f"  Receitas: {qtd_receitas} transações = {formatar_valor(total_receitas)}"
         )
         print(
-            f"  Despesas: {len(despesas)} transações = {formatar_valor(total_despesas)}"
+            f"  Despesas: {qtd_despesas} transações = {formatar_valor(total_despesas)}"
         )
 
         emoji_saldo = "✅" if saldo_total >= 0 else "🔴"
@@ -720,56 +709,45 @@ def estatisticas_financeiras():
 
         # ---- Médias ----
         print(f"\n  📏 MÉDIAS")
-        if receitas:
-            media_receita = total_receitas / len(receitas)
-            maior_receita = max(receitas, key=lambda x: x["valor"])
+        if qtd_receitas:
+            media_receita = round(total_receitas / qtd_receitas)
+            maior_receita = replica.maiores_transacoes("Receita", 1)[0]
             print(f"  Média por receita: {formatar_valor(media_receita)}")
             print(
-                f"  Maior receita: {formatar_valor(maior_receita['valor'])} ({maior_receita['descricao']})"
+                f"  Maior receita: {formatar_valor(maior_receita['valor_centavos'])} ({maior_receita['descricao']})"
             )
 
-        if despesas:
-            media_despesa = total_despesas / len(despesas)
-            maior_despesa = max(despesas, key=lambda x: x["valor"])
-            menor_despesa = min(despesas, key=lambda x: x["valor"])
+        top_despesas = replica.maiores_transacoes("Despesa", 5)
+        if qtd_despesas:
+            media_despesa = round(total_despesas / qtd_despesas)
+            maior_despesa = top_despesas[0]
+            menor_despesa = replica.maiores_transacoes("Despesa", 1, decrescente=False)[0]
             print(f"  Média por despesa: {formatar_valor(media_despesa)}")
             print(
-                f"  Maior despesa: {formatar_valor(maior_despesa['valor'])} ({maior_despesa['descricao']})"
+                f"  Maior despesa: {formatar_valor(maior_despesa['valor_centavos'])} ({maior_despesa['descricao']})"
             )
             print(
-                f"  Menor despesa: {formatar_valor(menor_despesa['valor'])} ({menor_despesa['descricao']})"
+                f"  Menor despesa: {formatar_valor(menor_despesa['valor_centavos'])} ({menor_despesa['descricao']})"
             )
 
         # ---- Top 5 maiores despesas ----
-        if despesas:
+        if qtd_despesas:
             print(f"\n  🏆 TOP 5 MAIORES DESPESAS")
-            despesas_ordenadas = sorted(
-                despesas, key=lambda x: x["valor"], reverse=True
-            )
-            for i, d in enumerate(despesas_ordenadas[:5], 1):
+            for i, d in enumerate(top_despesas, 1):
                 print(
-                    f"  {i}. {formatar_valor(d['valor']):>12} — {d['descricao']} ({formatar_data(d['data'])})"
+                    f"  {i}. {formatar_valor(d['valor_centavos']):>12} — {d['descricao']} ({formatar_data(d['data'])})"
                 )
 
         # ---- Gastos por Categoria (todas as transações) ----
-        if despesas:
+        if qtd_despesas:
             print(f"\n  📂 DESPESAS POR CATEGORIA (GERAL)")
             print(f"  {'─' * 55}")
 
-            gastos_por_categoria = {}
-            for d in despesas:
-                cat = d["categoria"]
-                gastos_por_categoria[cat] = (
-                    gastos_por_categoria.get(cat, 0) + d["valor"]
-                )
-
-            categorias_ordenadas = sorted(
-                gastos_por_categoria.items(), key=lambda x: x[1], reverse=True
-            )
+            # Já vêm do maior para o menor total
+            maior_valor = categorias_despesa[0]["total"]
 
-            maior_valor = categorias_ordenadas[0][1] if categorias_ordenadas else 0
-
-            for cat, valor in categorias_ordenadas:
+            for c in categorias_despesa:
+                cat, valor = c["categoria"], c["total"]
                 pct = (valor / total_despesas) * 100 if total_despesas > 0 else 0
                 barra = gerar_barra(valor, maior_valor, 20)
                 print(f"  {cat:<28} {barra} {formatar_valor(valor):>12} ({pct:5.1f}%)")
@@ -778,32 +756,22 @@ def estatisticas_financeiras():
         print(f"\n  📈 EVOLUÇÃO MENSAL")
         print(f"  {'─' * 55}")
 
-        # Agrupa transações por mês
-        meses_dados = {}
-        for t in transacoes:
-            chave_mes = t["data"][:7]  # Pega YYYY-MM
-            if chave_mes not in meses_dados:
-                meses_dados[chave_mes] = {"receitas": 0, "despesas": 0}
-
-            if t["tipo"] == "Receita":
-                meses_dados[chave_mes]["receitas"] += t["valor"]
-            else:
-                meses_dados[chave_mes]["despesas"] += t["valor"]
+        # Totais por mês já agrupados pelo razão, em ordem cronológica
+        meses_dados = replica.listar_saldos_mensais()
 
         # Encontra o maior valor para escala das barras
         todos_valores = []
-        for dados in meses_dados.values():
+        for dados in meses_dados:
             todos_valores.append(dados["receitas"])
             todos_valores.append(dados["despesas"])
         maior_valor_mensal = max(todos_valores) if todos_valores else 0
 
         # Exibe mês a mês em ordem cronológica
-        for chave_mes in sorted(meses_dados.keys()):
-            dados = meses_dados[chave_mes]
-            ano_mes = chave_mes.split("-")
+        for dados in meses_dados:
+            ano_mes = dados["mes"].split("-")
             nome_mes_label = f"{MESES[int(ano_mes[1]) - 1][:3]}/{ano_mes[0]}"
 
-            saldo_mes = dados["receitas"] - dados["despesas"]
+            saldo_mes = dados["saldo"]
             emoji_mes = "✅" if saldo_mes >= 0 else "🔴"
 
             barra_rec = gerar_barra(dados["receitas"], maior_valor_mensal, 15)
@@ -820,6 +788,121 @@ def estatisticas_financeiras():
         print(f"✗ Erro ao calcular estatísticas: {e}")
 
 
+# ========== IMPORTAÇÃO DE EXTRATOS ==========
+def importar_extrato(caminho, tamanho_lote=TAMANHO_LOTE_IMPORTACAO):
+    """
+    Importa um extrato bancário (OFX ou CSV, veja extrato.py) para a réplica
+    local, em lotes de tamanho_lote lançamentos. A categoria vem das regras
+    (ARQUIVO_REGRAS + padrão) e lançamentos que já existem com a mesma data,
+    valor e descrição são ignorados, então importar o mesmo extrato de novo
+    não duplica nada. Mostra velocidade, duplicatas e linhas rejeitadas.
+    """
+    print("\n" + "=" * 60)
+    print("📥 IMPORTAÇÃO DE EXTRATO")
+    print("=" * 60)
+    print(f"  Arquivo: {caminho} | Lote: {tamanho_lote} lançamentos")
+
+    regras = extrato.carregar_regras(ARQUIVO_REGRAS)
+    categorias = {
+        "Receita": tuple(CATEGORIAS_RECEITA),
+        "Despesa": tuple(CATEGORIAS_DESPESA),
+    }
+
+    lote = []
+    importados = 0
+    duplicados = 0
+    total_rejeitados = 0
+    rejeitados = []  # Guarda só os primeiros erros para exibir no final
+    inicio = time.perf_counter()
+
+    try:
+        for numero, bruto in extrato.ler_extrato(caminho):
+            lancamento, erro = extrato.validar_lancamento(bruto)
+            if erro:
+                total_rejeitados += 1
+                if len(rejeitados) < 20:
+                    rejeitados.append((numero, erro))
+                continue
+
+            tipo = "Receita" if lancamento["valor_centavos"] > 0 else "Despesa"
+            lote.append(
+                {
+                    "tipo": tipo,
+                    "descricao": lancamento["descricao"],
+                    "valor_centavos": abs(lancamento["valor_centavos"]),
+                    "categoria": extrato.classificar(
+                        lancamento["descricao"], categorias[tipo], regras
+                    ),
+                    "data": lancamento["data"],
+                }
+            )
+            if len(lote) >= tamanho_lote:
+                inseridos, repetidos = replica.inserir_lote(lote)
+                importados += inseridos
+                duplicados += repetidos
+                lote = []
+                print(f"  ... {importados} lançamentos importados")
+
+        if lote:
+            inseridos, repetidos = replica.inserir_lote(lote)
+            importados += inseridos
+            duplicados += repetidos
+
+    except FileNotFoundError:
+        print(f"✗ Arquivo '{caminho}' não encontrado!")
+        return
+    except Exception as e:
+        print(f"✗ Erro na importação (após {importados} lançamentos): {e}")
+        return
+
+    duracao = time.perf_counter() - inicio
+    lidos = importados + duplicados
+    velocidade = lidos / duracao if duracao > 0 else 0
+
+    print(f"\n✓ {importados} lançamento(s) importado(s) em {duracao:.1f}s")
+    print(f"  Já existentes (ignorados): {duplicados}")
+    print(f"  Velocidade: {velocidade:.0f} linhas/segundo")
+
+    if total_rejeitados:
+        print(f"\n⚠ {total_rejeitados} linha(s) rejeitada(s):")
+        for numero, erro in rejeitados:
+            print(f"    Linha {numero}: {erro}")
+        if total_rejeitados > len(rejeitados):
+            print(f"    ... e mais {total_rejeitados - len(rejeitados)}")
+
+
+# ========== SINCRONIZAÇÃO ==========
+def sincronizar_agora():
+    """Sincroniza a réplica local com o Supabase e mostra a situação"""
+    print("\n" + "=" * 60)
+    print("🔄 SINCRONIZAÇÃO")
+    print("=" * 60)
+
+    try:
+        resumo = replica.sincronizar()
+        print(f"  ✓ Enviadas: {resumo['enviadas']} alteração(ões)")
+        print(f"  ✓ Recebidas: {resumo['recebidas']} transação(ões)")
+        print(f"  ✓ Exclusões aplicadas: {resumo['excluidas']}")
+        if resumo["conflitos"]:
+            print(
+                f"  ⚠ {resumo['conflitos']} alteração(ões) descartada(s): "
+                "a transação mudou no servidor antes"
+            )
+    except Exception as e:
+        print(f"  ✗ Sem conexão com o Supabase: {e}")
+        print("  As alterações continuam salvas localmente.")
+
+    print(f"\n  Pendentes de envio: {replica.contar_pendencias()}")
+
+    conflitos = replica.listar_conflitos(5)
+    if conflitos:
+        print("\n  Últimos conflitos (versão do servidor mantida):")
+        for c in conflitos:
+            print(
+                f"    {c['registrado_em']} — {c['operacao']} da transação {c['transacao_id']}"
+            )
+
+
 # ========== MENU PRINCIPAL ==========
 def menu_principal():
     """Menu interativo do sistema financeiro"""
@@ -834,6 +917,7 @@ def menu_principal():
         print("  5. 🗑️  Excluir Transação")
         print("  6. 📊 Relatório Mensal")
         print("  7. 📈 Estatísticas Financeiras")
+        print("  8. 🔄 Sincronizar Agora")
         print("  0. 🚪 Sair")
         print("=" * 60)
 
@@ -853,6 +937,8 @@ def menu_principal():
             relatorio_mensal()
         elif opcao == "7":
             estatisticas_financeiras()
+        elif opcao == "8":
+            sincronizar_agora()
         elif opcao == "0":
             print("\n✓ Encerrando sistema financeiro... Até logo! 👋")
             break
@@ -861,5 +947,27 @@ def menu_principal():
 
 
 # Executa o sistema
+# Uso: python financeiro.py                               → menu interativo
+#      python financeiro.py importar extrato.ofx|.csv [N] → importa extrato
 if __name__ == "__main__":
-    menu_principal()
+    verificar_credenciais()
+
+    # Primeira execução: baixa tudo antes do menu; depois é só incremental.
+    # A importação também precisa disso para reconhecer lançamentos já existentes
+    if not MODO_OFFLINE and not replica.ja_sincronizou():
+        print("🔄 Baixando transações para a cópia local...")
+        try:
+            replica.sincronizar()
+        except Exception as e:
+            print(f"⚠ Sem conexão com o Supabase ({e}). Trabalhando offline.")
+
+    if len(sys.argv) >= 3 and sys.argv[1] == "importar":
+        lote = int(sys.argv[3]) if len(sys.argv) >= 4 else TAMANHO_LOTE_IMPORTACAO
+        importar_extrato(sys.argv[2], lote)
+        # Envia o que entrou (em lotes); sem internet fica para a próxima vez
+        if not MODO_OFFLINE:
+            sincronizar_agora()
+    else:
+        if not MODO_OFFLINE:
+            replica.iniciar_sincronizacao_automatica()
+        menu_principal()
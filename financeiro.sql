@@ -0,0 +1,88 @@
+-- ========== FUNÇÕES E ÍNDICES DO CONTROLE FINANCEIRO (SUPABASE / POSTGRES) ==========
+-- Execute este arquivo no SQL Editor do Supabase antes de usar o financeiro.py
+-- As funções são chamadas pelo Python com supabase.rpc("nome", {...})
+
+
+-- ========== SINCRONIZAÇÃO DA RÉPLICA LOCAL ==========
+-- O financeiro.py trabalha numa cópia SQLite (replica_financeiro.py) e só
+-- troca com o servidor o que mudou. Para isso cada linha guarda quando foi
+-- alterada pela última vez, e as exclusões deixam um registro ("lápide").
+alter table transacoes
+    add column if not exists atualizado_em timestamptz not null default now();
+
+-- Identificador gerado pelo cliente na criação: reenviar a mesma inserção
+-- (ex.: a conexão caiu antes da resposta) não duplica a transação
+alter table transacoes add column if not exists chave_cliente text unique;
+
+create index if not exists idx_transacoes_atualizado_em
+    on transacoes (atualizado_em, id);
+
+create or replace function tocar_atualizado_em()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.atualizado_em := now();
+    return new;
+end;
+$$;
+
+drop trigger if exists trg_transacoes_atualizado_em on transacoes;
+create trigger trg_transacoes_atualizado_em
+    before update on transacoes
+    for each row
+    execute function tocar_atualizado_em();
+
+create table if not exists transacoes_excluidas (
+    id bigint primary key,
+    excluida_em timestamptz not null default now()
+);
+
+-- (excluida_em, id): a réplica baixa as lápides paginando por cursor nesse par
+drop index if exists idx_transacoes_excluidas_em;
+create index if not exists idx_transacoes_excluidas_em_id
+    on transacoes_excluidas (excluida_em, id);
+
+create or replace function registrar_exclusao_transacao()
+returns trigger
+language plpgsql
+as $$
+begin
+    insert into transacoes_excluidas (id)
+    values (old.id)
+    on conflict (id) do update set excluida_em = now();
+    return old;
+end;
+$$;
+
+drop trigger if exists trg_transacoes_exclusao on transacoes;
+create trigger trg_transacoes_exclusao
+    after delete on transacoes
+    for each row
+    execute function registrar_exclusao_transacao();
+
+
+-- ========== VALORES EXATOS ==========
+-- Dinheiro em numeric (decimal exato), nunca em float: somar float acumula
+-- erro de arredondamento. O Python trabalha em centavos inteiros (dinheiro.py)
+-- e envia o valor como texto "1234.56", que o numeric grava sem perda.
+-- Só converte se a coluna ainda não for numeric(14, 2): o alter type reescreve
+-- a tabela inteira com trava exclusiva, e este arquivo roda de novo a cada
+-- atualização.
+do $$
+begin
+    if exists (
+        select 1
+        from information_schema.columns
+        where table_schema = current_schema()
+          and table_name = 'transacoes'
+          and column_name = 'valor'
+          and (data_type <> 'numeric'
+               or numeric_precision is distinct from 14
+               or numeric_scale is distinct from 2)
+    ) then
+        alter table transacoes
+            alter column valor type numeric(14, 2) using round(valor::numeric, 2);
+    end if;
+end;
+$$;
@@ -10,6 +10,7 @@ import plotly.graph_objects as go
 from datetime import datetime, date
 from dotenv import load_dotenv
 from supabase import create_client
+from dinheiro import formatar_centavos, para_centavos
 
 # ========== CONFIGURAÇÃO DA PÁGINA =========
 st.set_page_config(
@@ -192,6 +193,8 @@ def carregar_transacoes():
 
     df = pd.DataFrame(resultado.data)
     df["data"] = pd.to_datetime(df["data"])
+    # Somas em centavos inteiros (exatas); reais (÷100) só na hora de plotar
+    df["centavos"] = df["valor"].map(para_centavos).astype("int64")
     df["mes"] = df["data"].dt.month
     df["ano"] = df["data"].dt.year
     df["mes_nome"] = df["mes"].apply(lambda m: MESES_PT[m - 1])
@@ -200,9 +203,16 @@ def carregar_transacoes():
     return df
 
 
-def formatar_valor(valor):
-    """Formata um valor numérico para o formato monetário brasileiro (R$)"""
-    return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+def formatar_valor(centavos):
+    """Formata um valor em centavos para o formato monetário brasileiro (R$)"""
+    return formatar_centavos(int(centavos))
+
+
+def somar_em_reais(df, colunas):
+    """Soma os centavos agrupando por 'colunas' e devolve a coluna 'valor' em reais"""
+    df_agrupado = df.groupby(colunas)["centavos"].sum().reset_index()
+    df_agrupado["valor"] = df_agrupado["centavos"] / 100
+    return df_agrupado
 
 
 # ========== LAYOUT DOS GRÁFICOS (cores e tema) ==========
@@ -232,8 +242,8 @@ LAYOUT_PADRAO = dict(
 # ========== COMPONENTES VISUAIS ==========
 def renderizar_kpis(df_filtrado):
     """Renderiza os cards de KPI (Receitas, Despesas, Saldo, Total)"""
-    receitas = df_filtrado[df_filtrado["tipo"] == "Receita"]["valor"].sum()
-    despesas = df_filtrado[df_filtrado["tipo"] == "Despesa"]["valor"].sum()
+    receitas = df_filtrado[df_filtrado["tipo"] == "Receita"]["centavos"].sum()
+    despesas = df_filtrado[df_filtrado["tipo"] == "Despesa"]["centavos"].sum()
     saldo = receitas - despesas
     total_transacoes = len(df_filtrado)
 
@@ -297,8 +307,8 @@ def grafico_pizza_categorias(df_filtrado, tipo="Despesa"):
         )
         return
 
-    df_agrupado = df_tipo.groupby("categoria")["valor"].sum().reset_index()
-    df_agrupado = df_agrupado.sort_values("valor", ascending=False)
+    df_agrupado = somar_em_reais(df_tipo, "categoria")
+    df_agrupado = df_agrupado.sort_values("centavos", ascending=False)
 
     cor_titulo = CORES["despesa"] if tipo == "Despesa" else CORES["receita"]
     emoji = "📉" if tipo == "Despesa" else "📈"
@@ -342,7 +352,7 @@ def grafico_barras_mensal(df_filtrado):
     df_filtrado = df_filtrado.copy()
     df_filtrado["periodo"] = df_filtrado["data"].dt.to_period("M").astype(str)
 
-    df_agrupado = df_filtrado.groupby(["periodo", "tipo"])["valor"].sum().reset_index()
+    df_agrupado = somar_em_reais(df_filtrado, ["periodo", "tipo"])
 
     # Ordena cronologicamente
     df_agrupado = df_agrupado.sort_values("periodo")
@@ -395,14 +405,13 @@ def grafico_evolucao_saldo(df_filtrado):
     df_sorted = df_filtrado.sort_values("data").copy()
 
     # Calcula valor com sinal (receita positiva, despesa negativa)
-    df_sorted["valor_sinal"] = df_sorted.apply(
-        lambda row: row["valor"] if row["tipo"] == "Receita" else -row["valor"],
-        axis=1,
+    df_sorted["centavos_sinal"] = df_sorted["centavos"].where(
+        df_sorted["tipo"] == "Receita", -df_sorted["centavos"]
     )
 
-    # Agrupa por dia e calcula saldo acumulado
-    df_diario = df_sorted.groupby("data")["valor_sinal"].sum().reset_index()
-    df_diario["saldo_acumulado"] = df_diario["valor_sinal"].cumsum()
+    # Agrupa por dia e acumula em centavos; converte para reais só no fim
+    df_diario = df_sorted.groupby("data")["centavos_sinal"].sum().reset_index()
+    df_diario["saldo_acumulado"] = df_diario["centavos_sinal"].cumsum() / 100
 
     # Define cor baseada no saldo
     cor_linha = (
@@ -454,8 +463,8 @@ def grafico_barras_categorias(df_filtrado):
         st.info("Nenhuma despesa no período selecionado.")
         return
 
-    df_agrupado = df_despesas.groupby("categoria")["valor"].sum().reset_index()
-    df_agrupado = df_agrupado.sort_values("valor", ascending=True)
+    df_agrupado = somar_em_reais(df_despesas, "categoria")
+    df_agrupado = df_agrupado.sort_values("centavos", ascending=True)
 
     fig = px.bar(
         df_agrupado,
@@ -493,9 +502,9 @@ def tabela_transacoes(df_filtrado):
         st.info("Nenhuma transação no período selecionado.")
         return
 
-    df_tabela = df_filtrado[["data", "tipo", "descricao", "categoria", "valor"]].copy()
+    df_tabela = df_filtrado[["data", "tipo", "descricao", "categoria", "centavos"]].copy()
     df_tabela["data"] = df_tabela["data"].dt.strftime("%d/%m/%Y")
-    df_tabela["valor"] = df_tabela["valor"].apply(formatar_valor)
+    df_tabela["centavos"] = df_tabela["centavos"].apply(formatar_valor)
 
     df_tabela.columns = [
         "📅 Data",
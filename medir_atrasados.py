@@ -0,0 +1,188 @@
+# ========== MEDIÇÃO DO RELATÓRIO DE ATRASADOS ==========
+# Compara as duas formas de montar o relatório "Apenas atrasados" com 200 mil
+# empréstimos ativos no substituto do PostgREST (servidor_falso.py):
+#   • primeira tela — antes: baixar todos os empréstimos ativos e filtrar os
+#     atrasados em Python, relendo a data de cada um com strptime; depois: a
+#     tela de verdade (relatorio_emprestimos, opção 4), com o filtro
+#     data_devolucao_prevista < hoje no banco e uma página por vez
+#   • cálculo no cliente — dias de atraso e multa de todos os atrasados:
+#     strptime linha a linha × calcular_atrasos_em_lote (ordinais inteiros,
+#     uma conversão por data distinta)
+# O substituto não tem índices e varre a lista a cada requisição; no Postgres
+# o filtro usa idx_emprestimos_status_prevista. Os dois caminhos precisam
+# achar os mesmos atrasados com os mesmos dias; se não, termina com código 1.
+# Conceitos: time.perf_counter, unittest.mock.patch, contextlib.redirect_stdout
+#
+# Uso: python medir_atrasados.py [emprestimos_ativos] [repeticoes]
+
+import contextlib
+import io
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+from unittest import mock
+
+import acesso_dados
+import biblioteca
+from servidor_falso import ServidorFalso
+
+ATIVOS_PADRAO = 200_000
+REPETICOES_PADRAO = 3
+DEVOLVIDOS = 50_000
+MEMBROS = 20_000
+LIVROS = 50_000
+
+
+def montar_tabelas(ativos):
+    """Empréstimos ativos vencendo nos últimos e próximos 60 dias (metade atrasada)"""
+    random.seed(42)
+    hoje = date.today()
+    emprestimos = []
+    for i in range(1, ativos + DEVOLVIDOS + 1):
+        ativo = i <= ativos
+        prevista = hoje + timedelta(days=random.randint(-60, 59))
+        inicio = prevista - timedelta(days=7)
+        emprestimos.append(
+            {
+                "id": i,
+                "membro_id": random.randint(1, MEMBROS),
+                "livro_id": random.randint(1, LIVROS),
+                "exemplar_id": None,
+                "data_emprestimo": inicio.isoformat(),
+                "data_devolucao_prevista": prevista.isoformat(),
+                "data_devolucao_real": None if ativo else prevista.isoformat(),
+                "status": "Ativo" if ativo else "Devolvido",
+                "multa": 0,
+                "created_at": f"{inicio.isoformat()}T{i % 24:02d}:{i % 60:02d}:00+00:00",
+            }
+        )
+    membros = [
+        {"id": i, "nome": f"Membro {i:06d}", "tipo": "Estudante", "ativo": True}
+        for i in range(1, MEMBROS + 1)
+    ]
+    livros = [
+        {"id": i, "titulo": f"Livro {i:06d}", "autor": "Autor"}
+        for i in range(1, LIVROS + 1)
+    ]
+    return {
+        biblioteca.TABELA_EMPRESTIMOS: emprestimos,
+        biblioteca.TABELA_MEMBROS: membros,
+        biblioteca.TABELA_LIVROS: livros,
+    }
+
+
+def dias_atraso_antigo(data_prevista_texto):
+    """Cálculo antigo (calcular_dias_atraso, já removido): strptime a cada chamada"""
+    try:
+        prevista = datetime.strptime(str(data_prevista_texto), "%Y-%m-%d").date()
+        return max(0, (date.today() - prevista).days)
+    except (ValueError, TypeError):
+        return 0
+
+
+def tela_antes():
+    """Primeira tela antiga: todos os ativos, filtro e dias em Python"""
+    emprestimos = (
+        acesso_dados.obter_cliente()
+        .table(biblioteca.TABELA_EMPRESTIMOS)
+        .select("*")
+        .eq("status", "Ativo")
+        .order("created_at", desc=True)
+        .execute()
+        .data
+    )
+    return [e for e in emprestimos if dias_atraso_antigo(e["data_devolucao_prevista"]) > 0]
+
+
+def tela_depois():
+    """Primeira tela de relatorio_emprestimos (opção 4), parando na 2ª página"""
+    for tabela in biblioteca.CACHE_CATALOGO:
+        biblioteca.cache_invalidar(tabela)
+    with mock.patch("builtins.input", side_effect=["4", "q"]), contextlib.redirect_stdout(
+        io.StringIO()
+    ) as saida:
+        biblioteca.relatorio_emprestimos()
+    if "✗ Erro" in saida.getvalue():
+        raise RuntimeError(saida.getvalue().strip().splitlines()[-1])
+
+
+def calculo_antes(emprestimos):
+    """Dias e multa de cada empréstimo, relendo a data com strptime"""
+    for emp in emprestimos:
+        dias = dias_atraso_antigo(emp["data_devolucao_prevista"])
+        emp["dias_atraso"] = dias
+        emp["multa_estimada"] = round(dias * biblioteca.MULTA_POR_DIA, 2)
+    return emprestimos
+
+
+def medir(servidor, funcao, repeticoes):
+    """Devolve (requisições, bytes, mediana em ms) de uma execução"""
+    tempos = []
+    for _ in range(repeticoes):
+        servidor.zerar()
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return servidor.requisicoes, servidor.bytes, statistics.median(tempos)
+
+
+def cronometrar(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos)
+
+
+def main():
+    ativos = int(sys.argv[1]) if len(sys.argv) >= 2 else ATIVOS_PADRAO
+    repeticoes = int(sys.argv[2]) if len(sys.argv) >= 3 else REPETICOES_PADRAO
+
+    servidor = ServidorFalso(montar_tabelas(ativos))
+    acesso_dados._CLIENTE_SINCRONO = servidor
+
+    print("=" * 70)
+    print(f"⏱ RELATÓRIO DE ATRASADOS — {ativos:,} empréstimos ativos")
+    print(f"   (mediana de {repeticoes} execuções)")
+    print("=" * 70)
+
+    print("\n  Primeira tela")
+    print(f"  {'':10} {'Requisições':>12} {'Bytes':>14} {'Tempo':>12}")
+    for nome, funcao in (("Antes", tela_antes), ("Depois", tela_depois)):
+        requisicoes, tamanho, ms = medir(servidor, funcao, repeticoes)
+        print(f"  {nome:<10} {requisicoes:>12} {tamanho:>14,} {ms:>9.1f} ms")
+
+    # Os atrasados que o filtro do banco devolve, para o cálculo no cliente
+    hoje = date.today().isoformat()
+    atrasados = (
+        servidor.table(biblioteca.TABELA_EMPRESTIMOS)
+        .select("id, data_devolucao_prevista")
+        .eq("status", "Ativo")
+        .lt("data_devolucao_prevista", hoje)
+        .execute()
+        .data
+    )
+    antigos = tela_antes()
+
+    print(f"\n  Dias de atraso e multa no cliente ({len(atrasados):,} atrasados)")
+    ms_antes = cronometrar(lambda: calculo_antes(antigos), repeticoes)
+    ms_depois = cronometrar(lambda: biblioteca.calcular_atrasos_em_lote(atrasados), repeticoes)
+    print(f"  {'Antes':<10} {'strptime por linha':<28} {ms_antes:>9.1f} ms")
+    print(f"  {'Depois':<10} {'ordinais em lote':<28} {ms_depois:>9.1f} ms")
+
+    # Os dois caminhos precisam concordar
+    certo = {e["id"]: e["dias_atraso"] for e in calculo_antes(antigos)}
+    obtido = {e["id"]: e["dias_atraso"] for e in atrasados}
+    print()
+    if certo != obtido:
+        diferentes = len(set(certo.items()) ^ set(obtido.items()))
+        print(f"  ✗ Os caminhos divergem em {diferentes} empréstimo(s)")
+        sys.exit(1)
+    print(f"  ✓ Mesmos {len(certo):,} atrasados e mesmos dias nos dois caminhos")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+# ========== MEDIÇÃO DA BUSCA DE LIVROS ==========
+# Compara, num catálogo sintético de 1 milhão de títulos no substituto do
+# PostgREST (servidor_falso.py), as duas buscas da tela buscar_livro:
+#   • antes: opção 1 (ou 2, para o termo de autor), ilike '%termo%' — sem
+#     índice que sirva, o banco lê a tabela inteira, e todos os resultados
+#     voltam para a tela
+#   • depois: opção 4, a rpc buscar_livros_texto — consulta nos índices GIN
+#     (palavras e trigramas, sem acentos), ordenada por relevância, com limite
+# O Postgres local dos testes não tem pg_trgm nem unaccent, então a rpc é
+# imitada aqui com os mesmos índices em memória: palavra → ids (o tsvector,
+# sem o stemmer do português) e trigrama → ids (gin_trgm_ops, com o limiar
+# 0,3 de similaridade do operador %). O ilike é uma varredura da lista,
+# como o seq scan. A montagem dos índices é medida à parte (CREATE INDEX).
+# Os tempos incluem a tela inteira: consulta, JSON e impressão dos resultados.
+# Conceitos: índice invertido, trigramas, collections.Counter, array
+#
+# Uso: python medir_busca.py [titulos] [repeticoes]
+
+import contextlib
+import io
+import random
+import re
+import statistics
+import sys
+import time
+from array import array
+from collections import Counter
+from unittest import mock
+
+import acesso_dados
+import biblioteca
+from biblioteca import normalizar_texto
+from servidor_falso import ServidorFalso
+
+TITULOS_PADRAO = 1_000_000
+REPETICOES_PADRAO = 3
+CONSOANTES = "bcdfglmnprstvbcdlmnprst"
+VOGAIS = "aeiouaeioaeo"
+ACENTUADAS = "áéíóúãõâêô"
+FINAIS = ["", "", "", "s", "r", "l", "ção", "nho", "ções", "ista"]
+PESOS_CAMPOS = {"titulo": 1.0, "autor": 0.4, "genero": 0.2}  # ts_rank: A, B, C
+LIMIAR_SIMILARIDADE = 0.3  # pg_trgm.similarity_threshold
+PADRAO_PALAVRA = re.compile(r"\w+")
+
+
+def gerar_palavra(sorteio):
+    """Palavra de 2 a 4 sílabas com jeito de português (algumas com acento)"""
+    silabas = []
+    for _ in range(sorteio.randint(2, 4)):
+        vogal = sorteio.choice(ACENTUADAS if sorteio.random() < 0.08 else VOGAIS)
+        silabas.append(sorteio.choice(CONSOANTES) + vogal)
+    return "".join(silabas) + sorteio.choice(FINAIS)
+
+
+def montar_catalogo(quantidade):
+    sorteio = random.Random(42)
+    vocabulario = sorted({gerar_palavra(sorteio) for _ in range(30_000)})
+    autores = [
+        f"{gerar_palavra(sorteio).capitalize()} {gerar_palavra(sorteio).capitalize()}"
+        for _ in range(20_000)
+    ]
+    livros = []
+    for i in range(1, quantidade + 1):
+        palavras = sorteio.sample(vocabulario, sorteio.randint(2, 5))
+        livros.append(
+            {
+                "id": i,
+                "titulo": " ".join(palavras).capitalize(),
+                "autor": sorteio.choice(autores),
+                "genero": sorteio.choice(biblioteca.GENEROS_VALIDOS),
+                "ano_publicacao": sorteio.randint(1900, 2024),
+                "quantidade_total": 2,
+                "quantidade_disponivel": sorteio.randint(0, 2),
+            }
+        )
+    return livros
+
+
+def trigramas(texto):
+    """Trigramas como o pg_trgm: cada palavra com dois espaços antes e um depois"""
+    resultado = set()
+    for palavra in PADRAO_PALAVRA.findall(texto):
+        palavra = f"  {palavra} "
+        resultado.update(palavra[i : i + 3] for i in range(len(palavra) - 2))
+    return resultado
+
+
+class IndiceBusca:
+    """Os índices GIN de buscar_livros_texto, em memória"""
+
+    def __init__(self, livros):
+        self.livros = {livro["id"]: livro for livro in livros}
+        self.palavras = {campo: {} for campo in PESOS_CAMPOS}
+        self.trigramas = {"titulo": {}, "autor": {}}
+        # Quantos trigramas cada texto tem (posição = id): com isso a
+        # similaridade sai só da contagem de trigramas em comum
+        self.tamanhos = {
+            campo: array("H", bytes(2 * (len(livros) + 1))) for campo in self.trigramas
+        }
+        for livro in livros:
+            for campo, indice in self.palavras.items():
+                for palavra in set(PADRAO_PALAVRA.findall(normalizar_texto(livro[campo]))):
+                    indice.setdefault(palavra, array("i")).append(livro["id"])
+            for campo, indice in self.trigramas.items():
+                do_texto = trigramas(normalizar_texto(livro[campo]))
+                self.tamanhos[campo][livro["id"]] = len(do_texto)
+                for trigrama in do_texto:
+                    indice.setdefault(trigrama, array("i")).append(livro["id"])
+
+    def buscar(self, tabelas, parametros):
+        """buscar_livros_texto(p_termo, p_limite) sobre os índices"""
+        termo = normalizar_texto(parametros["p_termo"])
+        relevancia = Counter()
+
+        # Texto completo: todas as palavras no mesmo campo (websearch_to_tsquery)
+        palavras = PADRAO_PALAVRA.findall(termo)
+        for campo, peso in PESOS_CAMPOS.items():
+            listas = [self.palavras[campo].get(palavra, ()) for palavra in palavras]
+            if not listas or not all(listas):
+                continue
+            ids = set(min(listas, key=len)).intersection(*listas)
+            for livro_id in ids:
+                relevancia[livro_id] = max(relevancia[livro_id], peso)
+
+        # Trigramas: em comum / (do texto + do termo - em comum), como similarity()
+        do_termo = trigramas(termo)
+        for campo, indice in self.trigramas.items():
+            tamanhos = self.tamanhos[campo]
+            comuns = Counter()
+            for trigrama in do_termo:
+                comuns.update(indice.get(trigrama, ()))
+            for livro_id, quantidade in comuns.items():
+                nota = quantidade / (tamanhos[livro_id] + len(do_termo) - quantidade)
+                if nota >= LIMIAR_SIMILARIDADE:
+                    relevancia[livro_id] = max(relevancia[livro_id], nota)
+
+        melhores = sorted(
+            relevancia.items(), key=lambda par: (-par[1], self.livros[par[0]]["titulo"])
+        )[: parametros["p_limite"]]
+        return [
+            dict(self.livros[livro_id], relevancia=round(nota, 4))
+            for livro_id, nota in melhores
+        ]
+
+
+def escolher_termos(livros):
+    """Termos de tipos diferentes, tirados do próprio catálogo"""
+    sorteio = random.Random(7)
+    titulo = sorteio.choice(livros)["titulo"]
+    palavras = titulo.split()
+    contagem = Counter(p for livro in livros[:50_000] for p in livro["titulo"].lower().split())
+    comum = contagem.most_common(1)[0][0]
+    com_acento = next(
+        palavra
+        for livro in livros
+        for palavra in livro["titulo"].lower().split()
+        if normalizar_texto(palavra) != palavra
+    )
+    # (tipo, termo, opção do ilike: 1 = título, 2 = autor)
+    return [
+        ("palavra comum", comum, "1"),
+        ("palavra de um título", palavras[-1], "1"),
+        ("sem acento", normalizar_texto(com_acento), "1"),
+        ("duas palavras", " ".join(palavras[:2]), "1"),
+        ("título com erro", titulo[:-1] + "x", "1"),
+        ("autor", sorteio.choice(livros)["autor"], "2"),
+    ]
+
+
+def rodar_tela(opcao, termo):
+    """Roda buscar_livro com a opção e o termo; devolve os livros listados"""
+    with mock.patch("builtins.input", side_effect=[opcao, termo]), contextlib.redirect_stdout(
+        io.StringIO()
+    ) as saida:
+        biblioteca.buscar_livro()
+    texto = saida.getvalue()
+    if "✗ Erro" in texto:
+        raise RuntimeError(texto.strip().splitlines()[-1])
+    return texto.count("📖")
+
+
+def medir(servidor, opcao, termo, repeticoes):
+    """Devolve (livros listados, bytes, mediana em ms)"""
+    tempos = []
+    for _ in range(repeticoes):
+        servidor.zerar()
+        inicio = time.perf_counter()
+        encontrados = rodar_tela(opcao, termo)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return encontrados, servidor.bytes, statistics.median(tempos)
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) >= 2 else TITULOS_PADRAO
+    repeticoes = int(sys.argv[2]) if len(sys.argv) >= 3 else REPETICOES_PADRAO
+
+    print("=" * 78)
+    print(f"⏱ BUSCA DE LIVROS — catálogo de {quantidade:,} títulos")
+    print(f"   (mediana de {repeticoes} execuções da tela buscar_livro)")
+    print("=" * 78)
+
+    inicio = time.perf_counter()
+    livros = montar_catalogo(quantidade)
+    print(f"\n  Catálogo gerado em {time.perf_counter() - inicio:.1f} s")
+    inicio = time.perf_counter()
+    indice = IndiceBusca(livros)
+    print(f"  Índices (palavras e trigramas) montados em {time.perf_counter() - inicio:.1f} s")
+
+    servidor = ServidorFalso(
+        {biblioteca.TABELA_LIVROS: livros}, funcoes={"buscar_livros_texto": indice.buscar}
+    )
+    acesso_dados._CLIENTE_SINCRONO = servidor
+
+    print(
+        f"\n  {'Termo':<34} {'':7} {'Livros':>8} {'Bytes':>12} {'Tempo':>11}"
+    )
+    tempos = {"Antes": [], "Depois": []}
+    for tipo, termo, opcao_ilike in escolher_termos(livros):
+        rotulo = f"{tipo}: {termo}"
+        if len(rotulo) > 34:
+            rotulo = rotulo[:33] + "…"
+        for nome, opcao in (("Antes", opcao_ilike), ("Depois", "4")):
+            encontrados, tamanho, ms = medir(servidor, opcao, termo, repeticoes)
+            tempos[nome].append(ms)
+            print(f"  {rotulo:<34} {nome:<7} {encontrados:>8,} {tamanho:>12,} {ms:>8.1f} ms")
+            rotulo = ""
+    print()
+    for nome, lista in tempos.items():
+        print(f"  Mediana {nome.lower():<7} {statistics.median(lista):>9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
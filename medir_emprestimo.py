@@ -0,0 +1,260 @@
+# ========== MEDIÇÃO DO EMPRÉSTIMO COM LATÊNCIA DE REDE ==========
+# Compara, com atraso de rede injetado no substituto do PostgREST
+# (servidor_falso.py), quanto um empréstimo no balcão demora:
+#   • antes: a sequência antiga do realizar_emprestimo — lista de membros
+#     ativos, contagem de empréstimos do membro, lista de livros disponíveis,
+#     checagem de duplicidade, insert e update do estoque (6 requisições,
+#     uma esperando a outra)
+#   • depois: busca do membro e do livro pelo começo do nome/título no banco
+#     (caso de catálogo grande, sem índice local) e biblioteca.emprestar, que
+#     valida e registra tudo numa rpc só (3 requisições)
+# A rpc emprestar_livro é imitada em Python (mesmas regras do biblioteca.sql).
+# Cada empréstimo usa um membro e um livro diferentes, então todos precisam
+# dar certo; se algum for recusado, o script termina com código 1.
+# Conceitos: time.perf_counter, statistics.median, time.sleep
+#
+# Uso: python medir_emprestimo.py [emprestimos_por_latencia] [latencia_ms ...]
+
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+import acesso_dados
+import biblioteca
+from servidor_falso import ServidorFalso
+
+EMPRESTIMOS_PADRAO = 10
+LATENCIAS_PADRAO_MS = [0, 20, 50, 100, 200]
+MEMBROS = 2_000
+LIVROS = 5_000
+
+
+def montar_tabelas():
+    membros = [
+        {
+            "id": i,
+            "nome": f"Membro {i:06d}",
+            "email": f"membro{i}@teste.local",
+            "telefone": None,
+            "tipo": "Professor" if i % 4 == 0 else "Estudante",
+            "ativo": True,
+        }
+        for i in range(1, MEMBROS + 1)
+    ]
+    livros = [
+        {
+            "id": i,
+            "titulo": f"Livro {i:06d}",
+            "autor": f"Autor {i % 300}",
+            "genero": "Romance",
+            "ano_publicacao": 1950 + i % 70,
+            "quantidade_total": 3,
+            "quantidade_disponivel": 3,
+            "isbn": None,
+        }
+        for i in range(1, LIVROS + 1)
+    ]
+    return {
+        biblioteca.TABELA_MEMBROS: membros,
+        biblioteca.TABELA_LIVROS: livros,
+        biblioteca.TABELA_EMPRESTIMOS: [],
+    }
+
+
+def emprestar_livro_falso(tabelas, p):
+    """As regras de emprestar_livro (biblioteca.sql), sobre as tabelas em memória"""
+    membro = next(
+        (m for m in tabelas[biblioteca.TABELA_MEMBROS] if m["id"] == p["p_membro_id"]),
+        None,
+    )
+    if membro is None or not membro["ativo"]:
+        return {"ok": False, "erro": "membro_invalido"}
+
+    emprestimos = tabelas[biblioteca.TABELA_EMPRESTIMOS]
+    ativos = [
+        e for e in emprestimos if e["membro_id"] == membro["id"] and e["status"] == "Ativo"
+    ]
+    if len(ativos) >= p["p_limite"]:
+        return {"ok": False, "erro": "limite_atingido", "membro_nome": membro["nome"]}
+    if any(e["livro_id"] == p["p_livro_id"] for e in ativos):
+        return {"ok": False, "erro": "emprestimo_duplicado", "membro_nome": membro["nome"]}
+
+    livro = next(
+        (l for l in tabelas[biblioteca.TABELA_LIVROS] if l["id"] == p["p_livro_id"]), None
+    )
+    if livro is None or livro["quantidade_disponivel"] <= 0:
+        return {"ok": False, "erro": "livro_indisponivel"}
+    livro["quantidade_disponivel"] -= 1
+
+    prazo = p["p_prazo_professor"] if membro["tipo"] == "Professor" else p["p_prazo_estudante"]
+    hoje = date.today()
+    emprestimo = {
+        "id": len(emprestimos) + 1,
+        "livro_id": livro["id"],
+        "membro_id": membro["id"],
+        "data_emprestimo": hoje.isoformat(),
+        "data_devolucao_prevista": (hoje + timedelta(days=prazo)).isoformat(),
+        "data_devolucao_real": None,
+        "status": "Ativo",
+        "multa": 0,
+    }
+    emprestimos.append(emprestimo)
+    return {
+        "ok": True,
+        "emprestimo_id": emprestimo["id"],
+        "membro_nome": membro["nome"],
+        "membro_tipo": membro["tipo"],
+        "livro_titulo": livro["titulo"],
+        "data_emprestimo": emprestimo["data_emprestimo"],
+        "data_devolucao_prevista": emprestimo["data_devolucao_prevista"],
+        "prazo_dias": prazo,
+        "emprestimos_ativos": len(ativos) + 1,
+    }
+
+
+def antes(membro_id, livro_id):
+    """Sequência antiga do realizar_emprestimo; devolve True se emprestou"""
+    cliente = acesso_dados.obter_cliente()
+    membros = (
+        cliente.table(biblioteca.TABELA_MEMBROS)
+        .select("id, nome, tipo, ativo")
+        .eq("ativo", True)
+        .order("nome")
+        .execute()
+        .data
+    )
+    membro = next((m for m in membros if m["id"] == membro_id), None)
+    if membro is None:
+        return False
+
+    ativos = (
+        cliente.table(biblioteca.TABELA_EMPRESTIMOS)
+        .select("id")
+        .eq("membro_id", membro_id)
+        .eq("status", "Ativo")
+        .execute()
+        .data
+    )
+    if len(ativos) >= biblioteca.LIMITE_EMPRESTIMOS:
+        return False
+
+    livros = (
+        cliente.table(biblioteca.TABELA_LIVROS)
+        .select("id, titulo, autor, quantidade_disponivel")
+        .gt("quantidade_disponivel", 0)
+        .order("titulo")
+        .execute()
+        .data
+    )
+    livro = next((l for l in livros if l["id"] == livro_id), None)
+    if livro is None:
+        return False
+
+    duplicado = (
+        cliente.table(biblioteca.TABELA_EMPRESTIMOS)
+        .select("id")
+        .eq("membro_id", membro_id)
+        .eq("livro_id", livro_id)
+        .eq("status", "Ativo")
+        .execute()
+        .data
+    )
+    if duplicado:
+        return False
+
+    prazo = (
+        biblioteca.PRAZO_PROFESSOR
+        if membro["tipo"] == "Professor"
+        else biblioteca.PRAZO_ESTUDANTE
+    )
+    hoje = date.today()
+    cliente.table(biblioteca.TABELA_EMPRESTIMOS).insert(
+        {
+            "livro_id": livro_id,
+            "membro_id": membro_id,
+            "data_emprestimo": hoje.isoformat(),
+            "data_devolucao_prevista": (hoje + timedelta(days=prazo)).isoformat(),
+            "data_devolucao_real": None,
+            "status": "Ativo",
+            "multa": 0,
+        }
+    ).execute()
+    cliente.table(biblioteca.TABELA_LIVROS).update(
+        {"quantidade_disponivel": livro["quantidade_disponivel"] - 1}
+    ).eq("id", livro_id).execute()
+    return True
+
+
+def depois(membro_id, livro_id):
+    """Busca por prefixo no banco + uma rpc; devolve True se emprestou"""
+    membros = biblioteca.buscar_prefixo_servidor(
+        biblioteca.TABELA_MEMBROS,
+        "nome",
+        "nome, tipo, ativo",
+        f"Membro {membro_id:06d}",
+        lambda q: q.eq("ativo", True),
+    )
+    livros = biblioteca.buscar_prefixo_servidor(
+        biblioteca.TABELA_LIVROS, "titulo", "titulo, autor", f"Livro {livro_id:06d}"
+    )
+    if not membros or not livros:
+        return False
+    return biblioteca.emprestar(membros[0]["id"], livros[0]["id"])["ok"]
+
+
+def medir(servidor, funcao, pares):
+    """Devolve (requisições por empréstimo, bytes por empréstimo, mediana em ms, recusados)"""
+    servidor.zerar()
+    tempos = []
+    recusados = 0
+    for membro_id, livro_id in pares:
+        inicio = time.perf_counter()
+        recusados += not funcao(membro_id, livro_id)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return (
+        servidor.requisicoes / len(pares),
+        servidor.bytes / len(pares),
+        statistics.median(tempos),
+        recusados,
+    )
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) >= 2 else EMPRESTIMOS_PADRAO
+    latencias = [float(ms) for ms in sys.argv[2:]] or LATENCIAS_PADRAO_MS
+
+    servidor = ServidorFalso(
+        montar_tabelas(), funcoes={"emprestar_livro": emprestar_livro_falso}
+    )
+    acesso_dados._CLIENTE_SINCRONO = servidor
+
+    print("=" * 72)
+    print("⏱ EMPRÉSTIMO NO BALCÃO — latência de rede injetada")
+    print(f"   {MEMBROS:,} membros, {LIVROS:,} livros; mediana de {quantidade} empréstimos")
+    print("=" * 72)
+    print(f"\n  {'Latência':>9} {'':7} {'Requisições':>12} {'Bytes':>10} {'Tempo':>12}")
+
+    # Cada empréstimo com um membro e um livro novos: nenhum cai em limite ou duplicidade
+    proximo = iter(range(1, min(MEMBROS, LIVROS) + 1))
+    recusados = 0
+    for latencia in latencias:
+        servidor.latencia = latencia / 1000
+        for nome, funcao in (("Antes", antes), ("Depois", depois)):
+            pares = [(n, n) for n in (next(proximo) for _ in range(quantidade))]
+            requisicoes, tamanho, ms, falhas = medir(servidor, funcao, pares)
+            recusados += falhas
+            print(
+                f"  {latencia:>6.0f} ms {nome:<7} {requisicoes:>12.0f} "
+                f"{tamanho:>10,.0f} {ms:>9.1f} ms"
+            )
+        print()
+
+    if recusados:
+        print(f"  ✗ {recusados} empréstimo(s) recusado(s): a medição não vale")
+        sys.exit(1)
+    print("  ✓ Todos os empréstimos registrados")
+
+
+if __name__ == "__main__":
+    main()
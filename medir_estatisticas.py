@@ -0,0 +1,266 @@
+# ========== MEDIÇÃO DAS ESTATÍSTICAS DA BIBLIOTECA ==========
+# Compara as duas formas de montar a tela de estatísticas com 100 mil
+# empréstimos no substituto do PostgREST (servidor_falso.py):
+#   • antes: select * das três tabelas, contas e ranking em Python e mais
+#     uma consulta por título do top 5
+#   • depois: a tela de verdade (estatisticas_biblioteca), que lê só as
+#     linhas agregadas das views de biblioteca.sql (imitadas aqui em Python)
+# Mede duas redes: local (sem espera) e um link de escritório (latência e
+# banda limitadas), onde os megabytes das tabelas inteiras pesam. A tela nova
+# precisa mostrar os mesmos números que a conta antiga; se não, termina com
+# código 1.
+# Conceitos: time.perf_counter, contextlib.redirect_stdout, asyncio (via acesso_dados)
+#
+# Uso: python medir_estatisticas.py [emprestimos] [repeticoes]
+
+import contextlib
+import io
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import biblioteca
+from servidor_falso import ServidorFalso, injetar
+
+EMPRESTIMOS_PADRAO = 100_000
+REPETICOES_PADRAO = 3
+LIVROS = 20_000
+MEMBROS = 5_000
+# (nome, latência em segundos, banda em bytes/s)
+REDES = [("local", 0.0, None), ("30 ms, 20 Mbit/s", 0.030, 20_000_000 / 8)]
+
+
+def montar_tabelas(quantidade):
+    sorteio = random.Random(42)
+    hoje = date.today()
+    livros = []
+    for i in range(1, LIVROS + 1):
+        total = sorteio.randint(1, 5)
+        livros.append(
+            {
+                "id": i,
+                "titulo": f"Livro {i:06d}",
+                "autor": f"Autor {i % 700}",
+                "genero": sorteio.choice(biblioteca.GENEROS_VALIDOS),
+                "ano_publicacao": sorteio.randint(1900, 2024),
+                "quantidade_total": total,
+                "quantidade_disponivel": sorteio.randint(0, total),
+                "isbn": None,
+            }
+        )
+    membros = [
+        {
+            "id": i,
+            "nome": f"Membro {i:06d}",
+            "email": f"membro{i}@teste.local",
+            "telefone": None,
+            "tipo": "Professor" if i % 5 == 0 else "Estudante",
+            "ativo": i % 17 != 0,
+        }
+        for i in range(1, MEMBROS + 1)
+    ]
+    emprestimos = []
+    for i in range(1, quantidade + 1):
+        inicio = hoje - timedelta(days=sorteio.randint(0, 700))
+        prevista = inicio + timedelta(days=7)
+        ativo = sorteio.random() < 0.2
+        emprestimos.append(
+            {
+                "id": i,
+                # Alguns livros bem mais procurados, para o ranking ter sentido
+                "livro_id": min(int(sorteio.paretovariate(1.2)), LIVROS),
+                "membro_id": sorteio.randint(1, MEMBROS),
+                "exemplar_id": None,
+                "data_emprestimo": inicio.isoformat(),
+                "data_devolucao_prevista": prevista.isoformat(),
+                "data_devolucao_real": None if ativo else prevista.isoformat(),
+                "status": "Ativo" if ativo else "Devolvido",
+                "multa": 0 if ativo or sorteio.random() < 0.9 else 2.5,
+                "created_at": f"{inicio.isoformat()}T12:00:00+00:00",
+            }
+        )
+    return {
+        biblioteca.TABELA_LIVROS: livros,
+        biblioteca.TABELA_MEMBROS: membros,
+        biblioteca.TABELA_EMPRESTIMOS: emprestimos,
+    }
+
+
+# ---- As views de biblioteca.sql (sem o arquivo de empréstimos antigos) ----
+def view_resumo(tabelas):
+    livros = tabelas[biblioteca.TABELA_LIVROS]
+    membros = tabelas[biblioteca.TABELA_MEMBROS]
+    emprestimos = tabelas[biblioteca.TABELA_EMPRESTIMOS]
+    hoje = date.today().isoformat()
+    return [
+        {
+            "total_titulos": len(livros),
+            "total_copias": sum(l["quantidade_total"] for l in livros),
+            "total_disponivel": sum(l["quantidade_disponivel"] for l in livros),
+            "total_membros": len(membros),
+            "membros_ativos": sum(1 for m in membros if m["ativo"]),
+            "estudantes": sum(1 for m in membros if m["tipo"] == "Estudante"),
+            "professores": sum(1 for m in membros if m["tipo"] == "Professor"),
+            "total_emprestimos": len(emprestimos),
+            "emprestimos_ativos": sum(1 for e in emprestimos if e["status"] == "Ativo"),
+            "emprestimos_devolvidos": sum(
+                1 for e in emprestimos if e["status"] == "Devolvido"
+            ),
+            "emprestimos_atrasados": sum(
+                1
+                for e in emprestimos
+                if e["status"] == "Ativo" and e["data_devolucao_prevista"] < hoje
+            ),
+            "total_multas": sum(e["multa"] for e in emprestimos),
+        }
+    ]
+
+
+def view_livros_por_genero(tabelas):
+    contagem = {}
+    for livro in tabelas[biblioteca.TABELA_LIVROS]:
+        contagem[livro["genero"]] = contagem.get(livro["genero"], 0) + 1
+    return [{"genero": g, "quantidade": q} for g, q in contagem.items()]
+
+
+def view_ranking_livros(tabelas):
+    contagem = {}
+    for emp in tabelas[biblioteca.TABELA_EMPRESTIMOS]:
+        contagem[emp["livro_id"]] = contagem.get(emp["livro_id"], 0) + 1
+    titulos = {l["id"]: l["titulo"] for l in tabelas[biblioteca.TABELA_LIVROS]}
+    return [
+        {"livro_id": livro_id, "titulo": titulos[livro_id], "total_emprestimos": total}
+        for livro_id, total in contagem.items()
+    ]
+
+
+def antes(servidor):
+    """Conta antiga: tabelas inteiras e agregação no cliente; devolve os números"""
+    livros = servidor.table(biblioteca.TABELA_LIVROS).select("*").execute().data
+    membros = servidor.table(biblioteca.TABELA_MEMBROS).select("*").execute().data
+    emprestimos = servidor.table(biblioteca.TABELA_EMPRESTIMOS).select("*").execute().data
+
+    generos = {}
+    for livro in livros:
+        generos[livro["genero"]] = generos.get(livro["genero"], 0) + 1
+    hoje = date.today()
+    ativos = [e for e in emprestimos if e["status"] == "Ativo"]
+    atrasados = [
+        e
+        for e in ativos
+        if (hoje - datetime.strptime(e["data_devolucao_prevista"], "%Y-%m-%d").date()).days
+        > 0
+    ]
+    contagem_livros = {}
+    for emp in emprestimos:
+        contagem_livros[emp["livro_id"]] = contagem_livros.get(emp["livro_id"], 0) + 1
+    ranking = []
+    mais_emprestados = sorted(contagem_livros.items(), key=lambda x: x[1], reverse=True)
+    for livro_id, total in mais_emprestados[:5]:
+        titulo = (
+            servidor.table(biblioteca.TABELA_LIVROS)
+            .select("titulo")
+            .eq("id", livro_id)
+            .execute()
+            .data[0]["titulo"]
+        )
+        ranking.append((titulo, total))
+
+    return {
+        "Total de títulos": len(livros),
+        "Total de cópias": sum(l["quantidade_total"] for l in livros),
+        "Cópias disponíveis": sum(l["quantidade_disponivel"] for l in livros),
+        "Total de membros": len(membros),
+        "Ativos": sum(1 for m in membros if m["ativo"]),
+        "Estudantes": sum(1 for m in membros if m["tipo"] == "Estudante"),
+        "Total de empréstimos": len(emprestimos),
+        "Atrasados": len(atrasados),
+        "Devolvidos": len(emprestimos) - len(ativos),
+        "multas": f"R$ {sum(float(e['multa'] or 0) for e in emprestimos):.2f}",
+        "ranking": ranking,
+        "generos": generos,
+    }
+
+
+def depois():
+    """A tela estatisticas_biblioteca; devolve o texto mostrado"""
+    with contextlib.redirect_stdout(io.StringIO()) as saida:
+        biblioteca.estatisticas_biblioteca()
+    texto = saida.getvalue()
+    if "✗ Erro" in texto:
+        raise RuntimeError(texto.strip().splitlines()[-1])
+    return texto
+
+
+def conferir(numeros, texto):
+    """Lista dos números da conta antiga que a tela nova não mostra"""
+    faltando = []
+    for rotulo, valor in numeros.items():
+        if rotulo == "ranking":
+            esperados = [f"{titulo} — {total} empréstimo(s)" for titulo, total in valor]
+        elif rotulo == "generos":
+            esperados = [f"{genero:<20} {'█' * q} ({q})" for genero, q in valor.items()]
+        elif rotulo == "multas":
+            esperados = [valor]
+        else:
+            esperados = [f"{rotulo}: {valor}"]
+        faltando += [esperado for esperado in esperados if esperado not in texto]
+    return faltando
+
+
+def medir(servidor, funcao, repeticoes):
+    """Devolve (requisições, bytes, mediana em ms) de uma execução"""
+    tempos = []
+    for _ in range(repeticoes):
+        servidor.zerar()
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return servidor.requisicoes, servidor.bytes, statistics.median(tempos)
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) >= 2 else EMPRESTIMOS_PADRAO
+    repeticoes = int(sys.argv[2]) if len(sys.argv) >= 3 else REPETICOES_PADRAO
+
+    servidor = ServidorFalso(
+        montar_tabelas(quantidade),
+        {
+            biblioteca.VIEW_RESUMO: view_resumo,
+            biblioteca.VIEW_LIVROS_POR_GENERO: view_livros_por_genero,
+            biblioteca.VIEW_RANKING_LIVROS: view_ranking_livros,
+        },
+    )
+    injetar(servidor)
+
+    print("=" * 72)
+    print(
+        f"⏱ ESTATÍSTICAS — {quantidade:,} empréstimos, {LIVROS:,} livros, "
+        f"{MEMBROS:,} membros"
+    )
+    print(f"   (mediana de {repeticoes} execuções)")
+    print("=" * 72)
+
+    for rede, latencia, banda in REDES:
+        servidor.latencia, servidor.banda = latencia, banda
+        print(f"\n  Rede: {rede}")
+        print(f"  {'':10} {'Requisições':>12} {'Bytes':>14} {'Tempo':>12}")
+        for nome, funcao in (("Antes", lambda: antes(servidor)), ("Depois", depois)):
+            requisicoes, tamanho, ms = medir(servidor, funcao, repeticoes)
+            print(f"  {nome:<10} {requisicoes:>12} {tamanho:>14,} {ms:>9.1f} ms")
+
+    servidor.latencia, servidor.banda = 0.0, None
+    faltando = conferir(antes(servidor), depois())
+    print()
+    if faltando:
+        print(f"  ✗ A tela nova não mostra {len(faltando)} número(s) da conta antiga:")
+        for linha in faltando[:10]:
+            print(f"      {linha}")
+        sys.exit(1)
+    print("  ✓ A tela nova mostra os mesmos números da conta antiga")
+
+
+if __name__ == "__main__":
+    main()
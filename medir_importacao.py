@@ -0,0 +1,106 @@
+# ========== MEDIÇÃO DA IMPORTAÇÃO DE EXTRATOS ==========
+# Gera um extrato OFX (e um CSV equivalente) de vários anos numa pasta
+# temporária, importa com financeiro.importar_extrato numa réplica de teste
+# e mostra tempo, linhas por segundo e pico de memória. Importa duas vezes:
+# na segunda todos os lançamentos já existem e devem ser ignorados.
+# Conceitos: tracemalloc, time.perf_counter, arquivos temporários
+#
+# Uso: python medir_importacao.py [lancamentos] [lote]
+
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+# A réplica de teste fica numa pasta temporária (não toca a réplica real)
+PASTA = tempfile.mkdtemp(prefix="medir_importacao_")
+os.environ["FINANCEIRO_REPLICA"] = os.path.join(PASTA, "replica.db")
+
+import financeiro  # noqa: E402 (depende da variável acima)
+import replica_financeiro as replica  # noqa: E402
+
+LANCAMENTOS_PADRAO = 200_000
+DESCRICOES = [
+    "SUPERMERCADO BOM PREÇO",
+    "UBER *TRIP",
+    "POSTO SHELL",
+    "FARMÁCIA SÃO JOÃO",
+    "NETFLIX.COM",
+    "PAGTO ENERGIA ELÉTRICA",
+    "ALUGUEL APTO",
+    "PIX ENVIADO FULANO",
+]
+
+
+def gerar_extratos(quantidade):
+    """Escreve extrato.ofx (SGML, cp1252) e extrato.csv com os mesmos lançamentos"""
+    caminho_ofx = os.path.join(PASTA, "extrato.ofx")
+    caminho_csv = os.path.join(PASTA, "extrato.csv")
+    inicio = date(2020, 1, 1)
+
+    with open(caminho_ofx, "w", encoding="cp1252") as ofx, open(
+        caminho_csv, "w", encoding="utf-8"
+    ) as csv:
+        ofx.write("OFXHEADER:100\nDATA:OFXSGML\nCHARSET:1252\n\n<OFX><BANKTRANLIST>\n")
+        csv.write("Data;Histórico;Valor\n")
+        for i in range(quantidade):
+            dia = inicio + timedelta(days=i * 5 * 365 // quantidade)
+            if random.random() < 0.1:
+                descricao, centavos = f"SALARIO REF {i}", random.randint(300000, 900000)
+            else:
+                descricao = f"{random.choice(DESCRICOES)} {i % 997}"
+                centavos = -random.randint(100, 50000)
+            valor = f"{centavos / 100:.2f}"
+            ofx.write(
+                f"<STMTTRN>\n<TRNTYPE>OTHER\n<DTPOSTED>{dia:%Y%m%d}120000[-3:BRT]\n"
+                f"<TRNAMT>{valor}\n<FITID>{i}\n<MEMO>{descricao}\n</STMTTRN>\n"
+            )
+            csv.write(f"{dia:%d/%m/%Y};{descricao};{valor.replace('.', ',')}\n")
+        ofx.write("</BANKTRANLIST></OFX>\n")
+    return caminho_ofx, caminho_csv
+
+
+def medir(caminho, lote):
+    """Importa 'caminho' e devolve (segundos, pico de memória em MB, pendências)"""
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        financeiro.importar_extrato(caminho, lote)
+    duracao = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return duracao, pico / 1024 / 1024, replica.contar_pendencias()
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) >= 2 else LANCAMENTOS_PADRAO
+    lote = int(sys.argv[2]) if len(sys.argv) >= 3 else financeiro.TAMANHO_LOTE_IMPORTACAO
+
+    random.seed(42)
+    caminho_ofx, caminho_csv = gerar_extratos(quantidade)
+    tamanho_mb = os.path.getsize(caminho_ofx) / 1024 / 1024
+
+    print("=" * 66)
+    print(f"⏱ IMPORTAÇÃO DE EXTRATO — {quantidade:,} lançamentos, lote {lote}")
+    print(f"   (OFX de {tamanho_mb:.1f} MB, 5 anos)")
+    print("=" * 66)
+    print(f"\n  {'':24} {'Tempo':>9} {'Linhas/s':>10} {'Memória':>10} {'Pendentes':>10}")
+    for nome, caminho in (
+        ("OFX (réplica vazia)", caminho_ofx),
+        ("OFX de novo (duplicado)", caminho_ofx),
+        ("CSV do mesmo extrato", caminho_csv),
+    ):
+        duracao, pico, pendentes = medir(caminho, lote)
+        print(
+            f"  {nome:<24} {duracao:>7.1f} s {quantidade / duracao:>10,.0f} "
+            f"{pico:>7.1f} MB {pendentes:>10,}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# ========== MEDIÇÃO DO TEMPO DE INICIALIZAÇÃO ==========
+# Mede quanto cada sistema (biblioteca, financeiro, escola) demora para
+# mostrar o menu, usando python -X importtime e o tempo de parede do processo.
+# Conceitos: subprocess, variáveis de ambiente, mediana, leitura de texto
+#
+# Uso: python medir_inicializacao.py [repeticoes]
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SISTEMAS = ["biblioteca", "financeiro", "escola"]
+REPETICOES_PADRAO = 5
+TOP_IMPORTS = 5
+
+# Credenciais de mentira: o menu só confere se existem. Como a conexão é
+# criada no primeiro uso, nenhuma requisição é feita durante a medição.
+# O financeiro.py sincroniza a réplica ao abrir: FINANCEIRO_OFFLINE desliga
+# isso, e a réplica fica numa pasta temporária (não toca a réplica real).
+AMBIENTE = dict(
+    os.environ,
+    SUPABASE_URL="https://exemplo.supabase.co",
+    SUPABASE_KEY="chave-de-teste",
+    FINANCEIRO_OFFLINE="1",
+    FINANCEIRO_REPLICA=os.path.join(
+        tempfile.mkdtemp(prefix="medir_inicializacao_"), "replica.db"
+    ),
+)
+
+
+def medir_imports(modulo):
+    """
+    Roda 'import <modulo>' com -X importtime e devolve o tempo acumulado do
+    módulo (em ms), os imports mais pesados [(ms, nome), ...] e a saída de erro.
+    """
+    processo = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        capture_output=True,
+        text=True,
+        env=AMBIENTE,
+    )
+
+    # Formato de cada linha: "import time: self [us] | cumulative | nome"
+    tempos = []
+    for linha in processo.stderr.splitlines():
+        if not linha.startswith("import time:") or "cumulative" in linha:
+            continue
+        partes = linha.split("|")
+        acumulado_us = int(partes[1].strip())
+        nome = partes[2].strip()
+        tempos.append((acumulado_us / 1000, nome))
+
+    total = next((ms for ms, nome in tempos if nome == modulo), None)
+    outros = [t for t in tempos if t[1] != modulo]
+    # Só nomes de nível superior, para não listar o mesmo pacote várias vezes
+    pesados = sorted(
+        (t for t in outros if "." not in t[1]), reverse=True
+    )[:TOP_IMPORTS]
+    return total, pesados, processo.stderr
+
+
+def medir_ate_o_menu(modulo, repeticoes):
+    """
+    Abre o sistema, escolhe '0' (Sair) no menu e mede o tempo total do
+    processo. Devolve a mediana em ms.
+    """
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        subprocess.run(
+            [sys.executable, f"{modulo}.py"],
+            input="0\n",
+            capture_output=True,
+            text=True,
+            env=AMBIENTE,
+        )
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos)
+
+
+def main():
+    repeticoes = int(sys.argv[1]) if len(sys.argv) >= 2 else REPETICOES_PADRAO
+
+    print("=" * 60)
+    print(f"⏱ TEMPO DE INICIALIZAÇÃO (mediana de {repeticoes} execuções)")
+    print("=" * 60)
+
+    for modulo in SISTEMAS:
+        total, pesados, erro = medir_imports(modulo)
+        print(f"\n{modulo}.py")
+        if total is None:
+            print(f"  ✗ Falha ao importar:\n{erro}")
+            continue
+
+        print(f"  Import do módulo: {total:8.1f} ms")
+        print(f"  Até o menu:       {medir_ate_o_menu(modulo, repeticoes):8.1f} ms")
+        print("  Imports mais pesados:")
+        for ms, nome in pesados:
+            print(f"    {nome:<20} {ms:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# ========== MEDIÇÃO DAS CONSULTAS EM PARALELO (acesso_dados) ==========
+# Compara, com atraso de rede injetado no substituto do PostgREST
+# (servidor_falso.py), quanto a tela de estatísticas da biblioteca demora:
+#   • antes: as três consultas das views (resumo, gêneros e ranking) uma
+#     depois da outra, no cliente síncrono
+#   • depois: a tela como está, com executar_em_paralelo (asyncio.gather no
+#     event loop em segundo plano do acesso_dados)
+# É a mesma tela nos dois casos; só a fachada muda, então o ganho medido é o
+# da camada assíncrona. Os relatórios do financeiro leem a réplica local
+# (replica_financeiro.py) e o escola não tem consultas independentes, por
+# isso só a biblioteca entra aqui. As duas formas precisam mostrar o mesmo
+# texto; se não, o script termina com código 1.
+# Conceitos: time.perf_counter, unittest.mock.patch, asyncio (via acesso_dados)
+#
+# Uso: python medir_paralelo.py [repeticoes] [latencia_ms ...]
+
+import statistics
+import sys
+import time
+from unittest import mock
+
+import acesso_dados
+import biblioteca
+from medir_estatisticas import (
+    depois as rodar_tela,
+    montar_tabelas,
+    view_livros_por_genero,
+    view_ranking_livros,
+    view_resumo,
+)
+from servidor_falso import ServidorFalso, injetar
+
+REPETICOES_PADRAO = 5
+LATENCIAS_PADRAO_MS = [0, 20, 50, 100, 200]
+EMPRESTIMOS = 5_000
+
+
+def executar_em_serie(*consultas):
+    """A fachada antiga: cada consulta no cliente síncrono, uma após a outra"""
+    cliente = acesso_dados.obter_cliente()
+    return [consulta(cliente).execute() for consulta in consultas]
+
+
+def antes():
+    with mock.patch.object(biblioteca, "executar_em_paralelo", executar_em_serie):
+        return rodar_tela()
+
+
+def depois():
+    return rodar_tela()
+
+
+def medir(servidor, funcao, repeticoes):
+    """Devolve (requisições, mediana em ms, texto da tela) de uma execução"""
+    tempos = []
+    for _ in range(repeticoes):
+        servidor.zerar()
+        inicio = time.perf_counter()
+        texto = funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return servidor.requisicoes, statistics.median(tempos), texto
+
+
+def main():
+    repeticoes = int(sys.argv[1]) if len(sys.argv) >= 2 else REPETICOES_PADRAO
+    latencias = [float(ms) for ms in sys.argv[2:]] or LATENCIAS_PADRAO_MS
+
+    servidor = ServidorFalso(
+        montar_tabelas(EMPRESTIMOS),
+        {
+            biblioteca.VIEW_RESUMO: view_resumo,
+            biblioteca.VIEW_LIVROS_POR_GENERO: view_livros_por_genero,
+            biblioteca.VIEW_RANKING_LIVROS: view_ranking_livros,
+        },
+    )
+    injetar(servidor)
+    depois()  # Sobe o event loop e cria o cliente fora da medição
+
+    print("=" * 64)
+    print("⏱ ESTATÍSTICAS DA BIBLIOTECA — consultas em série × em paralelo")
+    print(f"   (mediana de {repeticoes} execuções da tela)")
+    print("=" * 64)
+    print(f"\n  {'Latência':>9} {'':7} {'Requisições':>12} {'Tempo':>12} {'Ganho':>8}")
+
+    divergentes = []
+    for latencia in latencias:
+        servidor.latencia = latencia / 1000
+        requisicoes, ms_antes, texto_antes = medir(servidor, antes, repeticoes)
+        print(f"  {latencia:>6.0f} ms {'Antes':<7} {requisicoes:>12} {ms_antes:>9.1f} ms")
+        requisicoes, ms_depois, texto_depois = medir(servidor, depois, repeticoes)
+        ganho = ms_antes / ms_depois if ms_depois else 0
+        print(
+            f"  {'':9} {'Depois':<7} {requisicoes:>12} {ms_depois:>9.1f} ms "
+            f"{ganho:>6.1f}x"
+        )
+        if texto_antes != texto_depois:
+            divergentes.append(latencia)
+        print()
+
+    if divergentes:
+        print(f"  ✗ As telas diferem com latência de {divergentes} ms")
+        sys.exit(1)
+    print("  ✓ As duas formas mostram a mesma tela")
+
+
+if __name__ == "__main__":
+    main()
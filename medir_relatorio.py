@@ -0,0 +1,105 @@
+# ========== MEDIÇÃO DO RELATÓRIO MENSAL ==========
+# Compara as duas formas de montar o relatório mensal do financeiro.py numa
+# réplica de teste com um mês "pesado":
+#   • antes: baixar todas as transações do mês e agrupar em dicionários
+#   • depois: uma consulta agrupada (replica_financeiro.resumo_do_periodo)
+# Mostra quantas linhas e quantos bytes (em JSON) cada uma devolve e o tempo.
+# Conceitos: sqlite3, time.perf_counter, json, arquivos temporários
+#
+# Uso: python medir_relatorio.py [transacoes_no_mes] [repeticoes]
+
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+# A réplica de teste fica numa pasta temporária (não toca a réplica real)
+PASTA = tempfile.mkdtemp(prefix="medir_relatorio_")
+os.environ["FINANCEIRO_REPLICA"] = os.path.join(PASTA, "replica.db")
+
+import replica_financeiro as replica  # noqa: E402 (depende da variável acima)
+from financeiro import CATEGORIAS_DESPESA, CATEGORIAS_RECEITA  # noqa: E402
+
+TRANSACOES_PADRAO = 5000
+REPETICOES_PADRAO = 20
+INICIO, FIM = "2026-03-01", "2026-04-01"
+
+
+def popular(quantidade):
+    """Grava 'quantidade' transações aleatórias em março/2026"""
+    linhas = []
+    for i in range(1, quantidade + 1):
+        receita = random.random() < 0.2
+        linhas.append(
+            (
+                i,
+                "Receita" if receita else "Despesa",
+                random.choice(CATEGORIAS_RECEITA if receita else CATEGORIAS_DESPESA),
+                f"Transação de teste {i}",
+                random.randint(500, 80000),  # centavos
+                f"2026-03-{random.randint(1, 31):02d}",
+            )
+        )
+
+    con = replica.conectar()
+    con.execute("begin")
+    con.executemany(
+        "insert into transacoes (id, tipo, categoria, descricao, valor_centavos, data) "
+        "values (?, ?, ?, ?, ?, ?)",
+        linhas,
+    )
+    con.execute("commit")
+    con.close()
+
+
+def antes():
+    """Forma antiga: todas as linhas do mês + agrupamento em Python"""
+    transacoes = replica.consultar(
+        "select * from transacoes where data >= ? and data < ? order by data",
+        (INICIO, FIM),
+    )
+    por_categoria = {}
+    for t in transacoes:
+        chave = (t["tipo"], t["categoria"])
+        por_categoria[chave] = por_categoria.get(chave, 0) + t["valor_centavos"]
+    return transacoes
+
+
+def depois():
+    """Forma nova: totais já agrupados pela consulta"""
+    return replica.resumo_do_periodo(INICIO, FIM)
+
+
+def medir(funcao, repeticoes):
+    """Devolve (linhas, bytes em JSON, mediana em ms)"""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    tamanho = len(json.dumps(resultado).encode("utf-8"))
+    return len(resultado), tamanho, statistics.median(tempos)
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) >= 2 else TRANSACOES_PADRAO
+    repeticoes = int(sys.argv[2]) if len(sys.argv) >= 3 else REPETICOES_PADRAO
+
+    random.seed(42)
+    popular(quantidade)
+
+    print("=" * 60)
+    print(f"⏱ RELATÓRIO MENSAL — {quantidade} transações no mês")
+    print(f"   (mediana de {repeticoes} execuções)")
+    print("=" * 60)
+    print(f"\n  {'':10} {'Linhas':>8} {'Bytes':>12} {'Tempo':>12}")
+    for nome, funcao in (("Antes", antes), ("Depois", depois)):
+        linhas, tamanho, ms = medir(funcao, repeticoes)
+        print(f"  {nome:<10} {linhas:>8} {tamanho:>12,} {ms:>9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
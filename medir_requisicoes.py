@@ -0,0 +1,164 @@
+# ========== MEDIÇÃO DE REQUISIÇÕES POR TELA ==========
+# Conta quantas requisições ao Supabase cada tela do biblioteca.py faz,
+# com catálogos de tamanhos diferentes. Em vez do servidor, o cliente é o
+# substituto em memória do servidor_falso.py, que conta cada execute() como
+# uma requisição HTTP.
+# As telas não podem voltar a fazer uma consulta por linha (N+1): o número
+# de requisições tem que depender só do número de páginas (o cache de livros
+# e membros ainda pode poupar algumas). Se alguma tela passar do máximo
+# esperado, o script termina com código 1.
+# Conceitos: contextlib.redirect_stdout, unittest.mock.patch
+#
+# Uso: python medir_requisicoes.py [tamanho1 tamanho2 ...]
+
+import contextlib
+import io
+import math
+import sys
+from datetime import date, timedelta
+from unittest import mock
+
+import acesso_dados
+import biblioteca
+from servidor_falso import ServidorFalso
+
+TAMANHOS_PADRAO = [120, 1_200, 12_000]
+
+
+def ativos_por_membro(tabelas):
+    """Visão VIEW_ATIVOS_POR_MEMBRO: empréstimos ativos de cada membro"""
+    contagem = {}
+    for emp in tabelas[biblioteca.TABELA_EMPRESTIMOS]:
+        if emp["status"] == "Ativo":
+            contagem[emp["membro_id"]] = contagem.get(emp["membro_id"], 0) + 1
+    return [{"membro_id": m, "quantidade": q} for m, q in contagem.items()]
+
+
+def montar_tabelas(quantidade):
+    """'quantidade' membros, livros e empréstimos (metade ainda ativos)"""
+    hoje = date.today()
+    membros = [
+        {
+            "id": i,
+            "nome": f"Membro {i:06d}",
+            "email": f"membro{i}@teste.local",
+            "telefone": None,
+            "tipo": "Professor" if i % 4 == 0 else "Estudante",
+            "ativo": True,
+        }
+        for i in range(1, quantidade + 1)
+    ]
+    livros = [
+        {"id": i, "titulo": f"Livro {i:06d}", "autor": "Autor", "genero": "Outro"}
+        for i in range(1, quantidade + 1)
+    ]
+    emprestimos = []
+    for i in range(1, quantidade + 1):
+        inicio = hoje - timedelta(days=i % 30)
+        emprestimos.append(
+            {
+                "id": i,
+                "membro_id": (i * 7) % quantidade + 1,
+                "livro_id": (i * 13) % quantidade + 1,
+                "exemplar_id": None,
+                "data_emprestimo": inicio.isoformat(),
+                "data_devolucao_prevista": (inicio + timedelta(days=7)).isoformat(),
+                "data_devolucao_real": None if i % 2 else inicio.isoformat(),
+                "status": "Ativo" if i % 2 else "Devolvido",
+                "multa": 0,
+                "created_at": f"{inicio.isoformat()}T{i % 24:02d}:00:00+00:00",
+            }
+        )
+    return {
+        biblioteca.TABELA_MEMBROS: membros,
+        biblioteca.TABELA_LIVROS: livros,
+        biblioteca.TABELA_EMPRESTIMOS: emprestimos,
+    }
+
+
+def contar_requisicoes(servidor, tela, respostas):
+    """Roda a tela com as respostas dadas ao input() e devolve as requisições"""
+    for tabela in biblioteca.CACHE_CATALOGO:
+        biblioteca.cache_invalidar(tabela)  # Cada medição começa com o cache vazio
+    servidor.requisicoes = 0
+    with mock.patch("builtins.input", side_effect=respostas), contextlib.redirect_stdout(
+        io.StringIO()
+    ) as saida:
+        tela()
+    if "✗ Erro" in saida.getvalue():
+        raise RuntimeError(saida.getvalue().strip().splitlines()[-1])
+    return servidor.requisicoes
+
+
+def consultas_paginar(linhas):
+    """Requisições de paginar() para 'linhas': uma por página, mais uma vazia no fim exato"""
+    return linhas // biblioteca.TAMANHO_PAGINA + 1
+
+
+def main():
+    tamanhos = [int(t) for t in sys.argv[1:]] or TAMANHOS_PADRAO
+
+    print("=" * 74)
+    print("🔢 REQUISIÇÕES POR TELA (substituto do PostgREST em memória)")
+    print(f"   Página de {biblioteca.TAMANHO_PAGINA} linhas; o máximo cresce só com as páginas")
+    print("=" * 74)
+    print(f"\n  {'Tela':<40} {'Linhas':>8} {'Requisições':>12} {'Máximo':>9}")
+
+    falhas = 0
+    for quantidade in tamanhos:
+        servidor = ServidorFalso(
+            montar_tabelas(quantidade),
+            {biblioteca.VIEW_ATIVOS_POR_MEMBRO: ativos_por_membro},
+        )
+        acesso_dados._CLIENTE_SINCRONO = servidor
+        ativos = sum(
+            1 for e in servidor.tabelas[biblioteca.TABELA_EMPRESTIMOS] if e["status"] == "Ativo"
+        )
+        paginas = math.ceil(quantidade / biblioteca.TAMANHO_PAGINA)
+
+        medicoes = [
+            (
+                "listar_membros (todas as páginas)",
+                quantidade,
+                biblioteca.listar_membros,
+                [""] * paginas,
+                # Contagem + páginas + uma contagem de ativos por página
+                1 + consultas_paginar(quantidade) + paginas,
+            ),
+            (
+                "devolver_livro (1ª página, cancela)",
+                ativos,
+                biblioteca.devolver_livro,
+                ["0"],
+                # Página + membros + livros da página (o ID 0 não existe)
+                3,
+            ),
+            (
+                "relatorio_emprestimos (todas as páginas)",
+                quantidade,
+                biblioteca.relatorio_emprestimos,
+                ["1"] + [""] * paginas,
+                # Contagem + páginas + membros e livros por página
+                1 + consultas_paginar(quantidade) + 2 * paginas,
+            ),
+        ]
+
+        for nome, linhas, tela, respostas, esperado in medicoes:
+            try:
+                requisicoes = contar_requisicoes(servidor, tela, respostas)
+            except (RuntimeError, StopIteration) as erro:
+                requisicoes = f"erro: {erro}"
+            passou = isinstance(requisicoes, int) and requisicoes <= esperado
+            marca = "✓" if passou else "✗"
+            falhas += not passou
+            print(f"  {marca} {nome:<38} {linhas:>8,} {requisicoes!s:>12} {esperado:>9,}")
+        print()
+
+    if falhas:
+        print(f"  ✗ {falhas} tela(s) fizeram mais requisições que o esperado")
+        sys.exit(1)
+    print("  ✓ Nenhuma tela faz requisições por linha")
+
+
+if __name__ == "__main__":
+    main()
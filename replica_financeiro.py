@@ -0,0 +1,900 @@
+# ========== RÉPLICA LOCAL (SQLITE) DO CONTROLE FINANCEIRO ==========
+# Cópia das transações num arquivo SQLite: listagens e relatórios leem daqui,
+# sem ida ao servidor, e o sistema continua funcionando sem internet.
+# Uma thread em segundo plano sincroniza com o Supabase:
+#   • envia a fila de alterações locais (pendências), na ordem em que foram feitas
+#   • baixa só o que mudou no servidor desde a última vez (coluna atualizado_em)
+#   • aplica as exclusões registradas no servidor (tabela transacoes_excluidas)
+# Conflitos: se a transação mudou no servidor depois que foi editada aqui, a
+# versão do servidor vence e a alteração local vai para a tabela 'conflitos'.
+# Conceitos: sqlite3, threads, filas, sincronização incremental, JSON
+#
+# Requer as colunas e gatilhos do financeiro.sql.
+
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from acesso_dados import obter_cliente
+from dinheiro import centavos_para_texto, para_centavos
+
+ARQUIVO_REPLICA = os.getenv("FINANCEIRO_REPLICA", "financeiro_local.db")
+
+# Tabelas no Supabase
+TABELA_TRANSACOES = "transacoes"
+TABELA_EXCLUSOES = "transacoes_excluidas"
+
+CAMPOS_SERVIDOR = "id, tipo, categoria, descricao, valor, data, atualizado_em"
+TAMANHO_PAGINA_SINCRONIZACAO = 1000
+TAMANHO_LOTE_ENVIO = 500  # Inserções seguidas enviadas num único upsert
+INTERVALO_SINCRONIZACAO = 30  # Segundos entre sincronizações automáticas
+
+# Cada sincronização volta um pouco antes do último carimbo visto: uma
+# transação do banco que demorou a confirmar pode ter carimbo "no passado".
+# Baixar de novo uma linha já conhecida não faz mal (é só sobrescrita).
+MARGEM_SINCRONIZACAO = timedelta(seconds=5)
+
+# Valores em centavos inteiros (dinheiro.py); o servidor guarda numeric(14, 2)
+TABELA_LOCAL = """
+create table if not exists transacoes (
+    id integer primary key,   -- negativo enquanto a inserção não subiu
+    tipo text not null,
+    categoria text not null,
+    descricao text not null,
+    valor_centavos integer not null,
+    data text not null,
+    atualizado_em text        -- versão do servidor (null = só existe aqui)
+);
+"""
+
+ESQUEMA = TABELA_LOCAL + """
+-- Detecta lançamentos já existentes na importação de extratos (inserir_lote);
+-- como começa por data, também serve às consultas por período
+create index if not exists idx_transacoes_duplicatas
+    on transacoes (data, valor_centavos, descricao);
+drop index if exists idx_transacoes_data;
+create index if not exists idx_transacoes_tipo_data on transacoes (tipo, data);
+-- Maior/menor valor e "top N" de cada tipo lidos direto do índice
+create index if not exists idx_transacoes_tipo_valor
+    on transacoes (tipo, valor_centavos);
+
+create table if not exists pendencias (
+    seq integer primary key autoincrement,
+    operacao text not null,   -- inserir | atualizar | excluir
+    transacao_id integer not null,
+    dados text,               -- campos em JSON
+    base_atualizado_em text   -- versão do servidor sobre a qual foi feita
+);
+
+create table if not exists conflitos (
+    seq integer primary key autoincrement,
+    transacao_id integer not null,
+    operacao text not null,
+    dados text,
+    registrado_em text not null
+);
+
+create table if not exists controle (
+    chave text primary key,
+    valor text
+);
+"""
+
+# ========== RAZÃO (SALDOS INCREMENTAIS) ==========
+# Totais por dia e por mês mantidos por gatilhos do SQLite: cada inserção,
+# edição ou exclusão em transacoes (feita no menu ou recebida na
+# sincronização) ajusta só as linhas afetadas, sem somar a tabela de novo.
+# saldos_mensais também guarda os totais ACUMULADOS até o fim de cada mês,
+# então o saldo atual é uma leitura e o saldo em qualquer data lê um mês e
+# no máximo 31 dias. Uma transação retroativa atualiza os meses seguintes
+# (poucas linhas: um por mês de histórico). totais_categoria guarda soma e
+# quantidade por tipo e categoria, para as estatísticas não lerem as linhas.
+# Ao mudar tabelas ou gatilhos, incremente RAZAO_VERSAO: réplicas antigas
+# são recalculadas na próxima abertura.
+RAZAO_VERSAO = 3
+
+ESQUEMA_RAZAO = """
+create table if not exists saldos_diarios (
+    data text primary key,
+    receitas integer not null default 0,
+    despesas integer not null default 0,
+    quantidade integer not null default 0
+);
+
+create table if not exists saldos_mensais (
+    mes text primary key,                     -- YYYY-MM
+    receitas integer not null default 0,
+    despesas integer not null default 0,
+    quantidade integer not null default 0,
+    receitas_acumuladas integer not null default 0,
+    despesas_acumuladas integer not null default 0
+);
+
+create table if not exists totais_categoria (
+    tipo text not null,
+    categoria text not null,
+    total integer not null default 0,
+    quantidade integer not null default 0,
+    primary key (tipo, categoria)
+);
+"""
+
+
+def _sql_lancar(linha, sinal):
+    """
+    Comandos que somam (sinal '+') ou subtraem (sinal '-') a transação
+    'linha' (new/old do gatilho) dos saldos diários e mensais.
+    """
+    mes = f"substr({linha}.data, 1, 7)"
+    valor = f"{linha}.valor_centavos"
+    receita = f"(case when {linha}.tipo = 'Receita' then {valor} else 0 end)"
+    despesa = f"(case when {linha}.tipo = 'Receita' then 0 else {valor} end)"
+    return f"""
+    insert into saldos_diarios (data) values ({linha}.data)
+        on conflict (data) do nothing;
+    update saldos_diarios
+       set receitas = receitas {sinal} {receita},
+           despesas = despesas {sinal} {despesa},
+           quantidade = quantidade {sinal} 1
+     where data = {linha}.data;
+
+    -- Mês novo começa com os acumulados do mês anterior
+    insert into saldos_mensais (mes, receitas_acumuladas, despesas_acumuladas)
+        select {mes},
+               coalesce((select receitas_acumuladas from saldos_mensais
+                          where mes < {mes} order by mes desc limit 1), 0),
+               coalesce((select despesas_acumuladas from saldos_mensais
+                          where mes < {mes} order by mes desc limit 1), 0)
+         where true
+        on conflict (mes) do nothing;
+    update saldos_mensais
+       set receitas = receitas {sinal} {receita},
+           despesas = despesas {sinal} {despesa},
+           quantidade = quantidade {sinal} 1
+     where mes = {mes};
+    update saldos_mensais
+       set receitas_acumuladas = receitas_acumuladas {sinal} {receita},
+           despesas_acumuladas = despesas_acumuladas {sinal} {despesa}
+     where mes >= {mes};
+
+    insert into totais_categoria (tipo, categoria) values ({linha}.tipo, {linha}.categoria)
+        on conflict (tipo, categoria) do nothing;
+    update totais_categoria
+       set total = total {sinal} {valor},
+           quantidade = quantidade {sinal} 1
+     where tipo = {linha}.tipo and categoria = {linha}.categoria;
+"""
+
+
+GATILHOS_RAZAO = [
+    f"""create trigger trg_razao_inserir after insert on transacoes
+        begin {_sql_lancar("new", "+")} end""",
+    f"""create trigger trg_razao_excluir after delete on transacoes
+        begin {_sql_lancar("old", "-")} end""",
+    f"""create trigger trg_razao_atualizar
+        after update of tipo, categoria, valor_centavos, data on transacoes
+        begin {_sql_lancar("old", "-")} {_sql_lancar("new", "+")} end""",
+]
+
+# Situação da última sincronização (mostrada no menu)
+ESTADO_SINCRONIZACAO = {"online": None, "ultima": None, "erro": None}
+
+_ESQUEMA_CRIADO = False
+_TRAVA_SINCRONIZACAO = threading.Lock()
+_ACORDAR = threading.Event()
+
+
+# ========== ACESSO AO ARQUIVO LOCAL ==========
+def conectar():
+    """
+    Abre uma conexão com o arquivo da réplica. Cada thread usa a sua
+    (conexões sqlite3 não devem ser compartilhadas entre threads).
+    """
+    global _ESQUEMA_CRIADO
+
+    con = sqlite3.connect(ARQUIVO_REPLICA, timeout=30, isolation_level=None)
+    con.row_factory = sqlite3.Row
+    if not _ESQUEMA_CRIADO:
+        # WAL: o menu continua lendo enquanto a sincronização escreve
+        con.execute("pragma journal_mode = wal")
+        _migrar_para_centavos(con)
+        con.executescript(ESQUEMA + ESQUEMA_RAZAO)
+        if _ler_controle(con, "razao_versao") != str(RAZAO_VERSAO):
+            _reconstruir_razao(con)
+        _ESQUEMA_CRIADO = True
+    return con
+
+
+@contextmanager
+def _escrita(con):
+    """Agrupa várias alterações numa transação única (tudo ou nada)"""
+    con.execute("begin immediate")
+    try:
+        yield
+    except Exception:
+        con.execute("rollback")
+        raise
+    con.execute("commit")
+
+
+def consultar(sql, parametros=()):
+    """Executa um SELECT na réplica e devolve a lista de dicionários"""
+    con = conectar()
+    try:
+        return [dict(linha) for linha in con.execute(sql, parametros)]
+    finally:
+        con.close()
+
+
+def _ler_controle(con, chave):
+    linha = con.execute("select valor from controle where chave = ?", (chave,)).fetchone()
+    return linha["valor"] if linha else None
+
+
+def _gravar_controle(con, chave, valor):
+    con.execute(
+        "insert into controle (chave, valor) values (?, ?) "
+        "on conflict (chave) do update set valor = excluded.valor",
+        (chave, valor),
+    )
+
+
+def _migrar_para_centavos(con):
+    """
+    Réplicas antigas guardavam 'valor' em reais (real/float). Recria a
+    tabela com valor_centavos, converte a fila de pendências para o formato
+    novo e descarta o razão (é recalculado em seguida, já em inteiros).
+    """
+    colunas = {linha["name"] for linha in con.execute("pragma table_info(transacoes)")}
+    if "valor" not in colunas:
+        return  # Réplica nova ou já migrada
+
+    with _escrita(con):
+        for gatilho in ("trg_razao_inserir", "trg_razao_excluir", "trg_razao_atualizar"):
+            con.execute(f"drop trigger if exists {gatilho}")
+        for tabela in ("saldos_diarios", "saldos_mensais", "totais_categoria"):
+            con.execute(f"drop table if exists {tabela}")
+
+        con.execute("alter table transacoes rename to transacoes_antiga")
+        con.execute(TABELA_LOCAL)
+        con.execute(
+            "insert into transacoes (id, tipo, categoria, descricao, valor_centavos, "
+            "                        data, atualizado_em) "
+            "select id, tipo, categoria, descricao, cast(round(valor * 100) as integer), "
+            "       data, atualizado_em from transacoes_antiga"
+        )
+        con.execute("drop table transacoes_antiga")  # Leva junto os índices antigos
+
+        for pendencia in con.execute(
+            "select seq, dados from pendencias where dados is not null"
+        ).fetchall():
+            dados = json.loads(pendencia["dados"])
+            if "valor" in dados:
+                dados["valor"] = centavos_para_texto(para_centavos(dados["valor"]))
+                con.execute(
+                    "update pendencias set dados = ? where seq = ?",
+                    (json.dumps(dados), pendencia["seq"]),
+                )
+
+
+def _reconstruir_razao(con):
+    """
+    Recalcula os saldos a partir das transações (réplica nova ou de uma
+    versão anterior do razão) e instala os gatilhos que os mantêm dali em diante.
+    """
+    with _escrita(con):
+        for gatilho in ("trg_razao_inserir", "trg_razao_excluir", "trg_razao_atualizar"):
+            con.execute(f"drop trigger if exists {gatilho}")
+        con.execute("delete from saldos_diarios")
+        con.execute("delete from saldos_mensais")
+        con.execute("delete from totais_categoria")
+        con.execute(
+            "insert into saldos_diarios (data, receitas, despesas, quantidade) "
+            "select data, "
+            "       sum(case when tipo = 'Receita' then valor_centavos else 0 end), "
+            "       sum(case when tipo = 'Receita' then 0 else valor_centavos end), "
+            "       count(*) "
+            "  from transacoes group by data"
+        )
+        con.execute(
+            "insert into saldos_mensais (mes, receitas, despesas, quantidade, "
+            "                            receitas_acumuladas, despesas_acumuladas) "
+            "select mes, receitas, despesas, quantidade, "
+            "       sum(receitas) over (order by mes), "
+            "       sum(despesas) over (order by mes) "
+            "  from (select substr(data, 1, 7) as mes, sum(receitas) as receitas, "
+            "               sum(despesas) as despesas, sum(quantidade) as quantidade "
+            "          from saldos_diarios group by 1)"
+        )
+        con.execute(
+            "insert into totais_categoria (tipo, categoria, total, quantidade) "
+            "select tipo, categoria, sum(valor_centavos), count(*) "
+            "  from transacoes group by tipo, categoria"
+        )
+        for gatilho in GATILHOS_RAZAO:
+            con.execute(gatilho)
+        _gravar_controle(con, "razao_versao", str(RAZAO_VERSAO))
+
+
+def _instante(texto):
+    """Converte o carimbo ISO do servidor (com fuso) em datetime"""
+    return datetime.fromisoformat(texto.replace("Z", "+00:00"))
+
+
+# ========== ALTERAÇÕES LOCAIS ==========
+# Toda alteração muda a réplica na hora e entra no fim da fila de pendências.
+# A fila só cresce (nada é editado no lugar), então uma alteração feita
+# durante uma sincronização nunca se perde: ela simplesmente sobe na próxima.
+def _enfileirar(con, operacao, transacao_id, dados=None):
+    linha = con.execute(
+        "select atualizado_em from transacoes where id = ?", (transacao_id,)
+    ).fetchone()
+    base = linha["atualizado_em"] if linha else None
+    con.execute(
+        "insert into pendencias (operacao, transacao_id, dados, base_atualizado_em) "
+        "values (?, ?, ?, ?)",
+        (operacao, transacao_id, json.dumps(dados) if dados else None, base),
+    )
+
+
+def _para_servidor(dados):
+    """Campos no formato da tabela do Supabase (valor em reais, como texto exato)"""
+    servidor = {chave: valor for chave, valor in dados.items() if chave != "valor_centavos"}
+    servidor["valor"] = centavos_para_texto(dados["valor_centavos"])
+    return servidor
+
+
+def inserir_transacao(dados):
+    """
+    Grava a transação na réplica com um ID local provisório (negativo) e
+    agenda o envio. dados: tipo, categoria, descricao, valor_centavos, data.
+    Retorna o ID provisório.
+    """
+    con = conectar()
+    try:
+        with _escrita(con):
+            # Contador próprio: um ID provisório nunca é reaproveitado,
+            # mesmo que a transação seja excluída antes de subir
+            proximo = int(_ler_controle(con, "proximo_id_local") or -1)
+            _gravar_controle(con, "proximo_id_local", str(proximo - 1))
+
+            con.execute(
+                "insert into transacoes (id, tipo, categoria, descricao, "
+                "                        valor_centavos, data) "
+                "values (?, ?, ?, ?, ?, ?)",
+                (
+                    proximo,
+                    dados["tipo"],
+                    dados["categoria"],
+                    dados["descricao"],
+                    dados["valor_centavos"],
+                    dados["data"],
+                ),
+            )
+            # chave_cliente torna o reenvio seguro (não duplica no servidor)
+            _enfileirar(
+                con,
+                "inserir",
+                proximo,
+                dict(_para_servidor(dados), chave_cliente=uuid.uuid4().hex),
+            )
+    finally:
+        con.close()
+
+    _ACORDAR.set()
+    return proximo
+
+
+def inserir_lote(lista):
+    """
+    Grava várias transações numa única transação do SQLite (importação de
+    extratos) e agenda o envio. Pula as que a réplica já tem com a mesma
+    data, valor e descrição: se o lote traz k lançamentos iguais e a réplica
+    já tem e, entram só k - e (dois cafés iguais no mesmo dia continuam
+    sendo dois). Retorna (inseridas, duplicadas).
+    """
+    por_chave = {}
+    for dados in lista:
+        chave = (dados["data"], dados["valor_centavos"], dados["descricao"])
+        por_chave[chave] = por_chave.get(chave, 0) + 1
+
+    con = conectar()
+    try:
+        with _escrita(con):
+            # Quantas de cada chave já existem (idx_transacoes_duplicatas)
+            pular = {}
+            for chave in por_chave:
+                existentes = con.execute(
+                    "select count(*) from transacoes "
+                    "where data = ? and valor_centavos = ? and descricao = ?",
+                    chave,
+                ).fetchone()[0]
+                if existentes:
+                    pular[chave] = existentes
+
+            novas = []
+            for dados in lista:
+                chave = (dados["data"], dados["valor_centavos"], dados["descricao"])
+                if pular.get(chave):
+                    pular[chave] -= 1
+                else:
+                    novas.append(dados)
+
+            proximo = int(_ler_controle(con, "proximo_id_local") or -1)
+            _gravar_controle(con, "proximo_id_local", str(proximo - len(novas)))
+            ids = range(proximo, proximo - len(novas), -1)
+
+            con.executemany(
+                "insert into transacoes (id, tipo, categoria, descricao, "
+                "                        valor_centavos, data) "
+                "values (?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        transacao_id,
+                        dados["tipo"],
+                        dados["categoria"],
+                        dados["descricao"],
+                        dados["valor_centavos"],
+                        dados["data"],
+                    )
+                    for transacao_id, dados in zip(ids, novas)
+                ],
+            )
+            # Linhas novas ainda não têm versão do servidor: base fica null
+            con.executemany(
+                "insert into pendencias (operacao, transacao_id, dados) "
+                "values ('inserir', ?, ?)",
+                [
+                    (
+                        transacao_id,
+                        json.dumps(
+                            dict(_para_servidor(dados), chave_cliente=uuid.uuid4().hex)
+                        ),
+                    )
+                    for transacao_id, dados in zip(ids, novas)
+                ],
+            )
+    finally:
+        con.close()
+
+    if novas:
+        _ACORDAR.set()
+    return len(novas), len(lista) - len(novas)
+
+
+def atualizar_transacao(transacao_id, dados):
+    """Altera a transação na réplica e agenda o envio. False se não existe."""
+    con = conectar()
+    try:
+        with _escrita(con):
+            cursor = con.execute(
+                "update transacoes set tipo = coalesce(?, tipo), categoria = ?, "
+                "descricao = ?, valor_centavos = ?, data = ? where id = ?",
+                (
+                    dados.get("tipo"),
+                    dados["categoria"],
+                    dados["descricao"],
+                    dados["valor_centavos"],
+                    dados["data"],
+                    transacao_id,
+                ),
+            )
+            if cursor.rowcount == 0:
+                return False
+            _enfileirar(con, "atualizar", transacao_id, _para_servidor(dados))
+    finally:
+        con.close()
+
+    _ACORDAR.set()
+    return True
+
+
+def excluir_transacao(transacao_id):
+    """Remove a transação da réplica e agenda a exclusão. False se não existe."""
+    con = conectar()
+    try:
+        with _escrita(con):
+            _enfileirar(con, "excluir", transacao_id)
+            cursor = con.execute("delete from transacoes where id = ?", (transacao_id,))
+            if cursor.rowcount == 0:
+                raise LookupError(transacao_id)  # Desfaz o enfileiramento
+    except LookupError:
+        return False
+    finally:
+        con.close()
+
+    _ACORDAR.set()
+    return True
+
+
+def contar_pendencias():
+    """Quantas alterações locais ainda não chegaram ao servidor"""
+    return consultar("select count(*) as total from pendencias")[0]["total"]
+
+
+def listar_conflitos(limite=20):
+    """Alterações locais descartadas por conflito, das mais recentes"""
+    return consultar(
+        "select * from conflitos order by seq desc limit ?", (limite,)
+    )
+
+
+# ========== CONSULTAS DO RAZÃO ==========
+def _totais(receitas, despesas):
+    # Tudo em centavos inteiros: as somas do razão são exatas
+    receitas = receitas or 0
+    despesas = despesas or 0
+    return {"receitas": receitas, "despesas": despesas, "saldo": receitas - despesas}
+
+
+def saldo_atual():
+    """Totais de todas as transações, lidos do último mês do razão"""
+    linhas = consultar(
+        "select receitas_acumuladas, despesas_acumuladas from saldos_mensais "
+        "order by mes desc limit 1"
+    )
+    if not linhas:
+        return _totais(0, 0)
+    return _totais(linhas[0]["receitas_acumuladas"], linhas[0]["despesas_acumuladas"])
+
+
+def saldo_em(data_iso):
+    """
+    Totais acumulados até o fim do dia 'data_iso' (YYYY-MM-DD): acumulado
+    do mês anterior + os dias do próprio mês até a data.
+    """
+    mes = data_iso[:7]
+    anterior = consultar(
+        "select receitas_acumuladas, despesas_acumuladas from saldos_mensais "
+        "where mes < ? order by mes desc limit 1",
+        (mes,),
+    )
+    dias = consultar(
+        "select sum(receitas) as receitas, sum(despesas) as despesas "
+        "from saldos_diarios where data >= ? and data <= ?",
+        (f"{mes}-01", data_iso),
+    )[0]
+
+    receitas = dias["receitas"] or 0
+    despesas = dias["despesas"] or 0
+    if anterior:
+        receitas += anterior[0]["receitas_acumuladas"]
+        despesas += anterior[0]["despesas_acumuladas"]
+    return _totais(receitas, despesas)
+
+
+def resumo_do_periodo(inicio, fim):
+    """
+    Totais por tipo e categoria das transações com inicio <= data < fim,
+    num único SELECT agrupado (usa o índice por data). Cada linha:
+    {'tipo', 'categoria', 'total' (centavos), 'quantidade'}, maiores totais primeiro.
+    """
+    return consultar(
+        "select tipo, categoria, sum(valor_centavos) as total, count(*) as quantidade "
+        "from transacoes where data >= ? and data < ? "
+        "group by tipo, categoria order by total desc",
+        (inicio, fim),
+    )
+
+
+def totais_por_categoria(tipo):
+    """Soma (em centavos) e quantidade de cada categoria do tipo, maiores primeiro"""
+    return consultar(
+        "select categoria, total, quantidade from totais_categoria "
+        "where tipo = ? and quantidade > 0 order by total desc",
+        (tipo,),
+    )
+
+
+def maiores_transacoes(tipo, limite=5, decrescente=True):
+    """
+    As 'limite' transações de maior (ou menor) valor do tipo. Lidas pelo
+    índice (tipo, valor_centavos): custa o mesmo com cem ou com milhões de linhas.
+    """
+    ordem = "desc" if decrescente else "asc"
+    return consultar(
+        f"select * from transacoes where tipo = ? order by valor_centavos {ordem}, id limit ?",
+        (tipo, limite),
+    )
+
+
+def listar_saldos_mensais():
+    """Receitas, despesas e saldo de cada mês com movimento, em ordem"""
+    return [
+        dict(mes=linha["mes"], **_totais(linha["receitas"], linha["despesas"]))
+        for linha in consultar(
+            "select mes, receitas, despesas from saldos_mensais "
+            "where quantidade > 0 order by mes"
+        )
+    ]
+
+
+# ========== SINCRONIZAÇÃO ==========
+def _confirmar(con, pendencia, novo_id, versao):
+    """
+    Pendência aceita pelo servidor: tira da fila, troca o ID provisório pelo
+    definitivo e marca a versão. As pendências seguintes da mesma transação
+    foram feitas sobre esta alteração, então passam a ter esta versão como base.
+    """
+    with _escrita(con):
+        _aplicar_confirmacao(con, pendencia, novo_id, versao)
+
+
+def _aplicar_confirmacao(con, pendencia, novo_id, versao):
+    # Parte de _confirmar() que roda dentro de uma escrita já aberta
+    antigo_id = pendencia["transacao_id"]
+    if novo_id != antigo_id:
+        con.execute("update transacoes set id = ? where id = ?", (novo_id, antigo_id))
+    con.execute("update transacoes set atualizado_em = ? where id = ?", (versao, novo_id))
+    con.execute(
+        "update pendencias set transacao_id = ?, base_atualizado_em = ? "
+        "where transacao_id = ? and seq > ?",
+        (novo_id, versao, antigo_id, pendencia["seq"]),
+    )
+    con.execute("delete from pendencias where seq = ?", (pendencia["seq"],))
+
+
+def _confirmar_insercoes(con, lote, linhas_servidor):
+    """
+    Confirma de uma vez um lote de inserções enviadas num único upsert. A
+    resposta é casada com as pendências pela chave_cliente, não pela ordem.
+    """
+    versoes = {linha["chave_cliente"]: linha for linha in linhas_servidor}
+    with _escrita(con):
+        for pendencia in lote:
+            versao = versoes[json.loads(pendencia["dados"])["chave_cliente"]]
+            _aplicar_confirmacao(con, pendencia, versao["id"], versao["atualizado_em"])
+
+
+def _buscar_no_servidor(transacao_id):
+    """Versão atual da transação no servidor (lista vazia se não existe)"""
+    return (
+        obter_cliente()
+        .table(TABELA_TRANSACOES)
+        .select(CAMPOS_SERVIDOR)
+        .eq("id", transacao_id)
+        .execute()
+        .data
+    )
+
+
+def _registrar_conflito(con, pendencia, linhas_servidor):
+    """
+    O servidor mudou a transação depois da edição local: a versão do servidor
+    vence. As pendências locais da transação vão para 'conflitos' e a linha
+    local é substituída pela do servidor (ou apagada, se não existir mais).
+    """
+    transacao_id = pendencia["transacao_id"]
+    with _escrita(con):
+        con.execute(
+            "insert into conflitos (transacao_id, operacao, dados, registrado_em) "
+            "select transacao_id, operacao, dados, ? from pendencias "
+            "where transacao_id = ? order by seq",
+            (datetime.now().isoformat(timespec="seconds"), transacao_id),
+        )
+        con.execute("delete from pendencias where transacao_id = ?", (transacao_id,))
+        con.execute("delete from transacoes where id = ?", (transacao_id,))
+        for linha in linhas_servidor:
+            _gravar_local(con, linha)
+
+
+def _gravar_local(con, linha):
+    """Insere ou substitui na réplica uma linha vinda do servidor"""
+    con.execute(
+        "insert into transacoes (id, tipo, categoria, descricao, valor_centavos, "
+        "                        data, atualizado_em) "
+        "values (:id, :tipo, :categoria, :descricao, :valor_centavos, :data, "
+        "        :atualizado_em) "
+        "on conflict (id) do update set tipo = excluded.tipo, "
+        "categoria = excluded.categoria, descricao = excluded.descricao, "
+        "valor_centavos = excluded.valor_centavos, data = excluded.data, "
+        "atualizado_em = excluded.atualizado_em",
+        dict(linha, valor_centavos=para_centavos(linha["valor"])),
+    )
+
+
+def _enviar_pendencias(con):
+    """Envia a fila de pendências em ordem. Retorna (enviadas, conflitos)."""
+    enviadas = 0
+    conflitos = 0
+    tabela = obter_cliente().table
+
+    while True:
+        fila = con.execute(
+            "select * from pendencias order by seq limit ?", (TAMANHO_LOTE_ENVIO,)
+        ).fetchall()
+        if not fila:
+            return enviadas, conflitos
+
+        pendencia = fila[0]
+        transacao_id = pendencia["transacao_id"]
+        base = pendencia["base_atualizado_em"]
+        dados = json.loads(pendencia["dados"]) if pendencia["dados"] else None
+
+        if pendencia["operacao"] == "inserir":
+            # Inserções seguidas (ex.: importação de extrato) sobem num único
+            # upsert pela chave do cliente: se a resposta anterior se perdeu,
+            # o reenvio encontra as mesmas linhas em vez de criar outras
+            lote = list(itertools.takewhile(lambda p: p["operacao"] == "inserir", fila))
+            resposta = tabela(TABELA_TRANSACOES).upsert(
+                [json.loads(p["dados"]) for p in lote], on_conflict="chave_cliente"
+            ).execute()
+            _confirmar_insercoes(con, lote, resposta.data)
+            enviadas += len(lote)
+            continue
+
+        if pendencia["operacao"] == "atualizar":
+            # Atualização condicional: só aplica se o servidor ainda estiver
+            # na versão que foi editada aqui
+            query = tabela(TABELA_TRANSACOES).update(dados).eq("id", transacao_id)
+            if base:
+                query = query.eq("atualizado_em", base)
+            resposta = query.execute()
+            if resposta.data:
+                _confirmar(con, pendencia, transacao_id, resposta.data[0]["atualizado_em"])
+            else:
+                _registrar_conflito(con, pendencia, _buscar_no_servidor(transacao_id))
+                conflitos += 1
+
+        else:  # excluir
+            query = tabela(TABELA_TRANSACOES).delete().eq("id", transacao_id)
+            if base:
+                query = query.eq("atualizado_em", base)
+            resposta = query.execute()
+            servidor = [] if resposta.data else _buscar_no_servidor(transacao_id)
+            if servidor:
+                # Nada foi apagado porque a transação mudou no servidor
+                # depois da exclusão local
+                _registrar_conflito(con, pendencia, servidor)
+                conflitos += 1
+            else:
+                # Apagada agora (ou já não existia): nada mais a enviar dela
+                with _escrita(con):
+                    con.execute(
+                        "delete from pendencias where transacao_id = ?", (transacao_id,)
+                    )
+
+        enviadas += 1
+
+
+def _baixar_desde(con, tabela, campos, coluna, chave_cursor, aplicar):
+    """
+    Baixa, em páginas, as linhas de 'tabela' com 'coluna' posterior ao
+    cursor salvo em controle e chama aplicar(con, pagina) para cada página.
+    Retorna o total de linhas recebidas.
+    Paginação por cursor (keyset) em (coluna, id), como paginar() do
+    biblioteca.py: com OFFSET, uma linha já lida que mudasse no servidor
+    entre duas páginas iria para o fim e empurraria outra para trás do
+    deslocamento, e essa outra nunca seria baixada.
+    """
+    cursor = _ler_controle(con, chave_cursor)
+    maior = _instante(cursor) if cursor else None
+    total = 0
+    ultima = None  # (coluna, id) da última linha recebida
+
+    while True:
+        query = obter_cliente().table(tabela).select(campos)
+        if cursor:
+            query = query.gt(coluna, (_instante(cursor) - MARGEM_SINCRONIZACAO).isoformat())
+        if ultima is not None:
+            # Aspas: o carimbo tem ':' e '+', que o filtro or_() interpretaria
+            valor, ultimo_id = f'"{ultima[0]}"', ultima[1]
+            query = query.or_(f"{coluna}.gt.{valor},and({coluna}.eq.{valor},id.gt.{ultimo_id})")
+        pagina = (
+            query.order(coluna)
+            .order("id")
+            .limit(TAMANHO_PAGINA_SINCRONIZACAO)
+            .execute()
+            .data
+        )
+
+        with _escrita(con):
+            aplicar(con, pagina)
+        total += len(pagina)
+
+        for linha in pagina:
+            instante = _instante(linha[coluna])
+            if maior is None or instante > maior:
+                maior = instante
+
+        if len(pagina) < TAMANHO_PAGINA_SINCRONIZACAO:
+            break
+        ultima = (pagina[-1][coluna], pagina[-1]["id"])
+
+    # O cursor só avança no fim: se a conexão cair no meio, a próxima
+    # sincronização recomeça do mesmo ponto
+    if maior is not None:
+        with _escrita(con):
+            _gravar_controle(con, chave_cursor, maior.isoformat())
+    return total
+
+
+def _aplicar_alteracoes(con, pagina):
+    # Linhas com alteração local ainda na fila ficam como estão: a alteração
+    # local sobe na próxima rodada (ou vira conflito, se for o caso)
+    pendentes = {
+        linha["transacao_id"]
+        for linha in con.execute("select distinct transacao_id from pendencias")
+    }
+    for linha in pagina:
+        if linha["id"] not in pendentes:
+            _gravar_local(con, linha)
+
+
+def _aplicar_exclusoes(con, pagina):
+    con.executemany(
+        "delete from transacoes where id = ?", [(linha["id"],) for linha in pagina]
+    )
+
+
+def sincronizar():
+    """
+    Uma rodada completa: envia as pendências e depois baixa alterações e
+    exclusões do servidor. Retorna um resumo; falhas de conexão são
+    repassadas (a fila continua salva para a próxima tentativa).
+    """
+    with _TRAVA_SINCRONIZACAO:
+        con = conectar()
+        try:
+            enviadas, conflitos = _enviar_pendencias(con)
+            recebidas = _baixar_desde(
+                con,
+                TABELA_TRANSACOES,
+                CAMPOS_SERVIDOR,
+                "atualizado_em",
+                "cursor_transacoes",
+                _aplicar_alteracoes,
+            )
+            excluidas = _baixar_desde(
+                con,
+                TABELA_EXCLUSOES,
+                "id, excluida_em",
+                "excluida_em",
+                "cursor_exclusoes",
+                _aplicar_exclusoes,
+            )
+        except Exception as e:
+            ESTADO_SINCRONIZACAO.update(online=False, erro=str(e))
+            raise
+        finally:
+            con.close()
+
+    ESTADO_SINCRONIZACAO.update(online=True, ultima=datetime.now(), erro=None)
+    return {
+        "enviadas": enviadas,
+        "conflitos": conflitos,
+        "recebidas": recebidas,
+        "excluidas": excluidas,
+    }
+
+
+def ja_sincronizou():
+    """True se a réplica já recebeu dados do servidor alguma vez"""
+    con = conectar()
+    try:
+        return _ler_controle(con, "cursor_transacoes") is not None
+    finally:
+        con.close()
+
+
+def iniciar_sincronizacao_automatica(intervalo=INTERVALO_SINCRONIZACAO):
+    """
+    Sobe a thread que sincroniza a cada 'intervalo' segundos, ou logo
+    depois de uma alteração local. Sem internet, apenas tenta de novo
+    no próximo ciclo.
+    """
+
+    def laco():
+        while True:
+            _ACORDAR.wait(intervalo)
+            _ACORDAR.clear()
+            try:
+                sincronizar()
+            except Exception:
+                pass  # O erro fica em ESTADO_SINCRONIZACAO
+
+    threading.Thread(target=laco, name="sincronizacao", daemon=True).start()
@@ -0,0 +1,252 @@
+# ========== SUBSTITUTO DO POSTGREST EM MEMÓRIA ==========
+# Cliente falso para os scripts de medição: entende o pedaço da API do
+# supabase-py usado pelo biblioteca.py (table().select/eq/gt/lt/ilike/in_/
+# or_/order/limit/execute, com count, insert, update e rpc) sobre tabelas que
+# são listas de dicionários, e conta cada execute() como uma requisição HTTP.
+#   • Visões do banco são funções que recebem as tabelas e devolvem as linhas;
+#     funções do banco (rpc) recebem as tabelas e os parâmetros.
+#   • Colunas únicas (como livros.isbn) recusam o insert inteiro, como o Postgres.
+#   • Cada resposta vai e volta em JSON, como na rede: o tamanho é somado em
+#     'bytes' e o tempo de gerar e ler o JSON entra na medição.
+#   • 'latencia' (segundos por requisição) e 'banda' (bytes por segundo)
+#     simulam a rede entre o balcão e o Supabase.
+#   • servidor.assincrono() é o cliente de acreate_client: execute() é uma
+#     corrotina, e a espera da rede é um asyncio.sleep (as consultas de
+#     executar_em_paralelo esperam juntas, como no cliente de verdade).
+# Para usar, injete no acesso_dados: injetar(servidor)
+# Conceitos: re, json, time.sleep, asyncio.sleep, types.SimpleNamespace
+
+import asyncio
+import json
+import re
+import time
+from types import SimpleNamespace
+
+# Filtro de paginar(): col.gt."valor",and(col.eq."valor",id.gt.123)
+PADRAO_CURSOR = re.compile(
+    r'(\w+)\.(gt|lt)\."((?:[^"\\]|\\.)*)",and\(\w+\.eq\."(?:[^"\\]|\\.)*",id\.(?:gt|lt)\.(-?\d+)\)$'
+)
+
+
+class ServidorFalso:
+    """Tabelas em memória, visões e funções calculadas, contadores de rede"""
+
+    def __init__(
+        self, tabelas, visoes=None, unicas=None, funcoes=None, latencia=0.0, banda=None
+    ):
+        self.tabelas = tabelas
+        self.visoes = visoes or {}
+        self.unicas = unicas or {}  # Tabela → colunas únicas (nulos não contam)
+        self.funcoes = funcoes or {}  # Nome da rpc → função(tabelas, parametros)
+        self.latencia = latencia
+        self.banda = banda
+        self.requisicoes = 0
+        self.bytes = 0
+
+    def table(self, nome):
+        return ConsultaFalsa(self, nome)
+
+    def rpc(self, nome, parametros):
+        return ChamadaFalsa(self, nome, parametros)
+
+    def assincrono(self):
+        """Cliente assíncrono sobre as mesmas tabelas e os mesmos contadores"""
+        return ClienteAssincronoFalso(self)
+
+    def linhas(self, nome):
+        if nome in self.visoes:
+            return self.visoes[nome](self.tabelas)
+        return self.tabelas[nome]
+
+    def zerar(self):
+        self.requisicoes = 0
+        self.bytes = 0
+
+    def empacotar(self, dados, count):
+        """Conta a requisição e devolve (resposta relida do JSON, espera da rede)"""
+        texto = json.dumps(dados, default=str)
+        self.requisicoes += 1
+        self.bytes += len(texto.encode("utf-8"))
+        espera = self.latencia
+        if self.banda:
+            espera += len(texto) / self.banda
+        return SimpleNamespace(data=json.loads(texto), count=count), espera
+
+    def responder(self, dados, count=None):
+        """Uma requisição: espera a rede e devolve os dados"""
+        resposta, espera = self.empacotar(dados, count)
+        if espera:
+            time.sleep(espera)
+        return resposta
+
+    async def responder_async(self, dados, count=None):
+        resposta, espera = self.empacotar(dados, count)
+        if espera:
+            await asyncio.sleep(espera)
+        return resposta
+
+
+class ClienteAssincronoFalso:
+    def __init__(self, servidor):
+        self.servidor = servidor
+
+    def table(self, nome):
+        return ConsultaFalsa(self.servidor, nome, assincrona=True)
+
+
+def injetar(servidor):
+    """Põe o servidor no lugar dos clientes síncrono e assíncrono do acesso_dados"""
+    import acesso_dados
+
+    async def criar_cliente():
+        return servidor.assincrono()
+
+    acesso_dados._CLIENTE_SINCRONO = servidor
+    acesso_dados._criar_cliente = criar_cliente
+    if acesso_dados._LOOP is not None:  # Loop já iniciado: troca o cliente dele
+        acesso_dados._CLIENTE = servidor.assincrono()
+
+
+class ErroServidorFalso(Exception):
+    """Erro do banco (o supabase-py levantaria postgrest.APIError)"""
+
+
+class ChamadaFalsa:
+    def __init__(self, servidor, nome, parametros):
+        self.servidor = servidor
+        self.nome = nome
+        self.parametros = parametros
+
+    def execute(self):
+        funcao = self.servidor.funcoes[self.nome]
+        return self.servidor.responder(funcao(self.servidor.tabelas, self.parametros))
+
+
+def padrao_ilike(padrao):
+    """'%termo%' do ilike como expressão regular sem diferenciar maiúsculas"""
+    partes = (".*" if c == "%" else "." if c == "_" else re.escape(c) for c in padrao)
+    return re.compile("".join(partes), re.IGNORECASE | re.DOTALL)
+
+
+class ConsultaFalsa:
+    def __init__(self, servidor, nome, assincrona=False):
+        self.servidor = servidor
+        self.nome = nome
+        self.assincrona = assincrona
+        self.campos = None  # None = todas as colunas
+        self.filtros = []
+        self.ordem = []
+        self.limite = None
+        self.novas = None  # Linhas de um insert
+        self.alteracoes = None  # Colunas de um update
+
+    def insert(self, linhas):
+        if isinstance(linhas, dict):
+            linhas = [linhas]
+        self.novas = [dict(linha) for linha in linhas]
+        return self
+
+    def update(self, alteracoes):
+        self.alteracoes = dict(alteracoes)
+        return self
+
+    def select(self, campos, count=None):
+        if campos.strip() != "*":
+            self.campos = [campo.strip() for campo in campos.split(",")]
+        return self  # .count vem sempre preenchido
+
+    def eq(self, coluna, valor):
+        self.filtros.append(lambda linha: str(linha[coluna]) == str(valor))
+        return self
+
+    def gt(self, coluna, valor):
+        self.filtros.append(lambda linha: linha[coluna] > valor)
+        return self
+
+    def lt(self, coluna, valor):
+        self.filtros.append(lambda linha: str(linha[coluna]) < str(valor))
+        return self
+
+    def ilike(self, coluna, padrao):
+        expressao = padrao_ilike(padrao)
+        self.filtros.append(
+            lambda linha: linha[coluna] is not None
+            and expressao.fullmatch(str(linha[coluna])) is not None
+        )
+        return self
+
+    def in_(self, coluna, valores):
+        valores = set(valores)
+        self.filtros.append(lambda linha: linha[coluna] in valores)
+        return self
+
+    def or_(self, expressao):
+        encontrado = PADRAO_CURSOR.match(expressao)
+        if encontrado is None:
+            raise ValueError(f"filtro não suportado: {expressao}")
+        coluna, operador, valor, ultimo_id = encontrado.groups()
+        cursor = (valor.replace('\\"', '"').replace("\\\\", "\\"), int(ultimo_id))
+        if operador == "gt":
+            self.filtros.append(lambda linha: (str(linha[coluna]), linha["id"]) > cursor)
+        else:
+            self.filtros.append(lambda linha: (str(linha[coluna]), linha["id"]) < cursor)
+        return self
+
+    def order(self, coluna, desc=False):
+        self.ordem.append((coluna, desc))
+        return self
+
+    def limit(self, quantidade):
+        self.limite = quantidade
+        return self
+
+    def execute(self):
+        if self.assincrona:
+            return self.executar_async()
+        return self.servidor.responder(*self.calcular())
+
+    async def executar_async(self):
+        return await self.servidor.responder_async(*self.calcular())
+
+    def calcular(self):
+        """O trabalho do banco: devolve (linhas da resposta, count)"""
+        if self.novas is not None:
+            return self.inserir(), None
+        linhas = [
+            linha
+            for linha in self.servidor.linhas(self.nome)
+            if all(filtro(linha) for filtro in self.filtros)
+        ]
+        if self.alteracoes is not None:
+            for linha in linhas:
+                linha.update(self.alteracoes)
+            return linhas, None
+
+        total = len(linhas)
+        for coluna, desc in reversed(self.ordem):  # sort estável: última chave primeiro
+            linhas.sort(key=lambda linha: linha[coluna], reverse=desc)
+        if self.limite is not None:
+            linhas = linhas[: self.limite]
+        if self.campos is not None:
+            linhas = [{campo: linha[campo] for campo in self.campos} for linha in linhas]
+        return linhas, total
+
+    def inserir(self):
+        """Tudo ou nada: uma violação de unicidade recusa o insert inteiro"""
+        tabela = self.servidor.tabelas.setdefault(self.nome, [])
+        for coluna in self.servidor.unicas.get(self.nome, []):
+            valores = {linha[coluna] for linha in tabela if linha.get(coluna) is not None}
+            for linha in self.novas:
+                valor = linha.get(coluna)
+                if valor is None:
+                    continue
+                if valor in valores:
+                    raise ErroServidorFalso(
+                        f"duplicate key value violates unique constraint ({coluna})={valor}"
+                    )
+                valores.add(valor)
+        proximo_id = max((linha["id"] for linha in tabela), default=0) + 1
+        for deslocamento, linha in enumerate(self.novas):
+            linha.setdefault("id", proximo_id + deslocamento)
+        tabela.extend(self.novas)
+        return self.novas
@@ -0,0 +1,300 @@
+# ========== VERIFICAÇÃO DOS TOTAIS EM CENTAVOS ==========
+# Confere o razão da réplica do financeiro (saldos mantidos por gatilhos em
+# centavos inteiros) contra somas exatas feitas em Python, numa réplica de
+# teste com milhões de transações aleatórias:
+#   • os valores entram como texto digitado ("1.234,56") e passam por
+#     dinheiro.ler_centavos, como no menu e na importação de extratos
+#   • a soma esperada é feita duas vezes: em int (centavos lidos do texto) e
+#     em Decimal (reais sorteados), e as duas precisam bater
+#   • depois da carga, edições e exclusões retroativas mexem em meses antigos
+#   • saldo_atual, saldo_em, listar_saldos_mensais e totais_por_categoria são
+#     comparados com o esperado, antes e depois de recalcular o razão do zero
+# Mostra também quanto uma soma em float teria errado.
+# Conceitos: decimal.Decimal, array, random, arquivos temporários
+#
+# Uso: python verificar_centavos.py [transacoes] [semente]
+
+import os
+import random
+import sys
+import tempfile
+import time
+from array import array
+from datetime import date, timedelta
+from decimal import Decimal
+
+# A réplica de teste fica numa pasta temporária (não toca a réplica real)
+PASTA = tempfile.mkdtemp(prefix="verificar_centavos_")
+os.environ["FINANCEIRO_REPLICA"] = os.path.join(PASTA, "replica.db")
+
+import replica_financeiro as replica  # noqa: E402 (depende da variável acima)
+from dinheiro import centavos_para_texto, ler_centavos, para_centavos  # noqa: E402
+from financeiro import CATEGORIAS_DESPESA, CATEGORIAS_RECEITA  # noqa: E402
+
+TRANSACOES_PADRAO = 2_000_000
+SEMENTE_PADRAO = 42
+TAMANHO_LOTE = 50_000
+FRACAO_RETROATIVAS = 0.01  # Edições e exclusões em datas antigas
+CONSULTAS_SALDO_EM = 500
+INICIO = date(2016, 1, 1)
+DIAS = 10 * 365
+
+
+def sortear_valor():
+    """
+    Valor aleatório (muitos pequenos, alguns grandes) como (Decimal em reais,
+    texto como o usuário digitaria, em formatos variados)
+    """
+    if random.random() < 0.05:
+        reais = random.randint(1_000, 500_000)
+    else:
+        reais = random.randint(0, 999)
+    resto = random.randint(0 if reais else 1, 99)
+
+    forma = random.randrange(3)
+    if forma == 0:
+        texto = f"{reais:,}".replace(",", ".") + f",{resto:02d}"  # 1.234,56
+    elif forma == 1:
+        texto = f"{reais}.{resto:02d}"  # 1234.56
+    else:
+        texto = f"R$ {reais},{resto:02d}"  # R$ 1234,56
+    return Decimal(f"{reais}.{resto:02d}"), texto
+
+
+def dia_iso(indice):
+    return (INICIO + timedelta(days=indice)).isoformat()
+
+
+class Esperado:
+    """Totais calculados em Python: int (centavos) e Decimal (reais)"""
+
+    def __init__(self, quantidade):
+        self.valor = array("q", bytes(8 * quantidade))
+        self.dia = array("i", bytes(4 * quantidade))
+        self.receita = array("b", bytes(quantidade))
+        self.categoria = array("b", bytes(quantidade))
+        self.ativa = array("b", [1]) * quantidade
+        self.decimal = {"Receita": Decimal(0), "Despesa": Decimal(0)}
+        self.flutuante = {"Receita": 0.0, "Despesa": 0.0}
+
+    def lancar(self, indice, receita, categoria, dia):
+        """Sorteia o valor da transação 'indice' e devolve (tipo, centavos)"""
+        reais, texto = sortear_valor()
+        centavos = ler_centavos(texto)  # Mesmo caminho do menu e da importação
+        tipo = "Receita" if receita else "Despesa"
+        self.decimal[tipo] += reais
+        self.flutuante[tipo] += float(reais)
+        self.valor[indice] = centavos
+        self.dia[indice] = dia
+        self.receita[indice] = receita
+        self.categoria[indice] = categoria
+        return tipo, centavos
+
+    def estornar(self, indice):
+        """Tira a transação 'indice' das somas (antes de editar ou excluir)"""
+        tipo = "Receita" if self.receita[indice] else "Despesa"
+        reais = Decimal(self.valor[indice]) / 100
+        self.decimal[tipo] -= reais
+        self.flutuante[tipo] -= float(reais)
+
+    def totais(self):
+        """(por tipo, por dia, por (tipo, categoria)) em centavos"""
+        por_tipo = {"Receita": 0, "Despesa": 0}
+        por_dia = {}
+        por_categoria = {}
+        for i in range(len(self.valor)):
+            if not self.ativa[i]:
+                continue
+            tipo = "Receita" if self.receita[i] else "Despesa"
+            centavos = self.valor[i]
+            por_tipo[tipo] += centavos
+            receitas, despesas = por_dia.get(self.dia[i], (0, 0))
+            if self.receita[i]:
+                receitas += centavos
+            else:
+                despesas += centavos
+            por_dia[self.dia[i]] = (receitas, despesas)
+            chave = (tipo, self.categoria[i])
+            por_categoria[chave] = por_categoria.get(chave, 0) + centavos
+        return por_tipo, por_dia, por_categoria
+
+
+def nome_categoria(receita, indice):
+    return (CATEGORIAS_RECEITA if receita else CATEGORIAS_DESPESA)[indice]
+
+
+def carregar(esperado, quantidade):
+    """Grava as transações em ordem de data, em lotes, pelos gatilhos do razão"""
+    con = replica.conectar()
+    try:
+        for inicio in range(0, quantidade, TAMANHO_LOTE):
+            linhas = []
+            for i in range(inicio, min(inicio + TAMANHO_LOTE, quantidade)):
+                receita = random.random() < 0.2
+                categoria = random.randrange(
+                    len(CATEGORIAS_RECEITA if receita else CATEGORIAS_DESPESA)
+                )
+                dia = i * DIAS // quantidade
+                tipo, centavos = esperado.lancar(i, receita, categoria, dia)
+                linhas.append(
+                    (i + 1, tipo, nome_categoria(receita, categoria),
+                     f"Transação {i + 1}", centavos, dia_iso(dia))
+                )
+            con.execute("begin")
+            con.executemany(
+                "insert into transacoes (id, tipo, categoria, descricao, "
+                "                        valor_centavos, data) "
+                "values (?, ?, ?, ?, ?, ?)",
+                linhas,
+            )
+            con.execute("commit")
+    finally:
+        con.close()
+
+
+def mexer_no_passado(esperado, quantidade):
+    """Edita e exclui transações sorteadas (datas antigas mudam meses seguintes)"""
+    alteradas = random.sample(range(quantidade), int(quantidade * FRACAO_RETROATIVAS))
+    metade = len(alteradas) // 2
+    con = replica.conectar()
+    try:
+        con.execute("begin")
+        for i in alteradas[:metade]:
+            esperado.estornar(i)
+            receita = random.random() < 0.2
+            categoria = random.randrange(
+                len(CATEGORIAS_RECEITA if receita else CATEGORIAS_DESPESA)
+            )
+            dia = random.randrange(DIAS)
+            tipo, centavos = esperado.lancar(i, receita, categoria, dia)
+            con.execute(
+                "update transacoes set tipo = ?, categoria = ?, valor_centavos = ?, "
+                "data = ? where id = ?",
+                (tipo, nome_categoria(receita, categoria), centavos, dia_iso(dia), i + 1),
+            )
+        for i in alteradas[metade:]:
+            esperado.estornar(i)
+            esperado.ativa[i] = 0
+            con.execute("delete from transacoes where id = ?", (i + 1,))
+        con.execute("commit")
+    finally:
+        con.close()
+    return len(alteradas)
+
+
+def conferir(esperado, totais):
+    """Lista de divergências entre o razão e o esperado (vazia = tudo certo)"""
+    por_tipo, por_dia, por_categoria = totais
+    erros = []
+
+    def comparar(nome, obtido, certo):
+        if obtido != certo:
+            erros.append(f"{nome}: razão {obtido!r}, esperado {certo!r}")
+
+    # Totais gerais: int, Decimal e o texto enviado ao servidor
+    saldo = replica.saldo_atual()
+    for tipo, chave in (("Receita", "receitas"), ("Despesa", "despesas")):
+        comparar(f"saldo_atual {chave}", saldo[chave], por_tipo[tipo])
+        comparar(
+            f"saldo_atual {chave} (Decimal)",
+            Decimal(centavos_para_texto(saldo[chave])),
+            esperado.decimal[tipo],
+        )
+        comparar(
+            f"{chave} ida e volta pelo texto",
+            para_centavos(centavos_para_texto(saldo[chave])),
+            saldo[chave],
+        )
+
+    # Saldo em datas sorteadas: acumulado até o dia
+    acumulado = {}
+    receitas = despesas = 0
+    for dia in range(DIAS):
+        r, d = por_dia.get(dia, (0, 0))
+        receitas += r
+        despesas += d
+        acumulado[dia] = (receitas, despesas)
+    for dia in random.sample(range(DIAS), CONSULTAS_SALDO_EM):
+        em = replica.saldo_em(dia_iso(dia))
+        comparar(f"saldo_em {dia_iso(dia)}", (em["receitas"], em["despesas"]), acumulado[dia])
+
+    # Cada mês
+    por_mes = {}
+    for dia, (r, d) in por_dia.items():
+        mes = dia_iso(dia)[:7]
+        receitas, despesas = por_mes.get(mes, (0, 0))
+        por_mes[mes] = (receitas + r, despesas + d)
+    obtido = {m["mes"]: (m["receitas"], m["despesas"]) for m in replica.listar_saldos_mensais()}
+    comparar("meses", obtido, por_mes)
+
+    # Cada categoria
+    for tipo, receita in (("Receita", 1), ("Despesa", 0)):
+        certo = {
+            nome_categoria(receita, categoria): total
+            for (t, categoria), total in por_categoria.items()
+            if t == tipo
+        }
+        obtido = {c["categoria"]: c["total"] for c in replica.totais_por_categoria(tipo)}
+        comparar(f"categorias de {tipo}", obtido, certo)
+
+    return erros
+
+
+def mostrar(titulo, erros):
+    if erros:
+        print(f"  ✗ {titulo}: {len(erros)} divergência(s)")
+        for erro in erros[:10]:
+            print(f"      {erro}")
+    else:
+        print(f"  ✓ {titulo}: tudo bate")
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) >= 2 else TRANSACOES_PADRAO
+    semente = int(sys.argv[2]) if len(sys.argv) >= 3 else SEMENTE_PADRAO
+    random.seed(semente)
+
+    print("=" * 66)
+    print(f"🔎 TOTAIS EM CENTAVOS — {quantidade:,} transações, semente {semente}")
+    print("=" * 66)
+
+    esperado = Esperado(quantidade)
+    inicio = time.perf_counter()
+    carregar(esperado, quantidade)
+    print(f"\n  Carga pelos gatilhos: {time.perf_counter() - inicio:.1f} s")
+
+    inicio = time.perf_counter()
+    alteradas = mexer_no_passado(esperado, quantidade)
+    print(f"  {alteradas:,} edições/exclusões retroativas: {time.perf_counter() - inicio:.1f} s")
+
+    totais = esperado.totais()
+    comparar_int_decimal = [
+        f"{tipo}: int {centavos_para_texto(totais[0][tipo])}, Decimal {esperado.decimal[tipo]}"
+        for tipo in totais[0]
+        if Decimal(centavos_para_texto(totais[0][tipo])) != esperado.decimal[tipo]
+    ]
+    print()
+    mostrar("somas int × Decimal", comparar_int_decimal)
+
+    erros = conferir(esperado, totais)
+    mostrar("razão mantido pelos gatilhos", erros)
+
+    con = replica.conectar()
+    try:
+        replica._reconstruir_razao(con)
+    finally:
+        con.close()
+    erros_reconstruido = conferir(esperado, totais)
+    mostrar("razão recalculado do zero", erros_reconstruido)
+
+    print("\n  Erro que uma soma em float teria:")
+    for tipo in ("Receita", "Despesa"):
+        diferenca = Decimal(esperado.flutuante[tipo]) - esperado.decimal[tipo]
+        print(f"    {tipo:<8} {float(diferenca):+.10f} reais")
+
+    if comparar_int_decimal or erros or erros_reconstruido:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
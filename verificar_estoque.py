@@ -0,0 +1,346 @@
+# ========== VERIFICAÇÃO DO ESTOQUE SOB CONCORRÊNCIA ==========
+# Dispara empréstimos, devoluções e reservas em paralelo (várias conexões,
+# como vários balcões ao mesmo tempo) contra as funções do biblioteca.sql
+# num Postgres de teste e confere que o estoque nunca se perde. As devoluções
+# vêm pelos três caminhos ao mesmo tempo: menu (registrar_devolucao), leitor
+# de código (devolver_por_codigo, que fecha o empréstimo mais antigo do livro,
+# de qualquer balcão) e lote (registrar_devolucoes_em_lote).
+#   • 0 <= quantidade_disponivel <= quantidade_total
+#   • disponível + empréstimos ativos + cópias separadas = total, por livro
+#   • nenhuma reserva aguardando enquanto há cópia na estante
+#   • nenhum membro acima de LIMITE_EMPRESTIMOS e nenhum empréstimo ativo
+#     repetido (mesmo membro e livro)
+#   • cada resposta ok=true virou exatamente uma linha em emprestimos, e
+#     cada empréstimo foi devolvido por um caminho só
+#   • nenhuma chamada termina em exceção do banco (as funções respondem
+#     {"ok": false, "erro": ...} nos casos esperados; a única exceção aceita
+#     é a do menu tentando devolver um empréstimo que o leitor já fechou)
+# As invariantes são conferidas durante a carga (amostras) e no fim.
+# Poucos livros com poucas cópias e muitos membros: todo mundo disputa as
+# mesmas linhas, que é onde uma trava faltando apareceria.
+#
+# Os dados de teste (livros, membros, empréstimos, reservas, exemplares e as
+# linhas do rollup de circulação do gênero de teste) são apagados no fim.
+# Ainda assim, use um banco local ou de homologação, nunca o de produção.
+# Conceitos: threading.Barrier, psycopg, transações concorrentes
+#
+# Uso: BIBLIOTECA_DSN=postgresql://... python verificar_estoque.py [requisicoes] [threads]
+# (precisa do psycopg: pip install -r requirements-dev.txt)
+
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+try:
+    import psycopg
+except ImportError:
+    psycopg = None
+
+from biblioteca import LIMITE_EMPRESTIMOS, PRAZO_ESTUDANTE, PRAZO_PROFESSOR
+
+REQUISICOES_PADRAO = 4000
+THREADS_PADRAO = 16
+LIVROS = 5
+COPIAS_POR_LIVRO = 3
+MEMBROS = 40
+# Fatias do sorteio de cada requisição: empréstimo, devolução, reserva
+CHANCE_DEVOLUCAO = 0.3
+CHANCE_RESERVA = 0.1
+TAMANHO_LOTE = 3  # Empréstimos por chamada de registrar_devolucoes_em_lote
+INTERVALO_AMOSTRAS = 0.2  # Segundos entre conferências durante a carga
+
+SQL_INVARIANTES_LIVROS = """
+select l.id, l.quantidade_total, l.quantidade_disponivel,
+       (select count(*) from emprestimos e
+         where e.livro_id = l.id and e.status = 'Ativo') as ativos,
+       (select count(*) from reservas r
+         where r.livro_id = l.id and r.status = 'Separada') as separadas,
+       (select count(*) from reservas r
+         where r.livro_id = l.id and r.status = 'Aguardando') as aguardando
+  from livros l
+ where l.id = any(%s)
+"""
+
+
+def criar_dados(con, marca):
+    """Livros e membros de teste; devolve (ids dos livros, ids dos membros)"""
+    with con.transaction():
+        livros = [
+            con.execute(
+                "insert into livros (titulo, autor, genero, quantidade_total, "
+                "                    quantidade_disponivel) "
+                "values (%s, 'Teste', %s, %s, %s) returning id",
+                (f"Livro {n} {marca}", marca, COPIAS_POR_LIVRO, COPIAS_POR_LIVRO),
+            ).fetchone()[0]
+            for n in range(1, LIVROS + 1)
+        ]
+        membros = [
+            con.execute(
+                "insert into membros (nome, email, tipo, ativo) "
+                "values (%s, %s, %s, true) returning id",
+                (
+                    f"Membro {n} {marca}",
+                    f"{marca}-{n}@teste.local",
+                    "Professor" if n % 4 == 0 else "Estudante",
+                ),
+            ).fetchone()[0]
+            for n in range(1, MEMBROS + 1)
+        ]
+    return livros, membros
+
+
+def apagar_dados(con, marca, livros, membros):
+    with con.transaction():
+        con.execute("delete from emprestimos where livro_id = any(%s)", (livros,))
+        con.execute("delete from reservas where livro_id = any(%s)", (livros,))
+        con.execute("delete from exemplares where livro_id = any(%s)", (livros,))
+        con.execute("delete from livros where id = any(%s)", (livros,))
+        con.execute("delete from membros where id = any(%s)", (membros,))
+        # O gênero dos livros de teste é a marca: o rollup dele é só do teste
+        con.execute("delete from circulacao_mensal where genero = %s", (marca,))
+
+
+def trabalhar(dsn, livros, membros, quantidade, largada, contadores, excecoes, semente):
+    """
+    Uma 'mesa de balcão': conexão própria, requisições sorteadas. Exceções do
+    banco são contadas (e a primeira mensagem de cada tipo guardada em
+    'excecoes') sem parar a thread.
+    """
+    sorteio = random.Random(semente)
+    # Empréstimos feitos por esta mesa; o leitor de outra mesa pode fechar
+    # algum deles antes, e aí o menu recebe 'não está ativo' e o lote o ignora
+    meus_emprestimos = []
+    contagem = Counter()
+
+    with psycopg.connect(dsn, autocommit=True) as con:
+        largada.wait()  # Todas as threads começam juntas
+        for _ in range(quantidade):
+            livro_id = sorteio.choice(livros)
+            membro_id = sorteio.choice(membros)
+            chance = sorteio.random()
+            try:
+                if chance < CHANCE_DEVOLUCAO and meus_emprestimos:
+                    devolver(con, sorteio, livro_id, meus_emprestimos, contagem)
+
+                elif chance < CHANCE_DEVOLUCAO + CHANCE_RESERVA:
+                    resposta = con.execute(
+                        "select reservar_livro(%s, %s)", (membro_id, livro_id)
+                    ).fetchone()[0]
+                    contagem["reserva_" + (resposta.get("erro") or "ok")] += 1
+
+                else:
+                    resposta = con.execute(
+                        "select emprestar_livro(%s, %s, %s, %s, %s)",
+                        (
+                            membro_id,
+                            livro_id,
+                            LIMITE_EMPRESTIMOS,
+                            PRAZO_ESTUDANTE,
+                            PRAZO_PROFESSOR,
+                        ),
+                    ).fetchone()[0]
+                    if resposta["ok"]:
+                        meus_emprestimos.append(resposta["emprestimo_id"])
+                        contagem["emprestimo_ok"] += 1
+                    else:
+                        contagem["emprestimo_" + resposta["erro"]] += 1
+            except psycopg.Error as erro:
+                contagem[f"excecao_{type(erro).__name__}"] += 1
+                excecoes.setdefault(type(erro).__name__, str(erro).splitlines()[0])
+
+    contadores.append(contagem)
+
+
+def devolver(con, sorteio, livro_id, meus_emprestimos, contagem):
+    """
+    Uma devolução por um dos três caminhos, sorteado. Conta em 'devolucao_ok'
+    cada empréstimo que a chamada realmente fechou
+    """
+    caminho = sorteio.randrange(3)
+    if caminho == 0:
+        # Leitor: etiqueta de uma cópia do livro (sem empréstimo próprio, fecha
+        # o empréstimo ativo mais antigo do livro, de qualquer mesa)
+        codigo = f"EX{livro_id}-{sorteio.randint(1, COPIAS_POR_LIVRO)}"
+        resposta = con.execute(
+            "select devolver_por_codigo(%s, current_date, 0)", (codigo,)
+        ).fetchone()[0]
+        if resposta["ok"]:
+            contagem["devolucao_ok"] += 1
+            contagem["devolucao_leitor"] += 1
+        else:
+            contagem["devolucao_leitor_" + resposta["erro"]] += 1
+
+    elif caminho == 1:
+        lote = [
+            meus_emprestimos.pop(sorteio.randrange(len(meus_emprestimos)))
+            for _ in range(min(TAMANHO_LOTE, len(meus_emprestimos)))
+        ]
+        fechados = con.execute(
+            "select count(*) from registrar_devolucoes_em_lote(%s, current_date, 0)",
+            (lote,),
+        ).fetchone()[0]
+        contagem["devolucao_ok"] += fechados
+        contagem["devolucao_lote"] += fechados
+
+    else:
+        emprestimo_id = meus_emprestimos.pop(sorteio.randrange(len(meus_emprestimos)))
+        try:
+            con.execute(
+                "select registrar_devolucao(%s, current_date, 0)", (emprestimo_id,)
+            )
+        except psycopg.errors.RaiseException as erro:
+            if "não está ativo" not in str(erro):
+                raise
+            contagem["devolucao_menu_ja_devolvido"] += 1
+        else:
+            contagem["devolucao_ok"] += 1
+            contagem["devolucao_menu"] += 1
+
+
+def conferir(con, livros, membros):
+    """Lista de violações das invariantes (vazia = estoque consistente)"""
+    erros = []
+    for livro_id, total, disponivel, ativos, separadas, aguardando in con.execute(
+        SQL_INVARIANTES_LIVROS, (livros,)
+    ):
+        if not 0 <= disponivel <= total:
+            erros.append(f"livro {livro_id}: disponível {disponivel} fora de 0..{total}")
+        if disponivel + ativos + separadas != total:
+            erros.append(
+                f"livro {livro_id}: disponível {disponivel} + ativos {ativos} "
+                f"+ separadas {separadas} != total {total}"
+            )
+        if disponivel > 0 and aguardando:
+            erros.append(
+                f"livro {livro_id}: {aguardando} reserva(s) aguardando com "
+                f"{disponivel} cópia(s) na estante"
+            )
+
+    for membro_id, ativos in con.execute(
+        "select membro_id, count(*) from emprestimos "
+        "where status = 'Ativo' and membro_id = any(%s) "
+        "group by membro_id having count(*) > %s",
+        (membros, LIMITE_EMPRESTIMOS),
+    ):
+        erros.append(f"membro {membro_id}: {ativos} empréstimos ativos")
+
+    for membro_id, livro_id in con.execute(
+        "select membro_id, livro_id from emprestimos "
+        "where status = 'Ativo' and livro_id = any(%s) "
+        "group by membro_id, livro_id having count(*) > 1",
+        (livros,),
+    ):
+        erros.append(f"membro {membro_id}: livro {livro_id} emprestado duas vezes")
+    return erros
+
+
+def main():
+    if psycopg is None:
+        print("✗ Este script precisa do psycopg: pip install -r requirements-dev.txt")
+        sys.exit(2)
+    dsn = os.getenv("BIBLIOTECA_DSN")
+    if not dsn:
+        print("✗ Defina BIBLIOTECA_DSN com a conexão do Postgres de TESTE")
+        sys.exit(2)
+
+    requisicoes = int(sys.argv[1]) if len(sys.argv) >= 2 else REQUISICOES_PADRAO
+    threads = int(sys.argv[2]) if len(sys.argv) >= 3 else THREADS_PADRAO
+    marca = f"estoque-{uuid.uuid4().hex[:8]}"
+
+    print("=" * 66)
+    print(f"🔎 ESTOQUE SOB CONCORRÊNCIA — {requisicoes:,} requisições, {threads} threads")
+    print(f"   ({LIVROS} livros × {COPIAS_POR_LIVRO} cópias, {MEMBROS} membros)")
+    print("=" * 66)
+
+    with psycopg.connect(dsn, autocommit=True) as con:
+        livros, membros = criar_dados(con, marca)
+        try:
+            largada = threading.Barrier(threads + 1, timeout=60)
+            contadores = []
+            excecoes = {}  # Tipo → primeira mensagem
+            trabalhadores = [
+                threading.Thread(
+                    target=trabalhar,
+                    args=(
+                        dsn,
+                        livros,
+                        membros,
+                        requisicoes // threads,
+                        largada,
+                        contadores,
+                        excecoes,
+                        n,
+                    ),
+                )
+                for n in range(threads)
+            ]
+            for trabalhador in trabalhadores:
+                trabalhador.start()
+
+            largada.wait()
+            inicio = time.perf_counter()
+            amostras = 0
+            erros_durante = []
+            while any(t.is_alive() for t in trabalhadores):
+                # Cada SELECT vê um instante consistente do banco
+                erros_durante += conferir(con, livros, membros)
+                amostras += 1
+                time.sleep(INTERVALO_AMOSTRAS)
+            for trabalhador in trabalhadores:
+                trabalhador.join()
+            duracao = time.perf_counter() - inicio
+
+            contagem = sum(contadores, Counter())
+            if len(contadores) != threads:
+                erros_durante.append(
+                    f"{threads - len(contadores)} thread(s) pararam com erro (veja acima)"
+                )
+            erros_durante += [
+                f"exceção {tipo} ({contagem['excecao_' + tipo]}x): {mensagem}"
+                for tipo, mensagem in excecoes.items()
+            ]
+            erros_fim = conferir(con, livros, membros)
+
+            criados, devolvidos = con.execute(
+                "select count(*), count(*) filter (where status = 'Devolvido') "
+                "from emprestimos where livro_id = any(%s)",
+                (livros,),
+            ).fetchone()
+            if criados != contagem["emprestimo_ok"]:
+                erros_fim.append(
+                    f"{contagem['emprestimo_ok']} empréstimos ok, {criados} linhas gravadas"
+                )
+            if devolvidos != contagem["devolucao_ok"]:
+                erros_fim.append(
+                    f"{contagem['devolucao_ok']} devoluções ok, {devolvidos} gravadas"
+                )
+        finally:
+            apagar_dados(con, marca, livros, membros)
+
+    feitas = requisicoes // threads * threads
+    print(f"\n  {feitas:,} requisições em {duracao:.1f} s ({feitas / duracao:,.0f}/s)")
+    for chave, total in sorted(contagem.items()):
+        print(f"    {chave:<36} {total:>7,}")
+
+    print()
+    for titulo, erros in (
+        (f"durante a carga ({amostras} amostras)", erros_durante),
+        ("no fim", erros_fim),
+    ):
+        if erros:
+            print(f"  ✗ {titulo}: {len(erros)} violação(ões)")
+            for erro in erros[:10]:
+                print(f"      {erro}")
+        else:
+            print(f"  ✓ {titulo}: estoque consistente")
+
+    if erros_durante or erros_fim:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
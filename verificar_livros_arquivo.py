@@ -0,0 +1,162 @@
+# ========== VERIFICAÇÃO DA LEITURA DE LIVROS EM ARQUIVO ==========
+# Escreve o mesmo conjunto de livros em CSV e em JSONL numa pasta temporária,
+# passa cada arquivo por ler_arquivo_livros e validar_livro (o caminho da
+# importação em massa) e confere, linha a linha, se o livro foi aceito com a
+# quantidade certa ou recusado. Os dois formatos precisam dar o mesmo
+# resultado: quantidade 0 é recusada nos dois (no JSONL ela chega como o
+# número 0, não como o texto "0"), e só a quantidade ausente vira 1 cópia.
+# Depois roda importar_livros contra o substituto do PostgREST (servidor_falso,
+# com ISBN único como no banco) com ISBNs repetidos no mesmo lote, em lotes
+# diferentes e já cadastrados: os repetidos viram linhas rejeitadas e o resto
+# do arquivo entra.
+# Conceitos: csv.DictWriter, json, arquivos temporários, unittest.mock
+#
+# Uso: python verificar_livros_arquivo.py
+
+import contextlib
+import csv
+import io
+import json
+import os
+import sys
+import tempfile
+
+import acesso_dados
+from biblioteca import TABELA_LIVROS, importar_livros, ler_arquivo_livros, validar_livro
+from servidor_falso import ServidorFalso
+
+PASTA = tempfile.mkdtemp(prefix="verificar_livros_arquivo_")
+CAMPOS = ["titulo", "autor", "genero", "ano_publicacao", "quantidade", "isbn"]
+
+# (descrição, campos do livro, quantidade esperada ou None se recusado)
+CASOS = [
+    ("quantidade 3", {"quantidade": 3}, 3),
+    ("quantidade ausente", {}, 1),
+    ("quantidade 0", {"quantidade": 0}, None),
+    ("quantidade negativa", {"quantidade": -2}, None),
+    ("quantidade não numérica", {"quantidade": "três"}, None),
+    ("ano 0", {"ano_publicacao": 0}, None),
+    ("ano ausente", {"ano_publicacao": None}, None),
+]
+
+
+def montar_livro(numero, campos):
+    livro = {
+        "titulo": f"Livro {numero}",
+        "autor": "Autor",
+        "genero": "Romance",
+        "ano_publicacao": 1990,
+    }
+    livro.update(campos)
+    return {chave: valor for chave, valor in livro.items() if valor is not None}
+
+
+def escrever_arquivos():
+    """Devolve os caminhos do CSV e do JSONL com um livro por caso"""
+    caminho_csv = os.path.join(PASTA, "livros.csv")
+    caminho_jsonl = os.path.join(PASTA, "livros.jsonl")
+    with open(caminho_csv, "w", encoding="utf-8", newline="") as arquivo_csv, open(
+        caminho_jsonl, "w", encoding="utf-8"
+    ) as arquivo_jsonl:
+        escritor = csv.DictWriter(arquivo_csv, fieldnames=CAMPOS)
+        escritor.writeheader()
+        for numero, (_, campos, _) in enumerate(CASOS, 1):
+            livro = montar_livro(numero, campos)
+            escritor.writerow(livro)  # Campo ausente vira célula vazia
+            arquivo_jsonl.write(json.dumps(livro, ensure_ascii=False) + "\n")
+    return caminho_csv, caminho_jsonl
+
+
+def conferir(caminho):
+    """Lista de divergências entre o que validar_livro fez e o esperado"""
+    erros = []
+    linhas = [linha for _, linha in ler_arquivo_livros(caminho)]
+    if len(linhas) != len(CASOS):
+        return [f"{len(linhas)} linhas lidas, {len(CASOS)} escritas"]
+
+    for (descricao, _, esperado), linha in zip(CASOS, linhas):
+        dados, erro = validar_livro(linha)
+        obtido = None if dados is None else dados["quantidade_total"]
+        if obtido != esperado:
+            situacao = f"aceito com {obtido}" if dados else f"recusado ({erro})"
+            certo = f"aceito com {esperado}" if esperado else "recusado"
+            erros.append(f"{descricao}: {situacao}, esperado {certo}")
+    return erros
+
+
+# Importação em lotes de 3: (ISBN, aceito?) por linha. ISBN_CADASTRADO já
+# está na tabela antes da importação
+ISBN_CADASTRADO = "9788535902778"
+LOTE_IMPORTACAO = 3
+LINHAS_IMPORTACAO = [
+    ("9788535902779", True),
+    (ISBN_CADASTRADO, False),  # Já cadastrado
+    ("978-85-359-0277-9", False),  # Repetido no mesmo lote (com hífens)
+    ("9788535902780", True),  # Segundo lote
+    ("9788535902779", False),  # Repetido de um lote já gravado
+    (None, True),  # Sem ISBN: nunca é repetido
+    (None, True),
+]
+
+
+def conferir_importacao():
+    """Lista de divergências da importação com ISBNs repetidos"""
+    caminho = os.path.join(PASTA, "importacao.jsonl")
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        for numero, (isbn, _) in enumerate(LINHAS_IMPORTACAO, 1):
+            livro = montar_livro(numero, {"isbn": isbn})
+            arquivo.write(json.dumps(livro, ensure_ascii=False) + "\n")
+
+    cadastrado = montar_livro(0, {"isbn": ISBN_CADASTRADO})
+    cadastrado["id"] = 1
+    servidor = ServidorFalso({TABELA_LIVROS: [cadastrado]}, unicas={TABELA_LIVROS: ["isbn"]})
+    acesso_dados._CLIENTE_SINCRONO = servidor
+    with contextlib.redirect_stdout(io.StringIO()) as saida:
+        importar_livros(caminho, tamanho_lote=LOTE_IMPORTACAO)
+    texto = saida.getvalue()
+
+    erros = []
+    if "✗" in texto:
+        erros.append(texto.strip().splitlines()[-1].strip())
+    aceitos = [f"Livro {n}" for n, (_, ok) in enumerate(LINHAS_IMPORTACAO, 1) if ok]
+    gravados = [livro["titulo"] for livro in servidor.tabelas[TABELA_LIVROS][1:]]
+    if gravados != aceitos:
+        erros.append(f"gravados {gravados}, esperado {aceitos}")
+    recusados = len(LINHAS_IMPORTACAO) - len(aceitos)
+    if f"{recusados} linha(s) rejeitada(s)" not in texto:
+        erros.append(f"relatório não mostra {recusados} linhas rejeitadas")
+    return erros
+
+
+def main():
+    print("=" * 66)
+    print("🔎 LIVROS EM ARQUIVO — CSV × JSONL pelo validar_livro")
+    print("=" * 66)
+
+    falhas = 0
+    for caminho in escrever_arquivos():
+        erros = conferir(caminho)
+        nome = os.path.basename(caminho)
+        if erros:
+            falhas += 1
+            print(f"  ✗ {nome}: {len(erros)} divergência(s)")
+            for erro in erros:
+                print(f"      {erro}")
+        else:
+            print(f"  ✓ {nome}: {len(CASOS)} casos como esperado")
+
+    erros = conferir_importacao()
+    if erros:
+        falhas += 1
+        print(f"  ✗ importação com ISBNs repetidos: {len(erros)} divergência(s)")
+        for erro in erros:
+            print(f"      {erro}")
+    else:
+        print(f"  ✓ importação com ISBNs repetidos: {len(LINHAS_IMPORTACAO)} linhas como esperado")
+
+    if falhas:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()